@@ -1,16 +1,24 @@
 """Backend implementations for search and content fetching."""
 
+from .cache import CachingSearchClient, SearchResultCache, normalize_query
+from .content_cache import CachedContent, ContentCache
 from .content_fetcher import (
     AbstractContentFetcher,
     ContentFetcherFactory,
     SourcegraphContentFetcher,
     ZoektContentFetcher,
 )
+from .http import AsyncHttpPool, HttpPoolConfig
 from .models import FormattedResult, Match
+from .recording import RecordingContentFetcher, RecordingTransport
 from .search import (
+    AbstractAsyncSearchClient,
     AbstractSearchClient,
+    AsyncSourcegraphSearchClient,
+    AsyncZoektSearchClient,
     SearchClientFactory,
     SourcegraphSearchClient,
+    TimedSearchClient,
     ZoektSearchClient,
 )
 
@@ -19,10 +27,23 @@ __all__ = [
     "SearchClientFactory",
     "ZoektSearchClient",
     "SourcegraphSearchClient",
+    "AbstractAsyncSearchClient",
+    "AsyncZoektSearchClient",
+    "AsyncSourcegraphSearchClient",
+    "TimedSearchClient",
     "AbstractContentFetcher",
     "ContentFetcherFactory",
     "ZoektContentFetcher",
     "SourcegraphContentFetcher",
+    "ContentCache",
+    "CachedContent",
+    "SearchResultCache",
+    "CachingSearchClient",
+    "normalize_query",
+    "AsyncHttpPool",
+    "HttpPoolConfig",
+    "RecordingTransport",
+    "RecordingContentFetcher",
     "FormattedResult",
     "Match",
 ]
@@ -0,0 +1,225 @@
+"""Result caches for search backends."""
+
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from backends.models import FormattedResult
+from backends.search import AbstractAsyncSearchClient
+
+# A query atom is either a run of non-space characters, or one containing
+# double-quoted sections (e.g. `"func Foo"` or `f:"my dir/x.go"`).
+_ATOM_RE = re.compile(r'(?:[^\s"]*"(?:[^"\\]|\\.)*")+[^\s"]*|\S+')
+
+
+def normalize_query(query: str) -> str:
+    """Canonicalize a search query for use as a cache key.
+
+    Whitespace is collapsed and, when the query is a plain conjunction of
+    atoms, the atoms are sorted so that ``lang:go foo`` and ``foo  lang:go``
+    share a cache entry. Queries using ``or`` or parentheses keep their order
+    because reordering could change their meaning.
+
+    Args:
+        query: Raw search query
+
+    Returns:
+        Normalized query string
+    """
+    atoms = _ATOM_RE.findall(query.strip())
+    is_conjunction = not any(
+        atom.lower() == "or" or atom.startswith("(") or atom.endswith(")") for atom in atoms
+    )
+    if is_conjunction:
+        atoms = sorted(atoms)
+    return " ".join(atoms)
+
+
+def _estimate_size(results: List[FormattedResult]) -> int:
+    """Roughly estimate the memory held by a list of search results."""
+    size = 64
+    for result in results:
+        size += 128 + len(result.repository) + len(result.filename)
+        for match in result.matches:
+            size += 64 + len(match.content) + len(match.before) + len(match.after)
+    return size
+
+
+@dataclass
+class _CacheEntry:
+    """A cached search result."""
+
+    value: List[FormattedResult]
+    size: int
+    expires_at: float
+    generation: int
+
+
+class SearchResultCache:
+    """TTL + LRU cache for search results, bounded by entry count and bytes.
+
+    Every entry is stamped with the index generation it was computed for.
+    Bumping the generation (e.g. after a reindex) invalidates all entries.
+    """
+
+    def __init__(
+        self, ttl_seconds: float = 300.0, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024
+    ) -> None:
+        """Initialize search result cache.
+
+        Args:
+            ttl_seconds: Time-to-live of an entry
+            max_entries: Maximum number of cached entries
+            max_bytes: Maximum estimated size of all cached entries
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+
+    @staticmethod
+    def make_key(
+        backend: str,
+        query: str,
+        num_results: int,
+        max_line_matches: Optional[int] = None,
+        context_lines: int = 0,
+    ) -> Tuple:
+        """Build a cache key for a search request."""
+        return (backend, normalize_query(query), num_results, max_line_matches, context_lines)
+
+    def get(self, key: Tuple) -> Optional[List[FormattedResult]]:
+        """Get a cached result, or None on a miss.
+
+        Args:
+            key: Key from ``make_key``
+
+        Returns:
+            Cached results, or None if missing, expired or from an older generation
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic() or entry.generation != self.generation:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def put(self, key: Tuple, value: List[FormattedResult]) -> None:
+        """Store a result, evicting least recently used entries to stay within bounds.
+
+        Args:
+            key: Key from ``make_key``
+            value: Search results to cache
+        """
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = _CacheEntry(
+            value=value,
+            size=size,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            generation=self.generation,
+        )
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def invalidate(self, generation: Optional[int] = None) -> int:
+        """Move to a new index generation and drop all cached entries.
+
+        Args:
+            generation: New generation stamp; defaults to the current one plus one.
+                Passing the current generation is a no-op.
+
+        Returns:
+            The active generation
+        """
+        if generation is not None and generation == self.generation:
+            return self.generation
+        self.generation = self.generation + 1 if generation is None else generation
+        self._entries.clear()
+        self._bytes = 0
+        return self.generation
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "generation": self.generation,
+        }
+
+    def _remove(self, key: Tuple) -> None:
+        """Remove an entry and release its bytes."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+class CachingSearchClient(AbstractAsyncSearchClient):
+    """Async search client that serves repeated queries from a ``SearchResultCache``."""
+
+    def __init__(
+        self, client: AbstractAsyncSearchClient, cache: SearchResultCache, backend: str
+    ) -> None:
+        """Initialize caching search client.
+
+        Args:
+            client: Search client to delegate cache misses to
+            cache: Result cache
+            backend: Backend name, part of the cache key
+        """
+        super().__init__(client.http_pool)
+        self._owns_pool = False
+        self.client = client
+        self.cache = cache
+        self.backend = backend
+
+    async def search(
+        self,
+        query: str,
+        num_results: int,
+        max_line_matches: Optional[int] = None,
+        context_lines: int = 0,
+    ) -> List[FormattedResult]:
+        """Search, using the cache when possible.
+
+        Results are immutable, so cached entries are shared rather than copied.
+        """
+        key = self.cache.make_key(
+            self.backend, query, num_results, max_line_matches, context_lines
+        )
+        results = self.cache.get(key)
+        if results is None:
+            results = await self.client.search(
+                query, num_results, max_line_matches, context_lines
+            )
+            self.cache.put(key, results)
+        return list(results)
+
+    async def aclose(self) -> None:
+        """Close the wrapped client."""
+        await self.client.aclose()
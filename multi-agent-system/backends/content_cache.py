@@ -0,0 +1,336 @@
+"""File content cache with conditional revalidation for content fetchers."""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedContent:
+    """A cached file body and the validators needed to revalidate it."""
+
+    content: str
+    etag: str = ""
+    last_modified: str = ""
+    validated_at: float = 0.0
+    _line_offsets: Optional[array] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def size(self) -> int:
+        """Approximate size of the entry in bytes, including its line index once built."""
+        return len(self.content) + len(self.etag) + len(self.last_modified) + 64 + self.index_size
+
+    @property
+    def index_size(self) -> int:
+        """Size of the line index in bytes, 0 until it is built."""
+        offsets = self._line_offsets
+        return len(offsets) * offsets.itemsize if offsets is not None else 0
+
+    def line_offsets(self) -> array:
+        """Get the character offset where each line starts, plus a trailing end offset.
+
+        The index is built once per entry and reused, so later slices cost
+        O(window) instead of re-splitting the whole file.
+        """
+        if self._line_offsets is None:
+            self._line_offsets = _index_lines(self.content)
+        return self._line_offsets
+
+    def slice_lines(self, start_line: int, end_line: int) -> str:
+        """Get lines ``start_line`` through ``end_line`` (1-based, inclusive)."""
+        offsets = self.line_offsets()
+        start_line = max(start_line, 1)
+        end_line = min(end_line, len(offsets) - 1)
+        if start_line > end_line:
+            return ""
+        return self.content[offsets[start_line - 1]:offsets[end_line]]
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Get the headers for a conditional GET against this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _index_lines(content: str) -> array:
+    """Build the line start offsets of a text, plus a trailing end offset."""
+    offsets = array("q", [0])
+    pos = content.find("\n")
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = content.find("\n", pos + 1)
+    if offsets[-1] != len(content):
+        offsets.append(len(content))
+    return offsets
+
+
+class ContentCache:
+    """Byte-bounded LRU cache for file contents with an optional on-disk tier.
+
+    Entries younger than ``revalidate_after`` seconds are served directly.
+    Older entries are revalidated with ``If-None-Match``/``If-Modified-Since``
+    so an unchanged file costs a 304 instead of a full download. The cache is
+    thread-safe because content fetchers run in a worker pool.
+
+    The disk tier keeps one JSON file per entry; its mtime is the time the
+    entry was last validated, so a revalidation only touches the file. The
+    size of the tier is scanned once at startup and then tracked in memory,
+    so each process should use its own directory.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        revalidate_after: float = 60.0,
+        disk_dir: Optional[Union[str, Path]] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        """Initialize content cache.
+
+        Args:
+            max_bytes: Maximum size of the in-memory tier
+            revalidate_after: Seconds an entry is served without revalidation
+            disk_dir: Directory for the on-disk tier, disabled if None
+            max_disk_bytes: Maximum size of the on-disk tier
+        """
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        # Disk tier file sizes by name, least recently written or validated first
+        self._disk_files: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._scan_disk()
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries: "OrderedDict[str, CachedContent]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(repo: str, path: str, revision: str = "") -> str:
+        """Build a cache key for a file."""
+        return f"{repo}@{revision}:{path}"
+
+    def get(self, key: str) -> Optional[CachedContent]:
+        """Look up an entry in memory, then on disk.
+
+        Args:
+            key: Key from ``make_key``
+
+        Returns:
+            The cached entry, or None if it is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._store(key, entry)
+        return entry
+
+    def is_fresh(self, entry: CachedContent) -> bool:
+        """Check whether an entry can be served without revalidation."""
+        return time.time() - entry.validated_at < self.revalidate_after
+
+    def put(self, key: str, entry: CachedContent) -> None:
+        """Store an entry in memory and, if enabled, on disk.
+
+        An entry larger than the memory tier is not cached, and any older
+        version of it is dropped from both tiers.
+
+        Args:
+            key: Key from ``make_key``
+            entry: Entry to store
+        """
+        if not entry.validated_at:
+            entry.validated_at = time.time()
+        with self._lock:
+            stored = self._store(key, entry)
+        if stored:
+            self._write_disk(key, entry)
+        else:
+            self._remove_disk(key)
+
+    def mark_validated(self, key: str, entry: CachedContent) -> None:
+        """Record that the backend confirmed an entry is still current."""
+        entry.validated_at = time.time()
+        with self._lock:
+            self.revalidated += 1
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.utime(path, (entry.validated_at, entry.validated_at))
+        except FileNotFoundError:
+            self._write_disk(key, entry)
+            return
+        except OSError as exc:
+            logger.warning(f"Failed to update content cache file {path}: {exc}")
+            return
+        with self._lock:
+            if path.name in self._disk_files:
+                self._disk_files.move_to_end(path.name)
+
+    def slice_lines(self, key: str, entry: CachedContent, start_line: int, end_line: int) -> str:
+        """Slice an entry's lines, counting its line index against the byte budget once built.
+
+        Args:
+            key: Key from ``make_key``
+            entry: Entry returned by ``get`` or stored with ``put``
+            start_line: First line (1-based)
+            end_line: Last line (inclusive)
+        """
+        if entry._line_offsets is None:
+            offsets = _index_lines(entry.content)
+            with self._lock:
+                if entry._line_offsets is None:
+                    entry._line_offsets = offsets
+                    if self._entries.get(key) is entry:
+                        self._bytes += entry.index_size
+                        self._evict()
+        return entry.slice_lines(start_line, end_line)
+
+    def record_hit(self) -> None:
+        """Record a lookup served from a fresh entry."""
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        """Record a lookup that required a full download."""
+        with self._lock:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit-ratio statistics."""
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "disk_bytes": self._disk_bytes,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_ratio": (self.hits + self.revalidated) / lookups if lookups else 0.0,
+            }
+
+    def _store(self, key: str, entry: CachedContent) -> bool:
+        """Insert into the memory tier and evict LRU entries. Caller holds the lock.
+
+        Returns:
+            Whether the entry fits the memory tier; the previous entry is dropped either way
+        """
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        if entry.size > self.max_bytes:
+            return False
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self._evict()
+        return True
+
+    def _evict(self) -> None:
+        """Evict LRU entries until the memory tier fits its budget. Caller holds the lock."""
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def _disk_path(self, key: str) -> Path:
+        """Get the on-disk location of an entry."""
+        return self.disk_dir / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def _read_disk(self, key: str) -> Optional[CachedContent]:
+        """Read an entry from the disk tier."""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                data["validated_at"] = os.fstat(f.fileno()).st_mtime
+            return CachedContent(**data)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as exc:
+            logger.warning(f"Discarding unreadable content cache file {path}: {exc}")
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self._disk_bytes -= self._disk_files.pop(path.name, 0)
+            return None
+
+    def _write_disk(self, key: str, entry: CachedContent) -> None:
+        """Write an entry to the disk tier and evict the oldest files if over budget."""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        body = json.dumps(
+            {"content": entry.content, "etag": entry.etag, "last_modified": entry.last_modified}
+        ).encode("utf-8")
+        try:
+            tmp_path.write_bytes(body)
+            os.utime(tmp_path, (entry.validated_at, entry.validated_at))
+            tmp_path.replace(path)
+        except OSError as exc:
+            logger.warning(f"Failed to write content cache file {path}: {exc}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        evicted = []
+        with self._lock:
+            self._disk_bytes += len(body) - self._disk_files.pop(path.name, 0)
+            self._disk_files[path.name] = len(body)
+            while self._disk_bytes > self.max_disk_bytes and self._disk_files:
+                name, size = self._disk_files.popitem(last=False)
+                self._disk_bytes -= size
+                evicted.append(name)
+        for name in evicted:
+            (self.disk_dir / name).unlink(missing_ok=True)
+
+    def _remove_disk(self, key: str) -> None:
+        """Delete an entry from the disk tier."""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        path.unlink(missing_ok=True)
+        with self._lock:
+            self._disk_bytes -= self._disk_files.pop(path.name, 0)
+
+    def _scan_disk(self) -> None:
+        """Load the names and sizes of the disk tier files, oldest first."""
+        files = []
+        for path in self.disk_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._disk_files[name] = size
+            self._disk_bytes += size
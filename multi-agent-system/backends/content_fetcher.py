@@ -1,18 +1,47 @@
 """Content fetcher backends for Zoekt and Sourcegraph."""
 
+import sys
 from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from backends.content_cache import CachedContent, ContentCache
+
+DEFAULT_CONTEXT_LINES = 20
 
 
 class AbstractContentFetcher(ABC):
     """Abstract base class for content fetchers."""
 
+    def __init__(self, cache: Optional[ContentCache] = None) -> None:
+        """Initialize content fetcher.
+
+        Args:
+            cache: Optional content cache shared across requests
+        """
+        self.cache = cache
+
     @abstractmethod
-    def get_content(self, repo: str, path: str) -> str:
-        """Get file or directory content.
+    def get_content(
+        self,
+        repo: str,
+        path: str,
+        revision: str = "",
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        around_line: Optional[int] = None,
+        context_lines: int = DEFAULT_CONTEXT_LINES,
+    ) -> str:
+        """Get file or directory content, optionally restricted to a range of lines.
 
         Args:
             repo: Repository path
             path: File or directory path within repository
+            revision: Optional revision (branch, tag or commit), defaults to the default branch
+            start_line: First line to return (1-based, inclusive)
+            end_line: Last line to return (1-based, inclusive)
+            around_line: Return ``context_lines`` lines on each side of this line;
+                takes precedence over start_line/end_line
+            context_lines: Window half-size used with around_line
 
         Returns:
             File content or directory listing
@@ -22,38 +51,111 @@ class AbstractContentFetcher(ABC):
         """
         pass
 
+    @staticmethod
+    def _line_window(
+        start_line: Optional[int],
+        end_line: Optional[int],
+        around_line: Optional[int],
+        context_lines: int,
+    ) -> Optional[Tuple[int, int]]:
+        """Resolve line range arguments to a (start, end) window, or None for the whole file."""
+        if around_line is not None:
+            return around_line - context_lines, around_line + context_lines
+        if start_line is None and end_line is None:
+            return None
+        return start_line or 1, end_line if end_line is not None else sys.maxsize
+
+    def _get_with_cache(
+        self,
+        key: str,
+        fetch: Callable[[Dict[str, str]], Any],
+        window: Optional[Tuple[int, int]] = None,
+    ) -> str:
+        """Serve content from the cache, revalidating or downloading it as needed.
+
+        Args:
+            key: Cache key from ``ContentCache.make_key``
+            fetch: Performs the GET with the given extra headers and returns the response
+            window: Optional (start_line, end_line) to slice the content to
+
+        Returns:
+            File content
+        """
+        if self.cache is None:
+            response = fetch({})
+            response.raise_for_status()
+            entry = CachedContent(content=response.text)
+            return entry.slice_lines(*window) if window else entry.content
+
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record_hit()
+        else:
+            response = fetch(entry.conditional_headers() if entry is not None else {})
+            if response.status_code == 304 and entry is not None:
+                self.cache.mark_validated(key, entry)
+            else:
+                response.raise_for_status()
+                self.cache.record_miss()
+                entry = CachedContent(
+                    content=response.text,
+                    etag=response.headers.get("ETag", ""),
+                    last_modified=response.headers.get("Last-Modified", ""),
+                )
+                self.cache.put(key, entry)
+
+        return self.cache.slice_lines(key, entry, *window) if window else entry.content
+
 
 class ZoektContentFetcher(AbstractContentFetcher):
     """Zoekt content fetcher implementation."""
 
-    def __init__(self, zoekt_url: str) -> None:
+    def __init__(self, zoekt_url: str, cache: Optional[ContentCache] = None) -> None:
         """Initialize Zoekt content fetcher.
 
         Args:
             zoekt_url: Zoekt API base URL
+            cache: Optional content cache
         """
+        super().__init__(cache)
         self.zoekt_url = zoekt_url
 
-    def get_content(self, repo: str, path: str) -> str:
+    def get_content(
+        self,
+        repo: str,
+        path: str,
+        revision: str = "",
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        around_line: Optional[int] = None,
+        context_lines: int = DEFAULT_CONTEXT_LINES,
+    ) -> str:
         """Get content from Zoekt.
-        
+
         Note: The zoekt-nl-query server doesn't expose a content API endpoint yet.
         This is a placeholder that would need to be implemented if needed.
         """
         import requests
 
+        params = {"repo": repo, "path": path}
+        if revision:
+            params["rev"] = revision
+
         # For now, return a message that this endpoint isn't available
         # In the future, you could add a content endpoint to zoekt-nl-query server
         # or use Zoekt's native file content API if available
         try:
             # Try to fetch from a potential content endpoint (not implemented yet)
-            response = requests.get(
-                f"{self.zoekt_url}/api/content",
-                params={"repo": repo, "path": path},
-                timeout=10,
+            return self._get_with_cache(
+                ContentCache.make_key(repo, path, revision),
+                lambda headers: requests.get(
+                    f"{self.zoekt_url}/api/content",
+                    params=params,
+                    headers=headers,
+                    timeout=10,
+                ),
+                self._line_window(start_line, end_line, around_line, context_lines),
             )
-            response.raise_for_status()
-            return response.text
         except requests.exceptions.RequestException:
             # Content fetching not yet implemented in zoekt-nl-query server
             return f"Content fetching for {repo}/{path} is not yet implemented. " \
@@ -63,17 +165,28 @@ class ZoektContentFetcher(AbstractContentFetcher):
 class SourcegraphContentFetcher(AbstractContentFetcher):
     """Sourcegraph content fetcher implementation."""
 
-    def __init__(self, endpoint: str, token: str = "") -> None:
+    def __init__(self, endpoint: str, token: str = "", cache: Optional[ContentCache] = None) -> None:
         """Initialize Sourcegraph content fetcher.
 
         Args:
             endpoint: Sourcegraph API endpoint
             token: Optional API token
+            cache: Optional content cache
         """
+        super().__init__(cache)
         self.endpoint = endpoint
         self.token = token
 
-    def get_content(self, repo: str, path: str) -> str:
+    def get_content(
+        self,
+        repo: str,
+        path: str,
+        revision: str = "",
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        around_line: Optional[int] = None,
+        context_lines: int = DEFAULT_CONTEXT_LINES,
+    ) -> str:
         """Get content from Sourcegraph."""
         import requests
 
@@ -81,12 +194,15 @@ class SourcegraphContentFetcher(AbstractContentFetcher):
         if self.token:
             headers["Authorization"] = f"Bearer {self.token}"
 
-        response = requests.get(
-            f"{self.endpoint}/.api/repos/{repo}/file/{path}",
-            headers=headers,
+        repo_spec = f"{repo}@{revision}" if revision else repo
+        return self._get_with_cache(
+            ContentCache.make_key(repo, path, revision),
+            lambda extra_headers: requests.get(
+                f"{self.endpoint}/.api/repos/{repo_spec}/file/{path}",
+                headers={**headers, **extra_headers},
+            ),
+            self._line_window(start_line, end_line, around_line, context_lines),
         )
-        response.raise_for_status()
-        return response.text
 
 
 class ContentFetcherFactory:
@@ -98,7 +214,7 @@ class ContentFetcherFactory:
 
         Args:
             backend: Backend name ('zoekt' or 'sourcegraph')
-            **kwargs: Backend-specific configuration
+            **kwargs: Backend-specific configuration, plus an optional shared ``cache``
 
         Returns:
             Content fetcher instance
@@ -107,12 +223,12 @@ class ContentFetcherFactory:
             ValueError: If backend is not supported
         """
         backend = backend.lower()
+        cache = kwargs.get("cache")
         if backend == "zoekt":
-            return ZoektContentFetcher(zoekt_url=kwargs.get("zoekt_url", ""))
+            return ZoektContentFetcher(zoekt_url=kwargs.get("zoekt_url", ""), cache=cache)
         elif backend == "sourcegraph":
             return SourcegraphContentFetcher(
-                endpoint=kwargs.get("endpoint", ""), token=kwargs.get("token", "")
+                endpoint=kwargs.get("endpoint", ""), token=kwargs.get("token", ""), cache=cache
             )
         else:
             raise ValueError(f"Unsupported backend: {backend}")
-
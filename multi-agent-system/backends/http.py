@@ -0,0 +1,105 @@
+"""Shared, connection-pooled async HTTP client for search and content backends."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+@dataclass
+class HttpPoolConfig:
+    """Connection pool settings for backend HTTP clients."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    max_connections_per_host: int = 20
+    keepalive_expiry: float = 30.0
+    timeout: float = 30.0
+
+    def limits(self) -> httpx.Limits:
+        """Get the pool limits as ``httpx.Limits``, e.g. for a custom transport."""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+class AsyncHttpPool:
+    """Long-lived ``httpx.AsyncClient`` with keep-alive and per-host connection caps.
+
+    A single pool is meant to be created at startup and shared by every backend
+    client, so repeated requests reuse TCP/TLS connections instead of paying
+    the handshake on every call.
+    """
+
+    def __init__(
+        self,
+        config: Optional[HttpPoolConfig] = None,
+        headers: Optional[Dict[str, str]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        """Initialize the HTTP pool.
+
+        Args:
+            config: Pool settings, defaults to ``HttpPoolConfig()``
+            headers: Optional headers sent with every request
+            transport: Optional custom transport (e.g. ``httpx.MockTransport`` in benchmarks)
+        """
+        self.config = config or HttpPoolConfig()
+        self._client = httpx.AsyncClient(
+            headers=headers,
+            transport=transport,
+            timeout=self.config.timeout,
+            limits=self.config.limits(),
+        )
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Get the semaphore capping concurrent connections to the URL's host."""
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.config.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request and read the full response body.
+
+        Args:
+            method: HTTP method
+            url: Absolute request URL
+            **kwargs: Extra arguments passed to ``httpx.AsyncClient.request``
+
+        Returns:
+            The response, with its body already read
+        """
+        async with self._host_semaphore(url):
+            return await self._client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """Send a GET request."""
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        """Send a POST request."""
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Send a request and yield the response without reading its body.
+
+        The per-host slot is held until the context exits, so the connection
+        is accounted for while the body is being consumed.
+        """
+        async with self._host_semaphore(url):
+            async with self._client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def aclose(self) -> None:
+        """Close all pooled connections."""
+        await self._client.aclose()
@@ -1,22 +1,26 @@
 """Backend models for search and content fetching."""
 
 from dataclasses import dataclass
-from typing import List
+from typing import Tuple
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Match:
     """Represents a match in search results."""
 
     line_number: int
     content: str = ""
+    before: str = ""
+    after: str = ""
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FormattedResult:
-    """Formatted search result."""
+    """Formatted search result.
+
+    Results are immutable so clients and caches can share them without copying.
+    """
 
     repository: str
     filename: str
-    matches: List[Match]
-
+    matches: Tuple[Match, ...] = ()
@@ -0,0 +1,151 @@
+"""Record and replay of backend traffic.
+
+``RecordingTransport`` sits below the search clients' HTTP pool, so replayed
+responses still go through response parsing; ``RecordingContentFetcher`` wraps
+a content fetcher. Both take a ``core.traffic.TrafficRecorder``, which keys the
+traffic by the trace ID of the request being served.
+"""
+
+import base64
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import httpx
+
+from backends.content_fetcher import DEFAULT_CONTEXT_LINES, AbstractContentFetcher
+
+if TYPE_CHECKING:
+    from core.traffic import TrafficRecorder
+
+
+def request_key(request: httpx.Request, body: bytes) -> str:
+    """Identify a backend request by method, path with query and body hash.
+
+    The host is left out, so traffic recorded against one backend URL can be
+    replayed with any other.
+    """
+    key = f"{request.method} {request.url.raw_path.decode('ascii')}"
+    if body:
+        key += f" {hashlib.sha256(body).hexdigest()[:16]}"
+    return key
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """HTTP transport that records backend responses, or serves recorded ones.
+
+    While recording, each response body is read in full before it is returned,
+    so streamed responses arrive in one piece.
+    """
+
+    def __init__(
+        self, recorder: "TrafficRecorder", transport: Optional[httpx.AsyncBaseTransport] = None
+    ) -> None:
+        """Initialize recording transport.
+
+        Args:
+            recorder: Traffic recorder in ``record`` or ``replay`` mode
+            transport: Transport sending the requests while recording; defaults
+                to ``httpx.AsyncHTTPTransport()``
+        """
+        self.recorder = recorder
+        self._transport = transport
+        if self._transport is None and recorder.recording:
+            self._transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request and record its response, or replay the recorded response."""
+        key = request_key(request, await request.aread())
+        if self.recorder.replaying:
+            return self._response(request, self.recorder.replay("http", key))
+
+        assert self._transport is not None
+        response = await self._transport.handle_async_request(request)
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        value: Dict[str, Any] = {
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", ""),
+        }
+        try:
+            value["text"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            value["base64"] = base64.b64encode(body).decode("ascii")
+        self.recorder.record("http", key, value)
+        return self._response(request, value)
+
+    @staticmethod
+    def _response(request: httpx.Request, value: Dict[str, Any]) -> httpx.Response:
+        """Build a response from a recorded value."""
+        if "text" in value:
+            content = value["text"].encode("utf-8")
+        else:
+            content = base64.b64decode(value.get("base64", ""))
+        headers = {"content-type": value["content_type"]} if value.get("content_type") else {}
+        return httpx.Response(value["status"], headers=headers, content=content, request=request)
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        if self._transport is not None:
+            await self._transport.aclose()
+
+
+class RecordingContentFetcher(AbstractContentFetcher):
+    """Content fetcher that records fetched content, or serves recorded content.
+
+    Missing paths (``ValueError``) are recorded too and raised again on replay;
+    other failures are not recorded.
+    """
+
+    def __init__(
+        self, fetcher: Optional[AbstractContentFetcher], recorder: "TrafficRecorder"
+    ) -> None:
+        """Initialize recording content fetcher.
+
+        Args:
+            fetcher: Fetcher of the real backend; not used in replay mode
+            recorder: Traffic recorder in ``record`` or ``replay`` mode
+        """
+        super().__init__(cache=None)
+        self.fetcher = fetcher
+        self.recorder = recorder
+
+    def get_content(
+        self,
+        repo: str,
+        path: str,
+        revision: str = "",
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        around_line: Optional[int] = None,
+        context_lines: int = DEFAULT_CONTEXT_LINES,
+    ) -> str:
+        """Get file or directory content from the backend or the recording."""
+        key = json.dumps(
+            [repo, path, revision, start_line, end_line, around_line, context_lines],
+            separators=(",", ":"),
+        )
+        if self.recorder.replaying:
+            value = self.recorder.replay("content", key)
+            if "error" in value:
+                raise ValueError(value["error"])
+            return value["content"]
+
+        assert self.fetcher is not None
+        try:
+            content = self.fetcher.get_content(
+                repo,
+                path,
+                revision,
+                start_line=start_line,
+                end_line=end_line,
+                around_line=around_line,
+                context_lines=context_lines,
+            )
+        except ValueError as exc:
+            self.recorder.record("content", key, {"error": str(exc)})
+            raise
+        self.recorder.record("content", key, {"content": content})
+        return content
@@ -1,39 +1,266 @@
 """Search backends for Zoekt and Sourcegraph."""
 
+import json
+import time
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from backends.http import AsyncHttpPool
+from backends.models import FormattedResult, Match
+
+try:
+    import ijson
+except ImportError:  # optional: streaming parse of large Zoekt responses
+    ijson = None
+
+# Responses below this size are parsed in one go; larger ones are streamed
+STREAM_PARSE_THRESHOLD = 256 * 1024
+
+# Default and maximum number of files returned by a search
+DEFAULT_NUM_RESULTS = 30
+MAX_NUM_RESULTS = 100
+
+
+def _zoekt_search_params(
+    query: str,
+    num_results: Optional[int] = None,
+    max_line_matches: Optional[int] = None,
+    context_lines: int = 0,
+) -> dict:
+    """Build query parameters for the zoekt-nl-query ``/api/nl-search`` endpoint.
+
+    The limits are pushed down so the server only scores, serializes and
+    sends the files and line matches the caller is going to keep.
+    """
+    # Use /api/nl-search with direct=true to send Zoekt query directly
+    # The zoekt-nl-query server accepts queries and returns results
+    params = {
+        "q": query,
+        "mode": "keyword",  # Use keyword mode for direct Zoekt queries
+        "direct": "true",   # Skip NL translation, use query as-is
+    }
+    if num_results:
+        params["num"] = str(num_results)
+    if max_line_matches:
+        params["max_line_matches"] = str(max_line_matches)
+    if context_lines:
+        params["context_lines"] = str(context_lines)
+    return params
+
+
+def _zoekt_file(file_match: dict, max_line_matches: Optional[int] = None) -> FormattedResult:
+    """Convert a zoekt ``FileMatch`` straight into a ``FormattedResult``.
+
+    ``max_line_matches`` is also enforced here in case the server ignores it.
+    """
+    line_matches = file_match.get("LineMatches") or ()
+    if max_line_matches:
+        line_matches = line_matches[:max_line_matches]
+    return FormattedResult(
+        repository=file_match.get("Repository", ""),
+        filename=file_match.get("FileName", ""),
+        # Before/After are only present when context lines were requested
+        matches=tuple(
+            Match(
+                line_match.get("LineNum", 0),
+                str(line_match.get("Line", "")),
+                str(line_match.get("Before") or ""),
+                str(line_match.get("After") or ""),
+            )
+            for line_match in line_matches
+        ),
+    )
+
+
+def _result_from_dict(result: dict, max_line_matches: Optional[int] = None) -> FormattedResult:
+    """Convert an already-compact result dict into a ``FormattedResult``."""
+    matches = result.get("matches") or ()
+    if max_line_matches:
+        matches = matches[:max_line_matches]
+    return FormattedResult(
+        repository=result.get("repository", ""),
+        filename=result.get("filename", ""),
+        matches=tuple(
+            Match(
+                match.get("line_number", 0),
+                match.get("content", ""),
+                match.get("before", ""),
+                match.get("after", ""),
+            )
+            for match in matches
+        ),
+    )
+
+
+def _parse_zoekt_response(
+    result: dict, num_results: int, max_line_matches: Optional[int] = None
+) -> List[FormattedResult]:
+    """Extract file matches from a zoekt-nl-query ``/api/nl-search`` response.
+
+    Only ``results.Files`` is read, like ``_parse_zoekt_stream`` does, so a
+    response parses the same way whatever its size.
+    """
+    files = []
+    # Results from zoekt-nl-query server are in zoekt.SearchResult format
+    # When JSON marshaled, Files becomes a list
+    zoekt_result = result.get("results")
+    if isinstance(zoekt_result, dict):
+        for file_match in zoekt_result.get("Files") or []:
+            files.append(_zoekt_file(file_match, max_line_matches))
+            if len(files) >= num_results:
+                break
+    return files
+
+
+async def _parse_zoekt_stream(
+    chunks: AsyncIterator[bytes],
+    num_results: int,
+    max_line_matches: Optional[int] = None,
+    threshold: int = STREAM_PARSE_THRESHOLD,
+) -> List[FormattedResult]:
+    """Incrementally extract file matches from a streamed ``/api/nl-search`` body.
+
+    Bodies smaller than ``threshold`` bytes are buffered and parsed in one go,
+    which is faster for small responses. Larger bodies are fed to ijson chunk
+    by chunk; each file match is converted to a ``FormattedResult`` as soon as
+    it is complete, and reading stops once ``num_results`` files have been seen.
+    """
+    buffered: List[bytes] = []
+    buffered_size = 0
+    files: List[FormattedResult] = []
+    items = None
+    parser = None
+
+    async for chunk in chunks:
+        if parser is None:
+            buffered.append(chunk)
+            buffered_size += len(chunk)
+            if buffered_size < threshold:
+                continue
+            items = ijson.sendable_list()
+            parser = ijson.items_coro(items, "results.Files.item")
+            chunk = b"".join(buffered)
+            buffered = []
+
+        parser.send(chunk)
+        files.extend(_zoekt_file(file_match, max_line_matches) for file_match in items)
+        del items[:]
+        if len(files) >= num_results:
+            return files[:num_results]
+
+    if parser is None:
+        return _parse_zoekt_response(
+            json.loads(b"".join(buffered)), num_results, max_line_matches
+        )
 
-from backends.models import FormattedResult
+    parser.close()
+    files.extend(_zoekt_file(file_match, max_line_matches) for file_match in items)
+    return files[:num_results]
+
+
+def _sourcegraph_search_payload(query: str, num_results: int) -> dict:
+    """Build the GraphQL payload for a Sourcegraph search."""
+    return {"query": f'{{ search(query: "{query}", first: {num_results}) {{ results }} }}'}
+
+
+def _parse_sourcegraph_response(
+    result: dict, num_results: int, max_line_matches: Optional[int] = None
+) -> List[FormattedResult]:
+    """Extract results from a Sourcegraph GraphQL search response."""
+    results = result.get("data", {}).get("search", {}).get("results", [])
+    return [_result_from_dict(item, max_line_matches) for item in results[:num_results]]
+
+
+def merge_results(
+    result_lists: Sequence[List[FormattedResult]],
+    num_results: int,
+    max_line_matches: Optional[int] = None,
+) -> List[FormattedResult]:
+    """Merge the results of several searches into one list of distinct files.
+
+    A file found by several searches appears once, with the union of its line
+    matches in line order. Files found by more searches rank first, then files
+    ranked higher by any single search.
+
+    Args:
+        result_lists: Results of each search, each in backend rank order
+        num_results: Maximum number of files to return
+        max_line_matches: Maximum number of line matches per merged file
+    """
+    # (repository, filename) -> [hits, best rank, first seen, results for the file]
+    files: Dict[Tuple[str, str], list] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results):
+            entry = files.get((result.repository, result.filename))
+            if entry is None:
+                files[(result.repository, result.filename)] = [1, rank, len(files), [result]]
+            else:
+                entry[0] += 1
+                entry[1] = min(entry[1], rank)
+                entry[3].append(result)
+
+    ranked = sorted(files.values(), key=lambda entry: (-entry[0], entry[1], entry[2]))
+    merged = []
+    for _, _, _, results in ranked[:num_results]:
+        first = results[0]
+        if len(results) == 1:
+            matches = first.matches
+        else:
+            by_line: Dict[int, Match] = {}
+            for result in results:
+                for match in result.matches:
+                    by_line.setdefault(match.line_number, match)
+            matches = tuple(by_line[line] for line in sorted(by_line))
+        if max_line_matches is not None:
+            matches = matches[:max_line_matches]
+        if matches is first.matches:
+            merged.append(first)
+        else:
+            merged.append(
+                FormattedResult(repository=first.repository, filename=first.filename, matches=matches)
+            )
+    return merged
 
 
 class AbstractSearchClient(ABC):
     """Abstract base class for search clients."""
 
     @abstractmethod
-    def search(self, query: str, num_results: int) -> List[dict]:
+    def search(
+        self,
+        query: str,
+        num_results: int,
+        max_line_matches: Optional[int] = None,
+        context_lines: int = 0,
+    ) -> List[FormattedResult]:
         """Search for code.
 
         Args:
             query: Search query string
             num_results: Maximum number of results
+            max_line_matches: Maximum number of line matches per file, unlimited if None
+            context_lines: Lines of context around each line match, where supported
 
         Returns:
-            List of search results
+            List of formatted results
         """
         pass
 
-    @abstractmethod
-    def format_results(self, results: List[dict], num_results: int) -> List[FormattedResult]:
+    def format_results(
+        self, results: List[FormattedResult], num_results: int
+    ) -> List[FormattedResult]:
         """Format search results.
 
+        ``search`` already returns formatted results, so this only truncates.
+
         Args:
-            results: Raw search results
+            results: Results from ``search``
             num_results: Maximum number of results
 
         Returns:
             List of formatted results
         """
-        pass
+        return results[:num_results]
 
 
 class ZoektSearchClient(AbstractSearchClient):
@@ -47,68 +274,23 @@ class ZoektSearchClient(AbstractSearchClient):
         """
         self.base_url = base_url
 
-    def search(self, query: str, num_results: int) -> List[dict]:
+    def search(
+        self,
+        query: str,
+        num_results: int,
+        max_line_matches: Optional[int] = None,
+        context_lines: int = 0,
+    ) -> List[FormattedResult]:
         """Search using Zoekt."""
         import requests
 
-        # Use /api/nl-search with direct=true to send Zoekt query directly
-        # The zoekt-nl-query server accepts queries and returns results
         response = requests.get(
             f"{self.base_url}/api/nl-search",
-            params={
-                "q": query,
-                "mode": "keyword",  # Use keyword mode for direct Zoekt queries
-                "direct": "true",   # Skip NL translation, use query as-is
-            },
+            params=_zoekt_search_params(query, num_results, max_line_matches, context_lines),
             timeout=30,
         )
         response.raise_for_status()
-        result = response.json()
-        
-        # Extract files from results
-        files = []
-        if "results" in result and result.get("results"):
-            # Results from zoekt-nl-query server are in zoekt.SearchResult format
-            # When JSON marshaled, Files becomes a list
-            zoekt_result = result["results"]
-            if isinstance(zoekt_result, dict) and "Files" in zoekt_result:
-                for file_match in zoekt_result["Files"]:
-                    matches = []
-                    if "LineMatches" in file_match:
-                        for line_match in file_match["LineMatches"]:
-                            matches.append({
-                                "line_number": line_match.get("LineNum", 0),
-                                "content": str(line_match.get("Line", "")),
-                            })
-                    files.append({
-                        "repository": file_match.get("Repository", ""),
-                        "filename": file_match.get("FileName", ""),
-                        "matches": matches,
-                    })
-            # Alternative: handle if Files is at top level
-            elif isinstance(zoekt_result, list):
-                files = zoekt_result[:num_results]
-        
-        return files[:num_results]
-
-    def format_results(self, results: List[dict], num_results: int) -> List[FormattedResult]:
-        """Format Zoekt results."""
-        from backends.models import FormattedResult, Match
-
-        formatted = []
-        for result in results[:num_results]:
-            matches = [
-                Match(line_number=match.get("line_number", 0), content=match.get("content", ""))
-                for match in result.get("matches", [])
-            ]
-            formatted.append(
-                FormattedResult(
-                    repository=result.get("repository", ""),
-                    filename=result.get("filename", ""),
-                    matches=matches,
-                )
-            )
-        return formatted
+        return _parse_zoekt_response(response.json(), num_results, max_line_matches)
 
 
 class SourcegraphSearchClient(AbstractSearchClient):
@@ -124,7 +306,13 @@ class SourcegraphSearchClient(AbstractSearchClient):
         self.endpoint = endpoint
         self.token = token
 
-    def search(self, query: str, num_results: int) -> List[dict]:
+    def search(
+        self,
+        query: str,
+        num_results: int,
+        max_line_matches: Optional[int] = None,
+        context_lines: int = 0,
+    ) -> List[FormattedResult]:
         """Search using Sourcegraph."""
         # Implementation would make HTTP request to Sourcegraph API
         # This is a placeholder
@@ -136,30 +324,192 @@ class SourcegraphSearchClient(AbstractSearchClient):
 
         response = requests.post(
             f"{self.endpoint}/.api/graphql",
-            json={"query": f'{{ search(query: "{query}", first: {num_results}) {{ results }} }}'},
+            json=_sourcegraph_search_payload(query, num_results),
             headers=headers,
         )
         response.raise_for_status()
-        return response.json().get("data", {}).get("search", {}).get("results", [])
-
-    def format_results(self, results: List[dict], num_results: int) -> List[FormattedResult]:
-        """Format Sourcegraph results."""
-        from backends.models import FormattedResult, Match
-
-        formatted = []
-        for result in results[:num_results]:
-            matches = [
-                Match(line_number=match.get("line_number", 0), content=match.get("content", ""))
-                for match in result.get("matches", [])
-            ]
-            formatted.append(
-                FormattedResult(
-                    repository=result.get("repository", ""),
-                    filename=result.get("filename", ""),
-                    matches=matches,
-                )
+        return _parse_sourcegraph_response(response.json(), num_results, max_line_matches)
+
+
+class AbstractAsyncSearchClient(ABC):
+    """Abstract base class for async search clients.
+
+    Async clients share a long-lived ``AsyncHttpPool`` so concurrent searches
+    reuse pooled keep-alive connections and never block the event loop.
+    """
+
+    def __init__(self, http_pool: Optional[AsyncHttpPool] = None) -> None:
+        """Initialize async search client.
+
+        Args:
+            http_pool: Shared HTTP pool; a private pool is created if omitted
+        """
+        self._owns_pool = http_pool is None
+        self.http_pool = http_pool or AsyncHttpPool()
+
+    @abstractmethod
+    async def search(
+        self,
+        query: str,
+        num_results: int,
+        max_line_matches: Optional[int] = None,
+        context_lines: int = 0,
+    ) -> List[FormattedResult]:
+        """Search for code.
+
+        Args:
+            query: Search query string
+            num_results: Maximum number of results
+            max_line_matches: Maximum number of line matches per file, unlimited if None
+            context_lines: Lines of context around each line match, where supported
+
+        Returns:
+            List of formatted results
+        """
+        pass
+
+    def format_results(
+        self, results: List[FormattedResult], num_results: int
+    ) -> List[FormattedResult]:
+        """Format search results.
+
+        ``search`` already returns formatted results, so this only truncates.
+
+        Args:
+            results: Results from ``search``
+            num_results: Maximum number of results
+
+        Returns:
+            List of formatted results
+        """
+        return results[:num_results]
+
+    async def aclose(self) -> None:
+        """Close the HTTP pool if this client created it."""
+        if self._owns_pool:
+            await self.http_pool.aclose()
+
+
+class AsyncZoektSearchClient(AbstractAsyncSearchClient):
+    """Async Zoekt search client implementation."""
+
+    def __init__(
+        self,
+        base_url: str,
+        http_pool: Optional[AsyncHttpPool] = None,
+        stream_parse: Optional[bool] = None,
+    ) -> None:
+        """Initialize async Zoekt client.
+
+        Args:
+            base_url: Zoekt API base URL
+            http_pool: Shared HTTP pool
+            stream_parse: Parse responses incrementally and stop after ``num_results``
+                files; defaults to True when ``ijson`` is installed
+        """
+        super().__init__(http_pool)
+        self.base_url = base_url
+        if stream_parse is None:
+            stream_parse = ijson is not None
+        elif stream_parse and ijson is None:
+            raise ValueError("stream_parse requires the 'ijson' package")
+        self.stream_parse = stream_parse
+
+    async def search(
+        self,
+        query: str,
+        num_results: int,
+        max_line_matches: Optional[int] = None,
+        context_lines: int = 0,
+    ) -> List[FormattedResult]:
+        """Search using Zoekt."""
+        url = f"{self.base_url}/api/nl-search"
+        params = _zoekt_search_params(query, num_results, max_line_matches, context_lines)
+        if not self.stream_parse:
+            response = await self.http_pool.get(url, params=params)
+            response.raise_for_status()
+            return _parse_zoekt_response(response.json(), num_results, max_line_matches)
+
+        # Leaving the stream early drops the rest of a large body unread
+        async with self.http_pool.stream("GET", url, params=params) as response:
+            response.raise_for_status()
+            return await _parse_zoekt_stream(
+                response.aiter_bytes(), num_results, max_line_matches
             )
-        return formatted
+
+
+class AsyncSourcegraphSearchClient(AbstractAsyncSearchClient):
+    """Async Sourcegraph search client implementation."""
+
+    def __init__(
+        self, endpoint: str, token: str = "", http_pool: Optional[AsyncHttpPool] = None
+    ) -> None:
+        """Initialize async Sourcegraph client.
+
+        Args:
+            endpoint: Sourcegraph API endpoint
+            token: Optional API token
+            http_pool: Shared HTTP pool
+        """
+        super().__init__(http_pool)
+        self.endpoint = endpoint
+        self.token = token
+
+    async def search(
+        self,
+        query: str,
+        num_results: int,
+        max_line_matches: Optional[int] = None,
+        context_lines: int = 0,
+    ) -> List[FormattedResult]:
+        """Search using Sourcegraph."""
+        headers = {}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        response = await self.http_pool.post(
+            f"{self.endpoint}/.api/graphql",
+            json=_sourcegraph_search_payload(query, num_results),
+            headers=headers,
+        )
+        response.raise_for_status()
+        return _parse_sourcegraph_response(response.json(), num_results, max_line_matches)
+
+
+class TimedSearchClient(AbstractAsyncSearchClient):
+    """Async search client that reports the latency of every search, e.g. to metrics."""
+
+    def __init__(
+        self, client: AbstractAsyncSearchClient, observe: Callable[[float], None]
+    ) -> None:
+        """Initialize timed search client.
+
+        Args:
+            client: Search client to delegate to
+            observe: Called with the duration of each search in seconds
+        """
+        super().__init__(client.http_pool)
+        self._owns_pool = False
+        self.client = client
+        self.observe = observe
+
+    async def search(
+        self,
+        query: str,
+        num_results: int,
+        max_line_matches: Optional[int] = None,
+        context_lines: int = 0,
+    ) -> List[FormattedResult]:
+        """Search with the wrapped client and report how long it took."""
+        start = time.perf_counter()
+        try:
+            return await self.client.search(query, num_results, max_line_matches, context_lines)
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    async def aclose(self) -> None:
+        """Close the wrapped client."""
+        await self.client.aclose()
 
 
 class SearchClientFactory:
@@ -189,3 +539,33 @@ class SearchClientFactory:
         else:
             raise ValueError(f"Unsupported backend: {backend}")
 
+    @staticmethod
+    def create_async_client(backend: str, **kwargs) -> AbstractAsyncSearchClient:
+        """Create an async search client for the given backend.
+
+        Args:
+            backend: Backend name ('zoekt' or 'sourcegraph')
+            **kwargs: Backend-specific configuration, plus an optional shared ``http_pool``
+
+        Returns:
+            Async search client instance
+
+        Raises:
+            ValueError: If backend is not supported
+        """
+        backend = backend.lower()
+        http_pool = kwargs.get("http_pool")
+        if backend == "zoekt":
+            return AsyncZoektSearchClient(
+                base_url=kwargs.get("base_url", ""),
+                http_pool=http_pool,
+                stream_parse=kwargs.get("stream_parse"),
+            )
+        elif backend == "sourcegraph":
+            return AsyncSourcegraphSearchClient(
+                endpoint=kwargs.get("endpoint", ""),
+                token=kwargs.get("token", ""),
+                http_pool=http_pool,
+            )
+        else:
+            raise ValueError(f"Unsupported backend: {backend}")
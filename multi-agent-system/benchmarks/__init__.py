@@ -0,0 +1,3 @@
+"""Micro-benchmarks for hot paths of the multi-agent system."""
+
+__all__ = []
@@ -0,0 +1,323 @@
+"""End-to-end latency benchmark of agentic_search against local mock services.
+
+Starts ``benchmarks.mock_services`` (LLM provider and zoekt-nl-query stand-in),
+the code search server and the context server as subprocesses, then replays a
+question set against ``agentic_search`` at a fixed rate (open loop: requests
+start on schedule whether or not earlier ones finished).
+
+Stages are measured where they can be observed:
+
+- ``end_to_end``: the ``agentic_search`` call as seen by the client
+- ``mcp_tool_call``: each tool call of the snippet finder, from its ``tool_call``
+  to its result progress notification (MCP round trip, code search server, backend)
+- ``model_and_agent``: per request, end to end minus the tool calls and pipeline steps
+- ``reformulate`` / ``batch_search``: the pipeline steps (``--pipeline`` only)
+- ``llm_call`` / ``backend_search`` / ``backend_content``: each request as
+  served by the mock services, including their configured latency
+
+Caches and request coalescing are disabled unless ``--caches`` is given, since
+a replayed question set would otherwise mostly measure cache hits.
+
+Usage:
+    python -m benchmarks.bench_e2e --requests 50 --qps 2 --llm-latency-ms 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastmcp import Client
+
+from evaluator.runner import percentile
+
+ROOT = Path(__file__).parent.parent
+
+DEFAULT_QUESTIONS = [
+    "How does the HTTP server handle graceful shutdown?",
+    "Where are database connections pooled?",
+    "How is request authentication implemented?",
+    "Where is the retry logic for outgoing requests?",
+    "How are background jobs scheduled?",
+    "Where is the configuration loaded from environment variables?",
+    "How does the cache invalidate stale entries?",
+    "Where are metrics exported?",
+]
+
+
+class RequestTimeline:
+    """Progress notifications of one agentic_search call, timestamped on arrival."""
+
+    def __init__(self) -> None:
+        """Initialize request timeline."""
+        self.start = time.perf_counter()
+        self.events: List[tuple] = []
+
+    async def on_progress(self, progress: float, total: Optional[float], message: Optional[str]) -> None:
+        """Record a progress notification."""
+        try:
+            event = json.loads(message or "{}")
+        except ValueError:
+            return
+        self.events.append((time.perf_counter(), event))
+
+    def tool_calls_ms(self) -> List[float]:
+        """Get the duration of each tool call, matching calls and results per tool."""
+        pending: Dict[str, List[float]] = {}
+        durations = []
+        for timestamp, event in self.events:
+            if event.get("type") == "tool_call":
+                pending.setdefault(event.get("tool", ""), []).append(timestamp)
+            elif event.get("type") in ("files_found", "tool_result"):
+                starts = pending.get(event.get("tool", ""))
+                if starts:
+                    durations.append((timestamp - starts.pop(0)) * 1000)
+        return durations
+
+    def step_ms(self, event_type: str, since: Optional[str] = None) -> Optional[float]:
+        """Get the time from the start (or a previous event) to the first event of a type."""
+        times = {}
+        for timestamp, event in self.events:
+            times.setdefault(event.get("type"), timestamp)
+        if event_type not in times or (since and since not in times):
+            return None
+        return (times[event_type] - (times[since] if since else self.start)) * 1000
+
+
+def _free_port() -> int:
+    """Get a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _spawn(args: List[str], env: Dict[str, str], log_dir: Path, name: str) -> subprocess.Popen:
+    """Start a subprocess from the repository root, logging to a file."""
+    log = (log_dir / f"{name}.log").open("w")
+    return subprocess.Popen(
+        [sys.executable, *args], cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+async def _wait_for_mcp(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    """Wait until an MCP server lists its tools."""
+    deadline = time.monotonic() + timeout
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            async with Client(url) as client:
+                await client.list_tools()
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.5)
+
+
+async def _wait_for_http(url: str, timeout: float = 30.0) -> None:
+    """Wait until an HTTP endpoint answers."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+
+async def warm_up(url: str, questions: List[str], requests: int, pipeline: bool) -> None:
+    """Send a few sequential requests so agent pools and connections are warm."""
+    async with Client(url, timeout=300) as client:
+        for i in range(requests):
+            question = questions[i % len(questions)]
+            await client.call_tool("agentic_search", {"question": question, "pipeline": pipeline})
+
+
+async def replay(
+    url: str, questions: List[str], requests: int, qps: float, pipeline: bool
+) -> Dict[str, Any]:
+    """Send agentic_search calls at a fixed rate and collect their timelines."""
+    arguments: Dict[str, Any] = {"pipeline": pipeline}
+    async with Client(url, timeout=300) as client:
+        timelines: List[RequestTimeline] = []
+        errors: List[str] = []
+        end_to_end: List[float] = []
+
+        async def one(question: str) -> None:
+            timeline = RequestTimeline()
+            try:
+                await client.call_tool(
+                    "agentic_search",
+                    {"question": question, **arguments},
+                    progress_handler=timeline.on_progress,
+                )
+            except Exception as exc:
+                errors.append(f"{type(exc).__name__}: {exc}")
+                return
+            end_to_end.append((time.perf_counter() - timeline.start) * 1000)
+            timelines.append(timeline)
+
+        tasks = []
+        start = time.perf_counter()
+        for i in range(requests):
+            delay = start + i / qps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(questions[i % len(questions)])))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    stages: Dict[str, List[float]] = {"end_to_end": end_to_end, "mcp_tool_call": [], "model_and_agent": []}
+    for timeline, total_ms in zip(timelines, end_to_end):
+        tool_calls = timeline.tool_calls_ms()
+        stages["mcp_tool_call"].extend(tool_calls)
+        accounted_ms = sum(tool_calls)
+        for stage, event_type, since in (
+            ("reformulate", "queries", None),
+            ("batch_search", "candidates", "queries"),
+        ):
+            step = timeline.step_ms(event_type, since)
+            if step is not None:
+                stages.setdefault(stage, []).append(step)
+                accounted_ms += step
+        stages["model_and_agent"].append(total_ms - accounted_ms)
+    return {"stages": stages, "errors": errors, "elapsed_s": elapsed}
+
+
+def report(stages: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """Compute count and percentiles per stage."""
+    return {
+        stage: {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": max(values) if values else 0.0,
+        }
+        for stage, values in stages.items()
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the services, replay the questions and collect the stage latencies."""
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        questions = [line.strip() for line in args.questions.read_text().splitlines() if line.strip()]
+
+    port_names = ("mock", "codesearch", "codesearch_sse", "context", "context_sse")
+    ports = {name: _free_port() for name in port_names}
+    mock_url = f"http://127.0.0.1:{ports['mock']}"
+    codesearch_url = f"http://127.0.0.1:{ports['codesearch']}/codesearch/mcp"
+    context_url = f"http://127.0.0.1:{ports['context']}/contextprovider/mcp"
+    caches = "true" if args.caches else "false"
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "LANGFUSE_ENABLED": "false",
+        "SEARCH_BACKEND": "zoekt",
+        "ZOEKT_API_URL": mock_url,
+        "DEFAULT_BASE_URL": f"{mock_url}/v1",
+        "OPENAI_API_KEY": "benchmark",
+        "MCP_SERVER_URL": codesearch_url,
+        "SEARCH_CACHE_ENABLED": caches,
+        "CONTENT_CACHE_ENABLED": caches,
+        "SEARCH_COALESCING_ENABLED": caches,
+        "ANSWER_CACHE_ENABLED": caches,
+        "REQUEST_COALESCING_ENABLED": caches,
+    }
+    log_dir = Path(args.log_dir or tempfile.mkdtemp(prefix="bench_e2e_"))
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    processes = []
+    try:
+        mock_args = [
+            "--port", str(ports["mock"]),
+            "--llm-latency-ms", str(args.llm_latency_ms),
+            "--backend-latency-ms", str(args.backend_latency_ms),
+            "--tool-calls", str(args.tool_calls),
+        ]
+        processes.append(
+            _spawn(["-m", "benchmarks.mock_services", *mock_args], env, log_dir, "mock_services")
+        )
+        await _wait_for_http(f"{mock_url}/_mock/stats")
+
+        for name, url in (("codesearch", codesearch_url), ("context", context_url)):
+            server_env = {
+                **env,
+                "MCP_STREAMABLE_HTTP_PORT": str(ports[name]),
+                "MCP_SSE_PORT": str(ports[f"{name}_sse"]),
+            }
+            process = _spawn(["-m", f"servers.{name}.server"], server_env, log_dir, name)
+            processes.append(process)
+            await _wait_for_mcp(url, process)
+
+        await warm_up(context_url, questions, args.warmup, args.pipeline)
+        async with httpx.AsyncClient() as http:
+            await http.post(f"{mock_url}/_mock/reset")
+            result = await replay(context_url, questions, args.requests, args.qps, args.pipeline)
+            mock_stats = (await http.get(f"{mock_url}/_mock/stats")).json()
+        for stage, values in mock_stats.items():
+            result["stages"][f"{stage}_call" if stage == "llm" else stage] = values
+        result["log_dir"] = str(log_dir)
+        return result
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--qps", type=float, default=2.0)
+    parser.add_argument("--warmup", type=int, default=2, help="Sequential requests before measuring")
+    parser.add_argument("--questions", type=Path, help="File with one question per line")
+    parser.add_argument("--pipeline", action="store_true", help="Run agentic_search in pipeline mode")
+    parser.add_argument("--caches", action="store_true", help="Keep caches and coalescing enabled")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--backend-latency-ms", type=float, default=20.0)
+    parser.add_argument("--tool-calls", type=int, default=2, help="Tool calls per snippet finder run")
+    parser.add_argument("--log-dir", help="Where the servers' logs go; a temporary directory by default")
+    parser.add_argument("--output", type=Path, help="Write the report as JSON, e.g. to compare runs in CI")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    stages = report(result["stages"])
+
+    print(
+        f"{args.requests} requests at {args.qps} qps in {result['elapsed_s']:.1f} s, "
+        f"{len(result['errors'])} errors (server logs in {result['log_dir']})"
+    )
+    print(f"{'stage':>16} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, row in stages.items():
+        print(
+            f"{stage:>16} {row['count']:>6} {row['p50']:>9.1f} {row['p95']:>9.1f} "
+            f"{row['p99']:>9.1f} {row['max']:>9.1f}"
+        )
+    for error in result["errors"][:5]:
+        print(f"error: {error}")
+
+    if args.output:
+        summary = {"stages": stages, "errors": result["errors"], "args": vars(args)}
+        args.output.write_text(json.dumps(summary, default=str, indent=2))
+
+
+if __name__ == "__main__":
+    main()
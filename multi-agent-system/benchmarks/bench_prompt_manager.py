@@ -0,0 +1,75 @@
+"""Benchmark per-request prompt cost with and without the process-wide prompt cache.
+
+Each simulated request does what an agent does: create a ``PromptManager`` for
+its section and render the system and user prompts. "uncached" clears every
+cache before each request, which is what every request paid before the caches
+existed (parse ``prompts.yaml`` and compile templates again). "bytecode" keeps
+only the on-disk Jinja bytecode cache, like the first request of a new process.
+
+Usage:
+    python -m benchmarks.bench_prompt_manager --requests 500
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from core import PromptManager
+
+PROMPTS_FILE = Path(__file__).parent.parent / "prompts" / "prompts.yaml"
+SECTIONS = ("agents.code_snippet_finder", "agents.query_reformater")
+
+
+def one_request(section: str, hot_reload: bool) -> None:
+    """Load and render the prompts of one agent run."""
+    prompt_manager = PromptManager(PROMPTS_FILE, section_path=section, hot_reload=hot_reload)
+    prompt_manager.render_prompt("system_prompt")
+    prompt_manager.render_prompt("user_prompt", question="Where is the scheduler's main loop?")
+
+
+def measure(requests: int, clear: Optional[str], hot_reload: bool = False) -> List[float]:
+    """Return per-request latencies in microseconds.
+
+    Args:
+        requests: Number of simulated requests
+        clear: Cache to clear before each request: "all", "memory" or None
+        hot_reload: Check the prompt file for changes on every load
+    """
+    latencies = []
+    for i in range(requests):
+        if clear:
+            PromptManager.clear_cache(bytecode=clear == "all")
+        start = time.perf_counter()
+        one_request(SECTIONS[i % len(SECTIONS)], hot_reload)
+        latencies.append((time.perf_counter() - start) * 1_000_000)
+    return latencies
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests against {PROMPTS_FILE.name} ({PROMPTS_FILE.stat().st_size} bytes)")
+    for label, clear, hot_reload in (
+        ("uncached", "all", False),
+        ("bytecode", "memory", False),
+        ("cached", None, False),
+        ("cached+reload", None, True),
+    ):
+        PromptManager.clear_cache()
+        latencies = measure(args.requests, clear, hot_reload)
+        print(
+            f"{label:>14}: median {statistics.median(latencies):10.1f} us  "
+            f"p95 {statistics.quantiles(latencies, n=20)[-1]:10.1f} us"
+        )
+
+    for prompt_path, stats in sorted(PromptManager.render_stats().items()):
+        print(f"render {prompt_path}: mean {stats.mean_ms * 1000:.1f} us over {stats.renders} renders")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark building search results via intermediate dicts vs. one-pass slotted models.
+
+Usage:
+    python -m benchmarks.bench_result_models --files 3000 --line-matches 10
+"""
+
+import argparse
+import base64
+import gc
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, List, Tuple
+
+from backends.search import _zoekt_file
+
+
+@dataclass
+class LegacyMatch:
+    """Match model before results became slotted and frozen."""
+
+    line_number: int
+    content: str = ""
+
+
+@dataclass
+class LegacyFormattedResult:
+    """FormattedResult model before results became slotted and frozen."""
+
+    repository: str
+    filename: str
+    matches: List[LegacyMatch]
+
+
+def build_file_matches(num_files: int, line_matches: int) -> List[dict]:
+    """Build synthetic zoekt ``FileMatch`` dicts as decoded from JSON."""
+    return [
+        {
+            "FileName": f"pkg/module_{i}/handler.go",
+            "Repository": "github.com/example/service",
+            "LineMatches": [
+                {
+                    "Line": base64.b64encode(f"func Handler{j}(w http.ResponseWriter) {{".encode()).decode(),
+                    "LineNum": j + 1,
+                }
+                for j in range(line_matches)
+            ],
+        }
+        for i in range(num_files)
+    ]
+
+
+def legacy_format(file_matches: List[dict]) -> List[LegacyFormattedResult]:
+    """Previous path: FileMatch -> compact dict in ``search``, dict -> dataclass in ``format_results``."""
+    dicts = [
+        {
+            "repository": file_match.get("Repository", ""),
+            "filename": file_match.get("FileName", ""),
+            "matches": [
+                {"line_number": line_match.get("LineNum", 0), "content": str(line_match.get("Line", ""))}
+                for line_match in file_match.get("LineMatches") or []
+            ],
+        }
+        for file_match in file_matches
+    ]
+    return [
+        LegacyFormattedResult(
+            repository=result.get("repository", ""),
+            filename=result.get("filename", ""),
+            matches=[
+                LegacyMatch(line_number=match.get("line_number", 0), content=match.get("content", ""))
+                for match in result.get("matches", [])
+            ],
+        )
+        for result in dicts
+    ]
+
+
+def one_pass_format(file_matches: List[dict]) -> list:
+    """Current path: FileMatch -> slotted ``FormattedResult`` directly."""
+    return [_zoekt_file(file_match) for file_match in file_matches]
+
+
+def measure(build: Callable[[List[dict]], list], file_matches: List[dict], repeat: int) -> Tuple[List[float], int]:
+    """Return per-run latencies (ms) and the memory retained by one result set (bytes)."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build(file_matches)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    results = build(file_matches)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+    return latencies, retained
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=3000)
+    parser.add_argument("--line-matches", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    file_matches = build_file_matches(args.files, args.line_matches)
+    print(f"{args.files} files x {args.line_matches} line matches")
+
+    for label, build in (("dict+dataclass", legacy_format), ("one-pass slots", one_pass_format)):
+        latencies, retained = measure(build, file_matches, args.repeat)
+        print(
+            f"{label:>15}: median {statistics.median(latencies):8.2f} ms  "
+            f"min {min(latencies):8.2f} ms  retained {retained / 1024 / 1024:8.2f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
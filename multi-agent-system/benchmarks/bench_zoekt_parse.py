@@ -0,0 +1,112 @@
+"""Benchmark full vs. streaming parsing of large Zoekt ``/api/nl-search`` responses.
+
+Usage:
+    python -m benchmarks.bench_zoekt_parse --files 2000 --line-matches 20 --num-results 30
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import statistics
+import time
+import tracemalloc
+from typing import List, Tuple
+
+import httpx
+
+from backends.http import AsyncHttpPool
+from backends.search import AsyncZoektSearchClient
+
+CHUNK_SIZE = 64 * 1024
+
+
+def build_payload(num_files: int, line_matches: int) -> bytes:
+    """Build a synthetic zoekt-nl-query response body."""
+    files = [
+        {
+            "FileName": f"pkg/module_{i}/handler.go",
+            "Repository": "github.com/example/service",
+            "Language": "Go",
+            "Branches": ["main"],
+            "Score": 1.0,
+            "LineMatches": [
+                {
+                    "Line": base64.b64encode(f"func Handler{j}(w http.ResponseWriter) {{".encode()).decode(),
+                    "LineNum": j + 1,
+                    "LineStart": 0,
+                    "LineEnd": 40,
+                    "LineFragments": [{"LineOffset": 5, "Offset": 5, "MatchLength": 7}],
+                }
+                for j in range(line_matches)
+            ],
+        }
+        for i in range(num_files)
+    ]
+    return json.dumps(
+        {
+            "originalQuery": "Handler lang:go",
+            "queryType": "search",
+            "resultCount": num_files,
+            "responseTime": 12,
+            "results": {"Stats": {"FileCount": num_files}, "Files": files},
+            "success": True,
+        }
+    ).encode()
+
+
+def make_pool(body: bytes) -> AsyncHttpPool:
+    """Create an HTTP pool whose transport streams ``body`` in network-sized chunks."""
+
+    async def chunks():
+        for start in range(0, len(body), CHUNK_SIZE):
+            yield body[start:start + CHUNK_SIZE]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=chunks())
+
+    return AsyncHttpPool(transport=httpx.MockTransport(handler))
+
+
+async def measure(client: AsyncZoektSearchClient, num_results: int, repeat: int) -> Tuple[List[float], int]:
+    """Run searches and return per-run latencies (ms) and the peak traced memory (bytes).
+
+    Latency runs are untraced; peak memory comes from one extra traced run.
+    """
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await client.search("Handler lang:go", num_results)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    await client.search("Handler lang:go", num_results)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return latencies, peak
+
+
+async def async_main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--line-matches", type=int, default=20)
+    parser.add_argument("--num-results", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    body = build_payload(args.files, args.line_matches)
+    print(f"payload: {len(body) / 1024 / 1024:.1f} MiB, {args.files} files, keeping {args.num_results}")
+
+    for label, stream_parse in (("full json", False), ("streaming", True)):
+        client = AsyncZoektSearchClient("http://zoekt", http_pool=make_pool(body), stream_parse=stream_parse)
+        latencies, peak = await measure(client, args.num_results, args.repeat)
+        await client.http_pool.aclose()
+        print(
+            f"{label:>10}: median {statistics.median(latencies):8.2f} ms  "
+            f"min {min(latencies):8.2f} ms  peak mem {peak / 1024 / 1024:8.2f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(async_main())
@@ -0,0 +1,276 @@
+"""Local stand-ins for the LLM provider and the zoekt-nl-query server.
+
+One Starlette app serves:
+
+- ``POST /v1/chat/completions``: an OpenAI-compatible endpoint with scripted
+  tool calling. Agents with an output tool (``final_result``) get it called
+  with arguments generated from its schema. Other agents call the code search
+  tools ``--tool-calls`` times (``search``, then ``fetch_content`` on a file the
+  previous search found) and then answer in text. Streaming is supported.
+- ``GET /api/nl-search`` and ``GET /api/content``: zoekt-nl-query responses
+  with ``--files`` files of ``--line-matches`` matches each.
+- ``GET /_mock/stats`` / ``POST /_mock/reset``: latencies of the requests
+  served so far, per stage (``llm``, ``backend_search``, ``backend_content``).
+
+Each endpoint waits for its configured latency before answering, so the
+benchmark can model a provider and a backend of realistic speed.
+
+Usage:
+    python -m benchmarks.mock_services --port 19100 --llm-latency-ms 300 --backend-latency-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+OUTPUT_TOOL_PREFIX = "final_result"
+
+
+def fill_schema(schema: Dict[str, Any], text: str) -> Any:
+    """Generate a value matching a JSON schema, using text for strings."""
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        properties = schema.get("properties", {})
+        required = schema.get("required", list(properties))
+        return {name: fill_schema(properties[name], text) for name in required}
+    if kind == "array":
+        return [fill_schema(schema.get("items", {}), f"{text} {i}") for i in range(3)]
+    if kind in ("integer", "number"):
+        return 1
+    if kind == "boolean":
+        return True
+    return text
+
+
+class MockServices:
+    """Scripted LLM and search backend with per-stage latency recording."""
+
+    def __init__(
+        self,
+        llm_latency_ms: float = 300.0,
+        backend_latency_ms: float = 20.0,
+        tool_calls: int = 2,
+        files: int = 20,
+        line_matches: int = 5,
+        answer_words: int = 40,
+    ) -> None:
+        """Initialize mock services.
+
+        Args:
+            llm_latency_ms: Delay before each chat completion starts answering
+            backend_latency_ms: Delay of each backend request
+            tool_calls: Tool calls the scripted finder makes before answering
+            files: Files per search response
+            line_matches: Line matches per file
+            answer_words: Words of the final answer
+        """
+        self.llm_latency = llm_latency_ms / 1000
+        self.backend_latency = backend_latency_ms / 1000
+        self.tool_calls = tool_calls
+        self.answer_words = answer_words
+        self.latencies: Dict[str, List[float]] = {}
+        self._search_body = json.dumps(self._search_payload(files, line_matches)).encode()
+        self._content_body = "\n".join(f"content line {i}" for i in range(1, 501))
+
+    def app(self) -> Starlette:
+        """Build the Starlette app."""
+        return Starlette(
+            routes=[
+                Route("/v1/chat/completions", self.chat_completions, methods=["POST"]),
+                Route("/api/nl-search", self.nl_search, methods=["GET"]),
+                Route("/api/content", self.content, methods=["GET"]),
+                Route("/_mock/stats", self.stats, methods=["GET"]),
+                Route("/_mock/reset", self.reset, methods=["POST"]),
+            ]
+        )
+
+    async def chat_completions(self, request: Request) -> Response:
+        """Answer a chat completion request with the next scripted step."""
+        start = time.perf_counter()
+        body = await request.json()
+        message = self._next_message(body.get("messages", []), body.get("tools") or [])
+        await asyncio.sleep(self.llm_latency)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "mock")
+        usage = {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}
+        finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+        if not body.get("stream"):
+            self._record("llm", start)
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                    "usage": usage,
+                }
+            )
+
+        def chunk(choices: List[Dict[str, Any]], **extra: Any) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        def delta(content: Dict[str, Any], finish: Optional[str] = None) -> str:
+            return chunk([{"index": 0, "delta": content, "finish_reason": finish}])
+
+        async def events() -> AsyncIterator[str]:
+            if message.get("tool_calls"):
+                calls = [{"index": i, **call} for i, call in enumerate(message["tool_calls"])]
+                yield delta({"role": "assistant", "tool_calls": calls})
+            else:
+                for i, word in enumerate(message["content"].split(" ")):
+                    if i == 0:
+                        yield delta({"role": "assistant", "content": word})
+                    else:
+                        yield delta({"content": f" {word}"})
+            yield delta({}, finish_reason)
+            yield chunk([], usage=usage)
+            yield "data: [DONE]\n\n"
+            self._record("llm", start)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def nl_search(self, request: Request) -> Response:
+        """Return the canned search response."""
+        start = time.perf_counter()
+        await asyncio.sleep(self.backend_latency)
+        self._record("backend_search", start)
+        return Response(self._search_body, media_type="application/json")
+
+    async def content(self, request: Request) -> Response:
+        """Return canned file content."""
+        start = time.perf_counter()
+        await asyncio.sleep(self.backend_latency)
+        self._record("backend_content", start)
+        return PlainTextResponse(self._content_body)
+
+    async def stats(self, request: Request) -> JSONResponse:
+        """Return the recorded latencies in milliseconds per stage."""
+        return JSONResponse(self.latencies)
+
+    async def reset(self, request: Request) -> JSONResponse:
+        """Forget the recorded latencies, e.g. after a warmup."""
+        self.latencies = {}
+        return JSONResponse({"reset": True})
+
+    def _next_message(self, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Decide the assistant's next message from the conversation so far."""
+        question = next(
+            (str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), ""
+        )
+        topic = " ".join(question.split()[:4]) or "main"
+        functions = {tool["function"]["name"]: tool["function"] for tool in tools}
+
+        output_tool = next((name for name in functions if name.startswith(OUTPUT_TOOL_PREFIX)), None)
+        if output_tool:
+            arguments = fill_schema(functions[output_tool].get("parameters", {}), topic)
+            return self._tool_call(output_tool, arguments)
+
+        tool_results = [m for m in messages if m.get("role") == "tool"]
+        if len(tool_results) < self.tool_calls and "search" in functions:
+            found = self._first_file(tool_results[-1]) if tool_results else None
+            if found and "fetch_content" in functions:
+                return self._tool_call("fetch_content", {**found, "around_line": 1})
+            return self._tool_call("search", {"query": f"{topic} {len(tool_results)}", "num_results": 5})
+
+        words = [f"answer{i}" for i in range(self.answer_words)]
+        return {"role": "assistant", "content": " ".join(words)}
+
+    @staticmethod
+    def _tool_call(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Build an assistant message calling one tool."""
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(arguments)},
+                }
+            ],
+        }
+
+    @staticmethod
+    def _first_file(tool_message: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Get repo and path of the first file in a search tool result, if it is one."""
+        try:
+            results = json.loads(tool_message.get("content") or "")
+        except (TypeError, ValueError):
+            return None
+        if isinstance(results, list) and results and isinstance(results[0], dict):
+            if "filename" in results[0]:
+                return {"repo": results[0].get("repository", ""), "path": results[0]["filename"]}
+        return None
+
+    @staticmethod
+    def _search_payload(files: int, line_matches: int) -> Dict[str, Any]:
+        """Build a zoekt-nl-query search response."""
+        return {
+            "resultCount": files,
+            "results": {
+                "Files": [
+                    {
+                        "FileName": f"pkg/module{i}/file{i}.go",
+                        "Repository": "github.com/example/service",
+                        "Language": "Go",
+                        "LineMatches": [
+                            {
+                                "LineNum": 10 * j + 1,
+                                "Line": f"func Handler{i}_{j}(ctx context.Context) error {{",
+                            }
+                            for j in range(line_matches)
+                        ],
+                    }
+                    for i in range(files)
+                ]
+            },
+        }
+
+    def _record(self, stage: str, start: float) -> None:
+        """Record the latency of a request since start."""
+        self.latencies.setdefault(stage, []).append((time.perf_counter() - start) * 1000)
+
+
+def main() -> None:
+    """Serve the mock services."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=19100)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--backend-latency-ms", type=float, default=20.0)
+    parser.add_argument("--tool-calls", type=int, default=2)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--line-matches", type=int, default=5)
+    args = parser.parse_args()
+
+    services = MockServices(
+        llm_latency_ms=args.llm_latency_ms,
+        backend_latency_ms=args.backend_latency_ms,
+        tool_calls=args.tool_calls,
+        files=args.files,
+        line_matches=args.line_matches,
+    )
+    uvicorn.run(services.app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Replay recorded agentic_search traffic without any external service.
+
+Record traffic by running the servers with ``TRAFFIC_MODE=record`` (and the
+same ``TRAFFIC_DIR``) while they serve real requests. Recording with caches and
+request coalescing disabled keeps every request's LLM and backend traffic under
+its own trace ID.
+
+This script then starts the code search and context servers with
+``TRAFFIC_MODE=replay`` on the recorded directory: LLM responses and backend
+responses come from the recording, so only the Python code paths in between
+(agents, MCP, result parsing and formatting) run. Each recorded
+``agentic_search`` call is sent again with its trace ID, the latency is measured
+and the answer is compared with the recorded one.
+
+With ``--profile-dir`` both servers run under cProfile and write
+``codesearch.prof`` and ``context.prof`` when they shut down.
+
+Usage:
+    python -m benchmarks.replay --traffic-dir traffic --repeat 5 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from fastmcp import Client
+from fastmcp.client.transports import StreamableHttpTransport
+
+from benchmarks.bench_e2e import ROOT, _free_port, _spawn, _wait_for_mcp, report
+from core.traffic import iter_traffic
+
+REPLAY_BACKEND_URL = "http://replay.invalid"
+
+
+def load_requests(traffic_dir: Path) -> List[Dict[str, Any]]:
+    """Get the recorded agentic_search calls that ran the agents (not cache hits)."""
+    return [
+        record
+        for record in iter_traffic(traffic_dir)
+        if record["k"] == "tool"
+        and record["key"] == "agentic_search"
+        and not record["v"]["args"].get("cached")
+    ]
+
+
+async def replay(
+    url: str, requests: List[Dict[str, Any]], repeat: int, concurrency: int
+) -> Dict[str, Any]:
+    """Send every recorded request ``repeat`` times, ``concurrency`` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    # Requests of one trace must not overlap, or they would take each other's responses
+    trace_locks: Dict[str, asyncio.Lock] = {}
+    latencies: List[float] = []
+    errors: List[str] = []
+    mismatched: List[str] = []
+
+    async def one(record: Dict[str, Any]) -> None:
+        trace_id = record["t"]
+        lock = trace_locks.setdefault(trace_id, asyncio.Lock())
+        async with semaphore, lock:
+            transport = StreamableHttpTransport(url, headers={"X-TRACE-ID": trace_id})
+            try:
+                async with Client(transport, timeout=300) as client:
+                    start = time.perf_counter()
+                    result = await client.call_tool("agentic_search", record["v"]["args"])
+                    latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as exc:
+                errors.append(f"{trace_id}: {type(exc).__name__}: {exc}")
+                return
+            if result.data != record["v"]["result"]:
+                mismatched.append(trace_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(record) for _ in range(repeat) for record in requests))
+    elapsed = time.perf_counter() - start
+    return {
+        "stages": {"end_to_end": latencies},
+        "errors": errors,
+        "mismatched": sorted(set(mismatched)),
+        "elapsed_s": elapsed,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the servers in replay mode and replay the recorded requests."""
+    requests = load_requests(args.traffic_dir)
+    if not requests:
+        raise SystemExit(f"No recorded agentic_search calls in {args.traffic_dir}")
+
+    port_names = ("codesearch", "codesearch_sse", "context", "context_sse")
+    ports = {name: _free_port() for name in port_names}
+    codesearch_url = f"http://127.0.0.1:{ports['codesearch']}/codesearch/mcp"
+    context_url = f"http://127.0.0.1:{ports['context']}/contextprovider/mcp"
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "LANGFUSE_ENABLED": "false",
+        "TRAFFIC_MODE": "replay",
+        "TRAFFIC_DIR": str(args.traffic_dir.resolve()),
+        "SEARCH_BACKEND": args.search_backend,
+        "ZOEKT_API_URL": REPLAY_BACKEND_URL,
+        "SRC_ENDPOINT": REPLAY_BACKEND_URL,
+        "MCP_SERVER_URL": codesearch_url,
+        "SEARCH_CACHE_ENABLED": "false",
+        "CONTENT_CACHE_ENABLED": "false",
+        "SEARCH_COALESCING_ENABLED": "false",
+        "ANSWER_CACHE_ENABLED": "false",
+        "REQUEST_COALESCING_ENABLED": "false",
+    }
+    log_dir = Path(args.log_dir or tempfile.mkdtemp(prefix="replay_"))
+    log_dir.mkdir(parents=True, exist_ok=True)
+    if args.profile_dir:
+        args.profile_dir.mkdir(parents=True, exist_ok=True)
+
+    processes = []
+    try:
+        for name, url in (("codesearch", codesearch_url), ("context", context_url)):
+            server_env = {
+                **env,
+                "MCP_STREAMABLE_HTTP_PORT": str(ports[name]),
+                "MCP_SSE_PORT": str(ports[f"{name}_sse"]),
+            }
+            command = ["-m", f"servers.{name}.server"]
+            if args.profile_dir:
+                profile = args.profile_dir.resolve() / f"{name}.prof"
+                command = ["-m", "cProfile", "-o", str(profile), *command]
+            process = _spawn(command, server_env, log_dir, name)
+            processes.append(process)
+            await _wait_for_mcp(url, process)
+
+        if args.warmup:
+            await replay(context_url, requests[: args.warmup], 1, 1)
+        result = await replay(context_url, requests, args.repeat, args.concurrency)
+        result["requests"] = len(requests)
+        result["log_dir"] = str(log_dir)
+        return result
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main() -> None:
+    """Run the replay."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traffic-dir", type=Path, required=True, help="Recorded TRAFFIC_DIR")
+    parser.add_argument("--repeat", type=int, default=1, help="Times every request is replayed")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=1, help="Requests replayed before measuring")
+    parser.add_argument("--search-backend", default="zoekt", choices=("zoekt", "sourcegraph"))
+    parser.add_argument("--profile-dir", type=Path, help="Run the servers under cProfile")
+    parser.add_argument("--log-dir", help="Directory for server logs (default: a temp dir)")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    summary = {
+        "requests": result["requests"],
+        "replayed": len(result["stages"]["end_to_end"]),
+        "errors": result["errors"],
+        "mismatched": result["mismatched"],
+        "throughput_rps": len(result["stages"]["end_to_end"]) / result["elapsed_s"],
+        "latency_ms": report(result["stages"]),
+        "log_dir": result["log_dir"],
+    }
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
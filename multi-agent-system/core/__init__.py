@@ -1,5 +1,31 @@
-from .limiters import TokenLimiter, ToolCallLimiter
-from .prompt_manager import PromptManager
+from .agent_pool import AgentPool
+from .limiters import (
+    ConcurrencyLimiter,
+    RateLimiter,
+    TokenLimitedResult,
+    TokenLimiter,
+    TokenLimitExceeded,
+    TokenUsageReport,
+    ToolCallLimiter,
+    ToolCallStats,
+)
+from .mcp_session import MCPSessionManager
+from .prompt_manager import PromptManager, RenderStats
+from .single_flight import SingleFlight
 
-__all__ = ["PromptManager", "TokenLimiter", "ToolCallLimiter"]
+__all__ = [
+    "AgentPool",
+    "MCPSessionManager",
+    "PromptManager",
+    "RenderStats",
+    "SingleFlight",
+    "TokenLimiter",
+    "TokenLimitExceeded",
+    "TokenLimitedResult",
+    "TokenUsageReport",
+    "ToolCallLimiter",
+    "ToolCallStats",
+    "ConcurrencyLimiter",
+    "RateLimiter",
+]
 
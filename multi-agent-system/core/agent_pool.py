@@ -0,0 +1,176 @@
+"""Pool of warm, reusable agents."""
+
+import asyncio
+import logging
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Generic, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+A = TypeVar("A")
+
+
+@dataclass
+class _PooledAgent(Generic[A]):
+    """An agent and the task that keeps its MCP connections open."""
+
+    agent: A
+    task: asyncio.Task
+    stop: asyncio.Event
+
+
+class AgentPool(Generic[A]):
+    """Keeps up to ``size`` agents entered and hands them out one request at a time.
+
+    Agents are async context managers (``CodeSnippetFinder``, ``QueryReformater``)
+    whose construction and ``__aenter__`` (prompt loading, provider setup, MCP
+    session) are paid once instead of per request. Each agent is entered and
+    exited in its own task, because MCP client sessions must be closed by the
+    task that opened them. An agent whose request fails is closed and replaced
+    lazily on a later ``acquire``.
+    """
+
+    def __init__(self, factory: Callable[[], A], size: int, name: str = "agent") -> None:
+        """Initialize agent pool.
+
+        Args:
+            factory: Creates a new, not yet entered agent
+            size: Maximum number of live agents
+            name: Pool name used in logs
+        """
+        self.factory = factory
+        self.size = size
+        self.name = name
+        self.created = 0
+        self.recycled = 0
+        self._idle: Deque[_PooledAgent[A]] = deque()
+        self._live: List[_PooledAgent[A]] = []
+        self._spawning = 0
+        self._changed = asyncio.Condition()
+        self._closed = False
+
+    async def start(self, warm: Optional[int] = None) -> None:
+        """Create and enter agents ahead of the first request.
+
+        Args:
+            warm: Number of agents to warm up, defaults to ``size``
+        """
+        count = min(self.size if warm is None else warm, self.size) - len(self._live)
+        results = await asyncio.gather(
+            *(self._spawn() for _ in range(max(count, 0))), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning(f"Failed to warm up {self.name} agent: {result}")
+            else:
+                await self._release(result)
+        logger.info(f"{self.name} pool warmed up with {len(self._idle)} agents")
+
+    @asynccontextmanager
+    async def acquire(self, trace_id: Optional[str] = None) -> AsyncIterator[A]:
+        """Check out an agent for one request.
+
+        Args:
+            trace_id: Trace ID for the request, a new one is generated if omitted
+
+        Yields:
+            An entered agent whose ``trace_id`` is set for this request
+        """
+        if self._closed:
+            raise RuntimeError(f"{self.name} pool is closed")
+        pooled = await self._checkout()
+        pooled.agent.trace_id = trace_id or str(uuid.uuid4())
+        try:
+            yield pooled.agent
+        except BaseException:
+            await self._retire(pooled)
+            raise
+        else:
+            if self._closed:
+                await self._retire(pooled)
+            else:
+                await self._release(pooled)
+
+    async def close(self) -> None:
+        """Close all live agents."""
+        self._closed = True
+        self._idle.clear()
+        await asyncio.gather(*(self._retire(pooled) for pooled in list(self._live)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool size and usage statistics."""
+        idle = len(self._idle)
+        return {
+            "size": self.size,
+            "live": len(self._live),
+            "idle": idle,
+            "in_use": len(self._live) - idle,
+            "created": self.created,
+            "recycled": self.recycled,
+        }
+
+    async def _checkout(self) -> _PooledAgent[A]:
+        """Take an idle agent, creating one if the pool has room, or wait for one."""
+        async with self._changed:
+            while not self._idle and len(self._live) + self._spawning >= self.size:
+                await self._changed.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._spawning += 1
+        try:
+            return await self._spawn()
+        finally:
+            async with self._changed:
+                self._spawning -= 1
+                self._changed.notify()
+
+    async def _release(self, pooled: _PooledAgent[A]) -> None:
+        """Return an agent to the idle set."""
+        async with self._changed:
+            self._idle.append(pooled)
+            self._changed.notify()
+
+    async def _spawn(self) -> _PooledAgent[A]:
+        """Create an agent and enter it in a dedicated task."""
+        agent = self.factory()
+        ready: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        stop = asyncio.Event()
+
+        async def hold() -> None:
+            try:
+                async with agent:
+                    ready.set_result(None)
+                    await stop.wait()
+            except BaseException as exc:
+                if not ready.done():
+                    ready.set_exception(exc)
+                    return
+                raise
+
+        pooled = _PooledAgent(agent=agent, task=asyncio.create_task(hold()), stop=stop)
+        try:
+            await ready
+        except BaseException:
+            stop.set()
+            raise
+        self._live.append(pooled)
+        self.created += 1
+        return pooled
+
+    async def _retire(self, pooled: _PooledAgent[A]) -> None:
+        """Close an agent and free its slot."""
+        if pooled not in self._live:
+            return
+        self._live.remove(pooled)
+        if not self._closed:
+            self.recycled += 1
+        pooled.stop.set()
+        try:
+            await pooled.task
+        except Exception as exc:
+            logger.warning(f"Error closing {self.name} agent: {exc}")
+        async with self._changed:
+            self._changed.notify()
@@ -1,48 +1,235 @@
-"""Resource limiters for agents (token and tool call limits)."""
+"""Resource limiters for agents (token and tool call limits) and tool concurrency."""
 
-from typing import Any, TypeVar
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Generic, List, Optional, TypeVar
 
-from pydantic_ai.agent import Agent
+from pydantic_ai import RunContext
+from pydantic_ai.agent import Agent, AgentRun
+from pydantic_ai.exceptions import UsageLimitExceeded
+from pydantic_ai.messages import AgentStreamEvent, ModelMessage, ModelRequest, ModelResponse
+from pydantic_ai.toolsets import AbstractToolset, ToolsetTool, WrapperToolset
+from pydantic_ai.usage import RunUsage, UsageLimits
 
 T = TypeVar("T")
 
+# Receives the model's streamed response parts and the agent's tool calls and results
+AgentEventCallback = Callable[[AgentStreamEvent], Awaitable[None]]
+
+
+async def _forward_events(stream: AsyncIterable[AgentStreamEvent], on_event: AgentEventCallback) -> None:
+    """Pass every event of a node's stream to a callback."""
+    async for event in stream:
+        await on_event(event)
+
+
+class TokenLimitExceeded(RuntimeError):
+    """Raised when an agent run cannot finish within its token budget."""
+
+    def __init__(self, message: str, usage: "TokenUsageReport") -> None:
+        """Initialize the error.
+
+        Args:
+            message: Error message
+            usage: Usage report of the aborted run
+        """
+        super().__init__(message)
+        self.usage = usage
+
+
+@dataclass
+class TokenUsageReport:
+    """Token usage and latency of one limited agent run."""
+
+    max_tokens: int
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    requests: int = 0
+    tool_calls: int = 0
+    duration_ms: float = 0.0
+    forced_final_answer: bool = False
+
+    def add(self, usage: RunUsage) -> None:
+        """Add the usage reported by the model for a run."""
+        self.input_tokens += usage.input_tokens
+        self.output_tokens += usage.output_tokens
+        self.total_tokens += usage.total_tokens
+        self.requests += usage.requests
+        self.tool_calls += usage.tool_calls
+
+
+@dataclass
+class TokenLimitedResult(Generic[T]):
+    """Output of a limited agent run together with its usage report."""
+
+    output: T
+    usage: TokenUsageReport
+
+
+def _estimate_tokens(request: ModelRequest) -> int:
+    """Roughly estimate the tokens a request adds to the conversation (~4 characters per token)."""
+    return sum(len(str(getattr(part, "content", ""))) for part in request.parts) // 4
+
 
 class TokenLimiter:
-    """Limits token usage for agent runs."""
+    """Limits token usage for agent runs.
+
+    Token counts come from the usage the model reports for every request.
+    Before each request the limiter projects its input size; once another
+    tool-using step would leave no room for a final answer, it stops the run
+    and asks the model for its final response instead. Runs that cannot
+    finish within ``max_tokens`` raise ``TokenLimitExceeded``.
+    """
 
-    def __init__(self, max_tokens: int) -> None:
+    def __init__(self, max_tokens: int, output_reserve: int = 1024) -> None:
         """Initialize token limiter.
 
         Args:
             max_tokens: Maximum number of tokens allowed (input + output)
+            output_reserve: Tokens kept free for the model's final response
         """
         self.max_tokens = max_tokens
+        self.output_reserve = output_reserve
 
-    async def run_with_limit(self, agent: Agent, user_prompt: str) -> Any:
+    async def run_with_limit(
+        self, agent: Agent, user_prompt: str, on_event: Optional[AgentEventCallback] = None
+    ) -> TokenLimitedResult:
         """Run agent with token limit checking.
 
         Args:
             agent: The agent to run
             user_prompt: User prompt string
+            on_event: Called with streamed response parts and tool events as they happen;
+                model responses are streamed only if it is set
 
         Returns:
-            Agent result
+            Agent output and usage report
+
+        Raises:
+            TokenLimitExceeded: If token limit is exceeded
+        """
+        report = TokenUsageReport(max_tokens=self.max_tokens)
+        start = time.perf_counter()
+        history: Optional[List[ModelMessage]] = None
+        try:
+            async with agent.iter(
+                user_prompt, usage_limits=UsageLimits(total_tokens_limit=self.max_tokens)
+            ) as agent_run:
+                try:
+                    node = agent_run.next_node
+                    while not Agent.is_end_node(node):
+                        if Agent.is_model_request_node(node) and self._must_finish(agent_run, node):
+                            history = [*agent_run.ctx.state.message_history, node.request]
+                            break
+                        if on_event is not None and (
+                            Agent.is_model_request_node(node) or Agent.is_call_tools_node(node)
+                        ):
+                            async with node.stream(agent_run.ctx) as stream:
+                                await _forward_events(stream, on_event)
+                        node = await agent_run.next(node)
+                finally:
+                    report.add(agent_run.usage())
+
+            if history is None:
+                output = agent_run.result.output
+            else:
+                output = await self._force_final_answer(agent, history, report, on_event)
+        except UsageLimitExceeded as exc:
+            raise TokenLimitExceeded(str(exc), report) from exc
+        finally:
+            report.duration_ms = (time.perf_counter() - start) * 1000
+
+        return TokenLimitedResult(output=output, usage=report)
+
+    def _must_finish(self, agent_run: AgentRun, node: Any) -> bool:
+        """Check whether the next model request should be the last one.
+
+        The next request costs about the previous input plus the previous
+        output and the new tool results. If after paying that there would be
+        no room left to pay it once more for a final answer, finish now.
+        """
+        history = agent_run.ctx.state.message_history
+        last_response = next((m for m in reversed(history) if isinstance(m, ModelResponse)), None)
+        if last_response is None:
+            return False
+        last_usage = last_response.usage
+        next_input = last_usage.input_tokens + last_usage.output_tokens + _estimate_tokens(node.request)
+        used = agent_run.usage().total_tokens
+        return used + 2 * next_input + self.output_reserve > self.max_tokens
+
+    async def _force_final_answer(
+        self,
+        agent: Agent,
+        history: List[ModelMessage],
+        report: TokenUsageReport,
+        on_event: Optional[AgentEventCallback] = None,
+    ) -> Any:
+        """Ask the model for its final response in one last request.
 
         Raises:
-            RuntimeError: If token limit is exceeded
+            UsageLimitExceeded: If the model calls tools again or overruns the budget
         """
-        # Simple implementation - in production you'd want more sophisticated token counting
-        result = await agent.run(user_prompt)
+        remaining = self.max_tokens - report.total_tokens
+        warning = (
+            f"TOKEN LIMIT WARNING: {report.total_tokens} of {self.max_tokens} tokens used. "
+            f"Do not call any more tools. Provide your final response now, based on the "
+            f"information gathered so far."
+        )
+        report.forced_final_answer = True
+        result = await agent.run(
+            warning,
+            message_history=history,
+            usage_limits=UsageLimits(request_limit=1, total_tokens_limit=remaining),
+            event_stream_handler=(
+                (lambda ctx, stream: _forward_events(stream, on_event)) if on_event else None
+            ),
+        )
+        report.add(result.usage())
+        return result.output
+
+
+@dataclass
+class ToolCallStats:
+    """Call counts and latencies of one tool during an agent run."""
+
+    calls: int = 0
+    rejected: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        """Mean latency of executed calls in milliseconds."""
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def record(self, latency_ms: float, error: bool = False) -> None:
+        """Record one executed call."""
+        self.calls += 1
+        self.errors += error
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
 
-        # Check token usage (this is a simplified check)
-        # In a real implementation, you'd track tokens from the model response
-        # For now, we'll add a warning to the system prompt instead
 
-        return result
+TOOL_CALL_LIMIT_MESSAGE = (
+    "TOOL CALL LIMIT REACHED: {max_calls} tool calls have been used. "
+    "Do not call any more tools. Provide your final response now."
+)
 
 
 class ToolCallLimiter:
-    """Limits tool calls for agents."""
+    """Limits tool calls for agents.
+
+    ``wrap_mcp_server`` wraps a pydantic-ai MCP server in a toolset that
+    routes every tool call the agent makes through the limiter.
+    Once ``max_calls`` is exhausted, tools are no longer executed and the
+    model gets a "TOOL CALL LIMIT REACHED" result instead.
+    """
 
     def __init__(self, max_calls: int) -> None:
         """Initialize tool call limiter.
@@ -52,10 +239,12 @@ class ToolCallLimiter:
         """
         self.max_calls = max_calls
         self.call_count = 0
+        self.tool_stats: Dict[str, ToolCallStats] = {}
 
     def reset(self) -> None:
-        """Reset the call counter."""
+        """Reset the call counter and per-tool statistics, e.g. at the start of an agent run."""
         self.call_count = 0
+        self.tool_stats = {}
 
     def increment(self) -> bool:
         """Increment call counter and check if limit reached.
@@ -66,24 +255,152 @@ class ToolCallLimiter:
         self.call_count += 1
         return self.call_count <= self.max_calls
 
-    def wrap_mcp_server(self, mcp_server: Any) -> Any:
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-tool call counts and latencies since the last reset."""
+        return {
+            name: {**asdict(stats), "mean_ms": stats.mean_ms}
+            for name, stats in self.tool_stats.items()
+        }
+
+    def wrap_mcp_server(self, mcp_server: AbstractToolset[Any]) -> AbstractToolset[Any]:
         """Wrap an MCP server to enforce tool call limits.
 
+        The server itself is not modified, so one server or shared session
+        can back several agents, each with its own limiter.
+
         Args:
-            mcp_server: The MCP server to wrap
+            mcp_server: The pydantic-ai MCP server (or any toolset) to wrap
 
         Returns:
             Wrapped MCP server that enforces limits
         """
-        # Note: This is a placeholder implementation
-        # The actual MCP server wrapping would depend on the specific MCP implementation
-        # For FastMCP and pydantic-ai, the tool call limiting is typically handled
-        # at a higher level through agent configuration or middleware
-        # This method is kept for API compatibility but may need to be implemented
-        # based on the specific MCP client being used
-        
-        # For now, return the server as-is
-        # In a production implementation, you would wrap the server to intercept
-        # tool calls and check limits before executing
-        return mcp_server
+        return _ToolCallLimitedToolset(mcp_server, limiter=self)
+
+
+@dataclass
+class _ToolCallLimitedToolset(WrapperToolset[Any]):
+    """Toolset that routes every tool call through a ``ToolCallLimiter``."""
+
+    limiter: ToolCallLimiter = field(kw_only=True)
+
+    async def call_tool(
+        self, name: str, tool_args: Dict[str, Any], ctx: RunContext[Any], tool: ToolsetTool[Any]
+    ) -> Any:
+        """Call the tool if the limit allows it, recording its latency."""
+        limiter = self.limiter
+        stats = limiter.tool_stats.setdefault(name, ToolCallStats())
+        if not limiter.increment():
+            stats.rejected += 1
+            return TOOL_CALL_LIMIT_MESSAGE.format(max_calls=limiter.max_calls)
+
+        start = time.perf_counter()
+        error = True
+        try:
+            result = await self.wrapped.call_tool(name, tool_args, ctx, tool)
+            error = False
+            return result
+        finally:
+            stats.record((time.perf_counter() - start) * 1000, error=error)
+
+
+class ConcurrencyLimiter:
+    """Caps concurrent executions of a tool and offloads blocking work to a bounded worker pool."""
+
+    def __init__(self, max_concurrency: int, name: str = "tool") -> None:
+        """Initialize concurrency limiter.
+
+        Args:
+            max_concurrency: Maximum number of concurrent executions
+            name: Name used for worker thread names
+        """
+        self.max_concurrency = max_concurrency
+        self.name = name
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Await a coroutine function once a concurrency slot is free.
+
+        Args:
+            func: Coroutine function to call
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Result of func
+        """
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.in_flight -= 1
+
+    async def run_sync(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run a blocking function in the worker pool once a concurrency slot is free.
+
+        Args:
+            func: Blocking function to call
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Result of func
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix=f"{self.name}-worker"
+            )
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                # Like asyncio.to_thread, run func in a copy of the caller's context
+                # so it sees context variables such as the current trace ID
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(
+                    self._executor, functools.partial(context.run, func, *args, **kwargs)
+                )
+            finally:
+                self.in_flight -= 1
+
+    def shutdown(self) -> None:
+        """Shut down the worker pool without waiting for queued work."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class RateLimiter:
+    """Spaces out operations to at most ``rate`` per second (token bucket)."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """Initialize rate limiter.
+
+        Args:
+            rate: Operations allowed per second; 0 disables the limit
+            burst: Operations allowed at once after an idle period
+        """
+        self.rate = rate
+        self.burst = burst
+        self.waited_seconds = 0.0
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
 
+    async def acquire(self) -> None:
+        """Wait until the next operation may start."""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                self.waited_seconds += delay
+                self._last = time.monotonic()
+                self._tokens = 1
+            self._tokens -= 1
@@ -0,0 +1,260 @@
+"""Long-lived MCP client session shared by agents."""
+
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import anyio
+from pydantic_ai import RunContext
+from pydantic_ai.exceptions import ModelRetry
+from pydantic_ai.mcp import CallToolFunc, MCPServerStreamableHTTP, ToolResult
+from pydantic_ai.toolsets import AbstractToolset, ToolsetTool
+
+logger = logging.getLogger(__name__)
+
+# Trace ID of the request being served in the current task
+current_trace_id: ContextVar[Optional[str]] = ContextVar("mcp_trace_id", default=None)
+
+
+async def send_trace_id(
+    ctx: RunContext[Any], call_tool: CallToolFunc, name: str, tool_args: Dict[str, Any]
+) -> ToolResult:
+    """``process_tool_call`` hook that sends the current request's trace ID as MCP ``_meta``.
+
+    A session outlives the requests it serves, so its ``X-TRACE-ID`` header
+    cannot identify a request; servers read ``_meta.trace_id`` first.
+    """
+    trace_id = current_trace_id.get()
+    return await call_tool(name, tool_args, {"trace_id": trace_id} if trace_id else None)
+
+
+class MCPSessionManager(AbstractToolset[Any]):
+    """A single MCP session shared by every agent in the process.
+
+    The session is opened once, in a background task that owns it, and kept
+    open across agent runs. Entering the manager from an agent does not open
+    a new connection. Tool schemas are listed once per connection and served
+    from memory. The owning task periodically lists tools to refresh them and
+    reconnects when the server stops responding. A tool call that fails at the
+    transport level triggers a reconnect and is retried once.
+
+    MCP client sessions must be closed by the task that opened them, so only
+    the owning task opens and closes sessions; before leaving one it waits for
+    the calls still running on it.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        max_reconnect_delay: float = 30.0,
+    ) -> None:
+        """Initialize MCP session manager.
+
+        Args:
+            url: Streamable HTTP URL of the MCP server
+            timeout: Connection and initialization timeout in seconds
+            health_check_interval: Seconds between health checks, 0 to disable
+            max_reconnect_delay: Upper bound of the exponential reconnect backoff
+        """
+        self.url = url
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.max_reconnect_delay = max_reconnect_delay
+        self.server = self._new_server()
+        self.connects = 0
+        self.reconnects = 0
+        self._tools: Optional[Dict[str, ToolsetTool[Any]]] = None
+        self._connected = asyncio.Event()
+        self._reconnect = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._in_flight = 0
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def id(self) -> Optional[str]:
+        """Toolset ID."""
+        return None
+
+    @property
+    def label(self) -> str:
+        """Toolset label used in error messages."""
+        return f"MCPSessionManager({self.url!r})"
+
+    async def __aenter__(self) -> "MCPSessionManager":
+        """Make sure the shared session is running; agents never close it."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> Optional[bool]:
+        """Leave the session open for other agents."""
+        return None
+
+    async def start(self) -> None:
+        """Start the background task that owns the session and wait until it is connected.
+
+        Raises:
+            ConnectionError: If no session could be established within ``timeout``
+        """
+        if self._closed:
+            raise RuntimeError("MCP session manager is closed")
+        if self._task is None:
+            self._task = asyncio.create_task(self._hold())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"Could not connect to MCP server at {self.url}") from None
+
+    async def close(self) -> None:
+        """Close the session and stop the owning task."""
+        self._closed = True
+        if self._task is None:
+            return
+        if self._connected.is_set():
+            # Let the owning task leave the session context itself
+            self._reconnect.set()
+        else:
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def get_tools(self, ctx: RunContext[Any]) -> Dict[str, ToolsetTool[Any]]:
+        """Get the tool definitions, listing them from the server once per connection."""
+        await self.start()
+        if self._tools is None:
+            self._tools = await self.server.get_tools(ctx)
+        return self._tools
+
+    async def call_tool(
+        self, name: str, tool_args: Dict[str, Any], ctx: RunContext[Any], tool: ToolsetTool[Any]
+    ) -> Any:
+        """Call a tool, reconnecting and retrying once if the session is broken."""
+        return await self._call_with_retry(
+            name, lambda server: server.call_tool(name, tool_args, ctx, tool)
+        )
+
+    async def direct_call_tool(self, name: str, tool_args: Dict[str, Any]) -> Any:
+        """Call a tool outside of an agent run, e.g. from a fixed pipeline step.
+
+        The current trace ID is sent as ``_meta`` like for agent tool calls.
+
+        Raises:
+            ModelRetry: If the tool returns an error
+        """
+        trace_id = current_trace_id.get()
+        metadata = {"trace_id": trace_id} if trace_id else None
+        return await self._call_with_retry(
+            name, lambda server: server.direct_call_tool(name, tool_args, metadata)
+        )
+
+    async def reconnect(self) -> None:
+        """Drop the current session and wait for a new one."""
+        if self._connected.is_set():
+            self._connected.clear()
+            self._reconnect.set()
+        await self.start()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get session state."""
+        return {
+            "url": self.url,
+            "connected": self._connected.is_set(),
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "cached_tools": len(self._tools or {}),
+        }
+
+    async def _call_with_retry(
+        self, name: str, call: Callable[[MCPServerStreamableHTTP], Awaitable[Any]]
+    ) -> Any:
+        """Run a call on the current session, reconnecting and retrying once if it is broken."""
+        await self.start()
+        server = self.server
+        try:
+            return await self._call(server, call)
+        except ModelRetry:
+            raise
+        except Exception as exc:
+            logger.warning(f"MCP call {name} failed ({exc!r}), reconnecting to {self.url}")
+            if server is self.server:
+                await self.reconnect()
+            else:
+                await self.start()
+            return await self._call(self.server, call)
+
+    async def _call(
+        self, server: MCPServerStreamableHTTP, call: Callable[[MCPServerStreamableHTTP], Awaitable[Any]]
+    ) -> Any:
+        """Run a call, keeping the session open until it returns."""
+        self._in_flight += 1
+        self._drained.clear()
+        try:
+            return await call(server)
+        finally:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._drained.set()
+
+    async def _hold(self) -> None:
+        """Own the session: open it, keep it open, and reopen it when asked or when it fails."""
+        delay = 0.5
+        while not self._closed:
+            if self.connects:
+                self.server = self._new_server()
+            try:
+                async with self.server:
+                    self._tools = None
+                    self.connects += 1
+                    if self.connects > 1:
+                        self.reconnects += 1
+                    logger.info(f"MCP session connected to {self.url}")
+                    delay = 0.5
+                    self._reconnect.clear()
+                    self._connected.set()
+                    await self._serve()
+            except (Exception, asyncio.CancelledError) as exc:
+                if self._closed:
+                    return
+                # A broken transport can cancel the owning task from inside the session
+                task = asyncio.current_task()
+                if task is not None and task.cancelling():
+                    task.uncancel()
+                self._connected.clear()
+                logger.warning(f"MCP session to {self.url} failed: {exc!r}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _serve(self) -> None:
+        """Health-check the open session until a reconnect is requested, then drain calls."""
+        interval = self.health_check_interval or None
+        while not self._reconnect.is_set():
+            try:
+                await asyncio.wait_for(self._reconnect.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                await self._health_check()
+        self._connected.clear()
+        await self._drained.wait()
+
+    async def _health_check(self) -> None:
+        """List tools; refresh the schema cache, or request a reconnect on failure."""
+        try:
+            with anyio.fail_after(self.timeout):
+                tools = await self.server.list_tools()
+        except Exception as exc:
+            logger.warning(f"MCP health check against {self.url} failed: {exc!r}")
+            self._reconnect.set()
+            return
+        if {tool.name for tool in tools} != set(self._tools or {}):
+            self._tools = None
+
+    def _new_server(self) -> MCPServerStreamableHTTP:
+        """Create the client for one connection."""
+        return MCPServerStreamableHTTP(
+            url=self.url, timeout=self.timeout, process_tool_call=send_trace_id
+        )
@@ -0,0 +1,300 @@
+"""Prometheus metrics shared by the MCP servers, the agents and the frontend.
+
+Every process has one ``metrics`` object, disabled until its server calls
+``metrics.enable()``. While disabled (``METRICS_ENABLED=false`` or
+``prometheus_client`` not installed) every observation is a single attribute
+check, so instrumented hot paths cost next to nothing.
+
+Latencies, sizes and token counts are histograms observed where they happen.
+Cache hit ratios, in-flight counts and span export counters already live in
+the ``stats()`` of caches, limiters, pools and span processors; they are read
+only when ``/metrics`` is scraped.
+"""
+
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from pydantic_ai import RunContext
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+try:
+    import prometheus_client
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:  # optional: /metrics endpoints
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+StatsFunc = Callable[[], Dict[str, Any]]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+TOKEN_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 30, 50)
+
+
+class _StatsCollector:
+    """Reads cache and in-flight statistics at scrape time."""
+
+    def __init__(self) -> None:
+        self.caches: List[Tuple[str, StatsFunc]] = []
+        self.in_flight: List[Tuple[str, Callable[[], float]]] = []
+        self.span_exports: List[Tuple[str, StatsFunc]] = []
+
+    def collect(self) -> Any:
+        """Yield the current values as gauge families."""
+        hits = CounterMetricFamily(
+            "cache_hits", "Cache lookups that found an entry", labels=["cache"]
+        )
+        misses = CounterMetricFamily("cache_misses", "Cache lookups that missed", labels=["cache"])
+        hit_ratio = GaugeMetricFamily(
+            "cache_hit_ratio", "Cache hits per lookup since start", labels=["cache"]
+        )
+        entries = GaugeMetricFamily("cache_entries", "Entries held by a cache", labels=["cache"])
+        for name, stats in self.caches:
+            values = stats()
+            hits.add_metric([name], float(values.get("hits", 0)))
+            misses.add_metric([name], float(values.get("misses", 0)))
+            hit_ratio.add_metric([name], float(values.get("hit_ratio", 0.0)))
+            entries.add_metric([name], float(values.get("entries", 0)))
+        in_flight = GaugeMetricFamily(
+            "in_flight_requests", "Requests being processed", labels=["component"]
+        )
+        for name, count in self.in_flight:
+            in_flight.add_metric([name], float(count()))
+        yield hits
+        yield misses
+        yield hit_ratio
+        yield entries
+        yield in_flight
+
+        queued = GaugeMetricFamily(
+            "span_export_queue_size", "Spans waiting to be exported", labels=["exporter"]
+        )
+        totals = {
+            outcome: CounterMetricFamily(
+                f"spans_{outcome}", f"Spans {outcome} by the span exporter", labels=["exporter"]
+            )
+            for outcome in ("exported", "dropped", "failed")
+        }
+        for name, stats in self.span_exports:
+            values = stats()
+            queued.add_metric([name], float(values["queued"]))
+            for outcome, family in totals.items():
+                family.add_metric([name], float(values[outcome]))
+        yield queued
+        yield from totals.values()
+
+
+class Metrics:
+    """Histograms of the request stages and scrape-time statistics of one process."""
+
+    def __init__(self) -> None:
+        """Initialize disabled metrics."""
+        self.enabled = False
+        self.registry: Any = None
+        self._collector = _StatsCollector()
+
+    def enable(self) -> bool:
+        """Create the metrics; a no-op if ``prometheus_client`` is not installed.
+
+        Returns:
+            Whether metrics are enabled
+        """
+        if self.enabled:
+            return True
+        if prometheus_client is None:
+            logger.warning("prometheus_client is not installed, /metrics is disabled")
+            return False
+        registry = prometheus_client.CollectorRegistry()
+        histogram = prometheus_client.Histogram
+        self.backend_search_seconds = histogram(
+            "backend_search_duration_seconds",
+            "Search requests to the search backend (cache misses)",
+            ["backend"],
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.content_fetch_seconds = histogram(
+            "content_fetch_duration_seconds",
+            "fetch_content calls, including content cache hits",
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.content_fetch_chars = histogram(
+            "content_fetch_chars",
+            "Characters of content returned by fetch_content",
+            buckets=SIZE_BUCKETS,
+            registry=registry,
+        )
+        self.llm_request_seconds = histogram(
+            "llm_request_duration_seconds",
+            "LLM requests per agent, until the full response is received",
+            ["agent", "streamed"],
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.llm_request_tokens = histogram(
+            "llm_request_tokens",
+            "Input and output tokens per LLM request",
+            ["agent", "type"],
+            buckets=TOKEN_BUCKETS,
+            registry=registry,
+        )
+        self.agent_run_seconds = histogram(
+            "agent_run_duration_seconds",
+            "Agent runs, from the first request to the final answer",
+            ["agent"],
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.agent_run_tool_calls = histogram(
+            "agent_run_tool_calls",
+            "Tool calls per agent run",
+            ["agent"],
+            buckets=COUNT_BUCKETS,
+            registry=registry,
+        )
+        self.span_export_seconds = histogram(
+            "span_export_duration_seconds",
+            "Span batch exports to the tracing backend",
+            ["exporter", "result"],
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.span_export_batch_size = histogram(
+            "span_export_batch_size",
+            "Spans per export",
+            ["exporter"],
+            buckets=(1, 8, 32, 64, 128, 256, 512, 1024),
+            registry=registry,
+        )
+        registry.register(self._collector)
+        self.registry = registry
+        self.enabled = True
+        return True
+
+    def register_cache(self, name: str, stats: StatsFunc) -> None:
+        """Export hits, misses, hit ratio and entries from a cache's ``stats()``."""
+        self._collector.caches.append((name, stats))
+
+    def register_in_flight(self, name: str, count: Callable[[], float]) -> None:
+        """Export the number of requests a component is processing."""
+        self._collector.in_flight.append((name, count))
+
+    def register_agent_pools(self, **pools: Any) -> None:
+        """Export the agents each pool has lent out, as in-flight requests named by keyword."""
+        for name, pool in pools.items():
+            self.register_in_flight(name, lambda pool=pool: pool.stats()["in_use"])
+
+    def register_span_export(self, name: str, stats: StatsFunc) -> None:
+        """Export the queue size and exported, dropped and failed counts of a span exporter."""
+        self._collector.span_exports.append((name, stats))
+
+    def observe_backend_search(self, backend: str, seconds: float) -> None:
+        """Record the latency of a backend search."""
+        if self.enabled:
+            self.backend_search_seconds.labels(backend).observe(seconds)
+
+    def observe_content_fetch(self, seconds: float, content: str) -> None:
+        """Record the latency and size in characters of a content fetch."""
+        if self.enabled:
+            self.content_fetch_seconds.observe(seconds)
+            self.content_fetch_chars.observe(len(content))
+
+    def observe_llm_request(
+        self, agent: str, streamed: bool, seconds: float, response: ModelResponse
+    ) -> None:
+        """Record the latency and token usage of an LLM request."""
+        if self.enabled:
+            self.llm_request_seconds.labels(agent, str(streamed).lower()).observe(seconds)
+            self.llm_request_tokens.labels(agent, "input").observe(response.usage.input_tokens)
+            self.llm_request_tokens.labels(agent, "output").observe(response.usage.output_tokens)
+
+    def observe_agent_run(self, agent: str, seconds: float, tool_calls: int) -> None:
+        """Record the duration and tool calls of an agent run."""
+        if self.enabled:
+            self.agent_run_seconds.labels(agent).observe(seconds)
+            self.agent_run_tool_calls.labels(agent).observe(tool_calls)
+
+    def observe_span_export(self, name: str, seconds: float, spans: int, succeeded: bool) -> None:
+        """Record the latency and size of a span batch export."""
+        if self.enabled:
+            result = "success" if succeeded else "failure"
+            self.span_export_seconds.labels(name, result).observe(seconds)
+            self.span_export_batch_size.labels(name).observe(spans)
+
+    def render(self) -> Tuple[bytes, str]:
+        """Render the metrics in the Prometheus text format.
+
+        Returns:
+            Response body and content type
+        """
+        body = prometheus_client.generate_latest(self.registry)
+        return body, prometheus_client.CONTENT_TYPE_LATEST
+
+
+# Process-wide metrics, enabled by the server at startup
+metrics = Metrics()
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Serve ``GET /metrics`` for Starlette and FastAPI apps; 404 if metrics are disabled."""
+    if not metrics.enabled:
+        return PlainTextResponse("metrics are disabled", status_code=404)
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+
+class InstrumentedModel(WrapperModel):
+    """Model that records the latency and token usage of every request."""
+
+    def __init__(self, wrapped: Model, name: str) -> None:
+        """Initialize instrumented model.
+
+        Args:
+            wrapped: Model answering the requests
+            name: Agent name the requests are labeled with
+        """
+        super().__init__(wrapped)
+        self.name = name
+
+    async def request(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        """Request a response from the wrapped model and record it."""
+        start = time.perf_counter()
+        response = await self.wrapped.request(messages, model_settings, model_request_parameters)
+        metrics.observe_llm_request(self.name, False, time.perf_counter() - start, response)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+        run_context: Optional[RunContext[Any]] = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        """Stream a response from the wrapped model and record it once complete."""
+        start = time.perf_counter()
+        async with self.wrapped.request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            yield stream
+        metrics.observe_llm_request(self.name, True, time.perf_counter() - start, stream.get())
+
+
+def instrument_model(model: Model, name: str) -> Model:
+    """Wrap an agent's model to record its requests, if metrics are enabled."""
+    return InstrumentedModel(model, name) if metrics.enabled else model
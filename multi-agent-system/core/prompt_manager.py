@@ -1,39 +1,216 @@
+import threading
+import time
 from copy import copy
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 import jinja2
 import yaml
+from jinja2.sandbox import SandboxedEnvironment
+
+
+@dataclass(frozen=True)
+class _PromptFile:
+    """Parsed prompt file and the file state it was parsed from."""
+
+    mtime_ns: int
+    size: int
+    data: Any
+
+
+@dataclass
+class RenderStats:
+    """Render timing of one prompt."""
+
+    renders: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        """Mean render time in milliseconds."""
+        return self.total_ms / self.renders if self.renders else 0.0
+
+    def record(self, elapsed_ms: float) -> None:
+        """Record one render."""
+        self.renders += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+
+# Parsed files shared by every PromptManager in the process, keyed by resolved
+# path. Cached values are never mutated; prompts are copied before they are handed out.
+_file_cache: Dict[Path, _PromptFile] = {}
+_cache_lock = threading.Lock()
+# Render timing keyed by prompt path
+_render_stats: Dict[str, RenderStats] = {}
+
+
+def _load_prompt_file(file_path: Path) -> _PromptFile:
+    """Get a parsed prompt file, parsing it only if it changed since it was cached.
+
+    Raises:
+        FileNotFoundError: If the prompt file doesn't exist
+        yaml.YAMLError: If the YAML file is malformed
+    """
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Prompt file not found: {file_path}")
+
+    cached = _file_cache.get(file_path)
+    if cached is not None and (cached.mtime_ns, cached.size) == (stat.st_mtime_ns, stat.st_size):
+        return cached
+
+    with _cache_lock:
+        cached = _file_cache.get(file_path)
+        if cached is not None and (cached.mtime_ns, cached.size) == (stat.st_mtime_ns, stat.st_size):
+            return cached
+
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise yaml.YAMLError(f"Failed to parse YAML file {file_path}: {e}")
+
+        prompt_file = _PromptFile(mtime_ns=stat.st_mtime_ns, size=stat.st_size, data=data)
+        _file_cache[file_path] = prompt_file
+        return prompt_file
+
+
+class _PromptLoader(jinja2.BaseLoader):
+    """Loads templates named ``<prompt file>:<dotted prompt path>`` from the parsed prompt files."""
+
+    def get_source(
+        self, environment: jinja2.Environment, template: str
+    ) -> Tuple[str, Optional[str], Callable[[], bool]]:
+        file_name, _, prompt_path = template.rpartition(":")
+        file_path = Path(file_name)
+        prompt_file = _file_cache.get(file_path) or _load_prompt_file(file_path)
+
+        source = prompt_file.data
+        try:
+            for key in prompt_path.split("."):
+                source = source[key]
+        except (KeyError, TypeError):
+            raise jinja2.TemplateNotFound(template)
+        if not isinstance(source, str):
+            raise jinja2.TemplateNotFound(template)
+
+        # Stale once the file was parsed again, e.g. by a hot-reloading PromptManager
+        return source, None, lambda: _file_cache.get(file_path) is prompt_file
+
+
+def _bytecode_cache() -> Optional[jinja2.BytecodeCache]:
+    """Get a bytecode cache in the temp directory so new processes skip compiling prompts."""
+    try:
+        return jinja2.FileSystemBytecodeCache()
+    except (OSError, RuntimeError):
+        return None
+
+
+# Compiled templates shared by every PromptManager in the process, keyed by prompt path.
+# Prompt arguments carry user input, so templates render in a sandbox.
+_environment = SandboxedEnvironment(
+    loader=_PromptLoader(), bytecode_cache=_bytecode_cache(), auto_reload=True
+)
 
 
 class PromptManager:
-    def __init__(self, file_path: Union[str, Path], section_path: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        file_path: Union[str, Path],
+        section_path: Optional[str] = None,
+        hot_reload: bool = False,
+    ) -> None:
         """Initialize the prompt manager with a YAML file path.
 
+        The file is parsed once per process and shared by all prompt managers;
+        it is parsed again only when its modification time or size changes.
+
         Args:
             file_path: Path to the YAML file containing prompts
             section_path: Section of the file to load prompts from (supports dot notation for nested keys)
+            hot_reload: Check the file for changes on every prompt load, not only on creation
 
         Raises:
             FileNotFoundError: If the prompt file doesn't exist
             yaml.YAMLError: If the YAML file is malformed
             ValueError: If the section is not found in the prompts file
         """
-        file_path = Path(file_path)
-        if not file_path.exists():
-            raise FileNotFoundError(f"Prompt file not found: {file_path}")
+        self._file_path = Path(file_path).resolve()
+        self._section_path = section_path
+        self._hot_reload = hot_reload
+        self._prompt_file = _load_prompt_file(self._file_path)
+        self._prompt_data = self._section_data(self._prompt_file)
 
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                self._prompt_data = yaml.safe_load(f)
-        except yaml.YAMLError as e:
-            raise yaml.YAMLError(f"Failed to parse YAML file {file_path}: {e}")
+    @staticmethod
+    def clear_cache(bytecode: bool = False) -> None:
+        """Drop all parsed prompt files, compiled templates and render timing of the process.
+
+        Args:
+            bytecode: Also clear the on-disk bytecode cache shared with other processes
+        """
+        with _cache_lock:
+            _file_cache.clear()
+            _environment.cache.clear()
+            _render_stats.clear()
+        if bytecode and _environment.bytecode_cache is not None:
+            _environment.bytecode_cache.clear()
+
+    @staticmethod
+    def cache_info() -> Dict[str, int]:
+        """Get the number of cached prompt files and compiled templates."""
+        return {"files": len(_file_cache), "templates": len(_environment.cache)}
 
-        if section_path:
-            self._prompt_data = self._traverse_path(self._prompt_data, section_path)
+    @staticmethod
+    def render_stats() -> Dict[str, RenderStats]:
+        """Get render timing per prompt path."""
+        return dict(_render_stats)
 
-        # Cache for rendered templates
-        self._template_cache: Dict[str, jinja2.Template] = {}
+    def precompile(self) -> int:
+        """Compile every string prompt in this manager's section ahead of the first render.
+
+        Returns:
+            Number of compiled templates
+
+        Raises:
+            jinja2.TemplateSyntaxError: If a prompt is not a valid template
+        """
+        count = 0
+        pending = [(self._section_path or "", self._current_data())]
+        while pending:
+            path, value = pending.pop()
+            if isinstance(value, dict):
+                pending.extend((f"{path}.{key}" if path else str(key), item) for key, item in value.items())
+            elif isinstance(value, str):
+                _environment.get_template(self._template_name(path))
+                count += 1
+        return count
+
+    def _prompt_path(self, prompt_name: str) -> str:
+        """Get the dotted path of a prompt from the root of the prompt file."""
+        return f"{self._section_path}.{prompt_name}" if self._section_path else prompt_name
+
+    def _template_name(self, prompt_path: str) -> str:
+        """Get the template name of a prompt in the shared environment."""
+        return f"{self._file_path}:{prompt_path}"
+
+    def _section_data(self, prompt_file: _PromptFile) -> Any:
+        """Get the configured section of a parsed prompt file."""
+        if self._section_path:
+            return self._traverse_path(prompt_file.data, self._section_path)
+        return prompt_file.data
+
+    def _current_data(self) -> Any:
+        """Get the prompt data, reloading it first if hot reload is on and the file changed."""
+        if self._hot_reload:
+            prompt_file = _load_prompt_file(self._file_path)
+            if prompt_file is not self._prompt_file:
+                self._prompt_data = self._section_data(prompt_file)
+                self._prompt_file = prompt_file
+        return self._prompt_data
 
     def _traverse_path(self, data: Any, path: str) -> Any:
         """Traverse nested dictionary structure using dot notation."""
@@ -60,7 +237,7 @@ class PromptManager:
             ValueError: If the prompt is not found
         """
         try:
-            prompt = self._traverse_path(self._prompt_data, prompt_name)
+            prompt = self._traverse_path(self._current_data(), prompt_name)
             return copy(prompt)
         except ValueError as e:
             raise ValueError(f"Prompt '{prompt_name}' not found: {e}")
@@ -83,16 +260,18 @@ class PromptManager:
         if not isinstance(prompt_value, str):
             raise ValueError(f"Prompt '{prompt_name}' is not a string")
 
-        return self._render_template(prompt_value, **prompt_args)
-
-    def _render_template(self, template_str: str, **kwargs) -> str:
-        """Render a Jinja2 template string.
+        return self._render_template(self._prompt_path(prompt_name), **prompt_args)
 
-        Uses template caching for performance.
-        """
-        # Use template caching for performance
-        if template_str not in self._template_cache:
-            self._template_cache[template_str] = jinja2.Template(template_str)
+    def _render_template(self, prompt_path: str, **kwargs) -> str:
+        """Render a prompt from the shared template environment and record its render time."""
+        template = _environment.get_template(self._template_name(prompt_path))
 
-        return self._template_cache[template_str].render(**kwargs)
+        start = time.perf_counter()
+        rendered = template.render(**kwargs)
+        elapsed_ms = (time.perf_counter() - start) * 1000
 
+        stats = _render_stats.get(prompt_path)
+        if stats is None:
+            stats = _render_stats.setdefault(prompt_path, RenderStats())
+        stats.record(elapsed_ms)
+        return rendered
@@ -0,0 +1,90 @@
+"""Coalescing of concurrent identical calls."""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight(Generic[T]):
+    """An in-flight call and the number of callers waiting for it."""
+
+    task: "asyncio.Task[T]"
+    waiters: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """Shares one in-flight call among concurrent callers with the same key.
+
+    The first caller for a key starts the call; callers arriving while it runs
+    wait for the same result (or exception) instead of starting their own.
+    Nothing is kept once the call finishes, so this only deduplicates concurrent
+    work; caching results is left to the caller. A caller that is cancelled
+    only stops waiting; the call itself is cancelled once nobody waits for it.
+    """
+
+    def __init__(self, name: str = "single_flight") -> None:
+        """Initialize single flight group.
+
+        Args:
+            name: Name used in task names and statistics
+        """
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._flights: Dict[Hashable, _Flight[T]] = {}
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Await func, or the call already in flight for the same key.
+
+        Args:
+            key: Identifies identical calls
+            func: Coroutine function to call
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Result of the shared call; callers share the same object
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            self.calls += 1
+            task = asyncio.create_task(func(*args, **kwargs), name=f"{self.name}:{key!r}")
+            flight = self._flights[key] = _Flight(task)
+            task.add_done_callback(lambda _: self._finish(key, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                # The call may take a while to unwind; later callers start a new one
+                self._forget(key, flight)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics."""
+        requests = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": self.coalesced / requests if requests else 0.0,
+            "in_flight": len(self._flights),
+        }
+
+    def _finish(self, key: Hashable, flight: _Flight[T]) -> None:
+        """Forget a finished call and retrieve its exception."""
+        self._forget(key, flight)
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved even if every caller was cancelled
+            flight.task.exception()
+
+    def _forget(self, key: Hashable, flight: _Flight[T]) -> None:
+        """Remove a call from the in-flight calls so later callers start a new one."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -0,0 +1,130 @@
+"""Span export off the request path.
+
+``BackgroundSpanProcessor`` replaces ``SimpleSpanProcessor``, which exports
+each span synchronously when it ends and so puts a round trip to the
+collector (Langfuse) into every tool call. It is the SDK's
+``BatchSpanProcessor``: ending a span only puts it on a bounded queue and a
+worker thread exports the queue in batches. On top of that, the exports are
+counted and timed and spans lost to a full queue are counted, for ``/metrics``.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedSpanExporter(SpanExporter):
+    """Span exporter that counts and times the exports of the wrapped exporter."""
+
+    def __init__(self, exporter: SpanExporter, name: str = "spans") -> None:
+        """Initialize instrumented span exporter.
+
+        Args:
+            exporter: Exporter the batches are sent to
+            name: Name of the export in metrics
+        """
+        self.exporter = exporter
+        self.name = name
+        self.exported = 0
+        self.failed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        """Export a batch and record how it went."""
+        start = time.perf_counter()
+        try:
+            result = self.exporter.export(spans)
+        except Exception as exc:
+            logger.warning(f"Exporting {len(spans)} spans failed: {exc}")
+            result = SpanExportResult.FAILURE
+        succeeded = result == SpanExportResult.SUCCESS
+        with self._lock:
+            if succeeded:
+                self.exported += len(spans)
+            else:
+                self.failed += len(spans)
+        metrics.observe_span_export(self.name, time.perf_counter() - start, len(spans), succeeded)
+        return result
+
+    def record_dropped(self) -> None:
+        """Count a span lost because the export queue was full."""
+        with self._lock:
+            self.dropped += 1
+
+    def shutdown(self) -> None:
+        """Shut the wrapped exporter down."""
+        self.exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Flush the wrapped exporter."""
+        return self.exporter.force_flush(timeout_millis)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the exported, dropped and failed span counts."""
+        with self._lock:
+            return {"exported": self.exported, "dropped": self.dropped, "failed": self.failed}
+
+
+class BackgroundSpanProcessor(BatchSpanProcessor):
+    """SDK batch span processor whose exports and dropped spans are reported in metrics.
+
+    Spans are exported once ``max_batch_size`` of them are queued or every
+    ``schedule_delay`` seconds, whichever comes first. ``shutdown`` exports
+    everything still queued, e.g. when the server stops.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 512,
+        schedule_delay: float = 1.0,
+        name: str = "spans",
+    ) -> None:
+        """Initialize background span processor.
+
+        Args:
+            exporter: Exporter the batches are sent to
+            max_queue_size: Spans held for export; beyond it the oldest are dropped
+            max_batch_size: Maximum spans per export
+            schedule_delay: Seconds between exports of a partial batch
+            name: Name of the export in metrics
+        """
+        self.exporter = InstrumentedSpanExporter(exporter, name)
+        super().__init__(
+            self.exporter,
+            max_queue_size=max_queue_size,
+            schedule_delay_millis=schedule_delay * 1000,
+            max_export_batch_size=max_batch_size,
+        )
+        metrics.register_span_export(name, self.stats)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        """Queue a finished span for export without blocking."""
+        # The SDK queue is a bounded deque that silently discards its oldest span when full
+        queue = self._queue()
+        if (
+            queue is not None
+            and span.context.trace_flags.sampled
+            and len(queue) >= (queue.maxlen or len(queue) + 1)
+        ):
+            self.exporter.record_dropped()
+        super().on_end(span)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get export counters and the current queue size."""
+        queue = self._queue()
+        return {"queued": len(queue) if queue is not None else 0, **self.exporter.stats()}
+
+    def _queue(self) -> Optional[Any]:
+        """Get the SDK's queue of spans waiting for export."""
+        return getattr(self._batch_processor, "_queue", None)
@@ -0,0 +1,306 @@
+"""Record and replay of the traffic of a request, keyed by its trace ID.
+
+In ``record`` mode every process appends what it exchanged with the outside
+world (backend responses, LLM responses, tool inputs and outputs) to its own
+gzipped JSONL file in the traffic directory, one compact record per line:
+``{"t": trace_id, "k": kind, "key": key, "v": value}``.
+
+In ``replay`` mode every file of the directory is loaded and the recorded
+values are served back instead of calling the backends or the LLM provider.
+Values are looked up by kind, trace ID and key, in recording order, so a
+replayed request sees exactly the responses it saw while being recorded.
+A key that was not recorded for the trace falls back to the first value
+recorded for it by any trace, e.g. a search whose result was shared by
+request coalescing.
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from pydantic_ai import RunContext
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+)
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, DeltaToolCalls, FunctionModel
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+from core.mcp_session import current_trace_id
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+TRAFFIC_MODES = ("off", RECORD, REPLAY)
+
+
+class TrafficNotRecorded(LookupError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def iter_traffic(directory: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Read the records of every traffic file in a directory, file by file.
+
+    A file whose writer was killed ends in an incomplete gzip member; the
+    records before it are still returned.
+    """
+    for path in sorted(Path(directory).glob("*.jsonl.gz")):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            except (EOFError, json.JSONDecodeError):
+                logger.warning(f"Traffic file {path} is truncated")
+
+
+class TrafficRecorder:
+    """Recorded traffic of one process, either being written or being replayed."""
+
+    def __init__(
+        self, mode: str, directory: Union[str, Path], service: str, flush_every: int = 32
+    ) -> None:
+        """Initialize traffic recorder.
+
+        Args:
+            mode: ``record`` or ``replay``
+            directory: Directory of the traffic files
+            service: Name of the recording process, used in its file name
+            flush_every: Records written between flushes of the file
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Invalid traffic mode {mode!r}, expected record or replay")
+        self.mode = mode
+        self.directory = Path(directory)
+        self.flush_every = flush_every
+        self.path = self.directory / f"{service}-{os.getpid()}.jsonl.gz"
+        self._file: Optional[gzip.GzipFile] = None
+        self._lock = threading.Lock()
+        self._unflushed = 0
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+
+        self._values: Dict[Tuple[str, Optional[str], str], List[Any]] = defaultdict(list)
+        self._fallback: Dict[Tuple[str, str], Any] = {}
+        self._cursors: Dict[Tuple[str, Optional[str], str], int] = defaultdict(int)
+        if mode == REPLAY:
+            for record in iter_traffic(self.directory):
+                kind, key = record["k"], record["key"]
+                self._values[(kind, record.get("t"), key)].append(record["v"])
+                self._fallback.setdefault((kind, key), record["v"])
+            logger.info(f"Loaded {len(self._values)} recorded requests from {self.directory}")
+
+    @property
+    def recording(self) -> bool:
+        """Whether traffic is being recorded."""
+        return self.mode == RECORD
+
+    @property
+    def replaying(self) -> bool:
+        """Whether recorded traffic is being served."""
+        return self.mode == REPLAY
+
+    def record(self, kind: str, key: str, value: Any, trace_id: Optional[str] = None) -> None:
+        """Append a record; the trace ID defaults to the current request's.
+
+        Args:
+            kind: Kind of traffic, e.g. ``http``, ``llm`` or ``tool``
+            key: Identifies the request within its kind
+            value: JSON-serializable response
+            trace_id: Trace ID of the request
+        """
+        if trace_id is None:
+            trace_id = current_trace_id.get()
+        line = json.dumps(
+            {"t": trace_id, "k": kind, "key": key, "v": value},
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        )
+        with self._lock:
+            if self._file is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._file = gzip.open(self.path, "ab")
+            self._file.write(line.encode("utf-8") + b"\n")
+            self.recorded += 1
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self._file.flush()
+                self._unflushed = 0
+
+    def replay(self, kind: str, key: str, trace_id: Optional[str] = None) -> Any:
+        """Get the next recorded value; the trace ID defaults to the current request's.
+
+        The values recorded for a trace and key are served in order and start
+        over once exhausted, so a trace can be replayed repeatedly.
+
+        Raises:
+            TrafficNotRecorded: If no trace recorded the key
+        """
+        if trace_id is None:
+            trace_id = current_trace_id.get()
+        slot = (kind, trace_id, key)
+        with self._lock:
+            values = self._values.get(slot)
+            if values:
+                index = self._cursors[slot]
+                self._cursors[slot] = index + 1
+                self.replayed += 1
+                return values[index % len(values)]
+            if (kind, key) in self._fallback:
+                self.replayed += 1
+                return self._fallback[(kind, key)]
+            self.missed += 1
+        raise TrafficNotRecorded(f"No recorded {kind} traffic for {key!r} (trace {trace_id})")
+
+    def close(self) -> None:
+        """Flush and close the traffic file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get counts of recorded, replayed and missing requests."""
+        return {
+            "mode": self.mode,
+            "path": str(self.path if self.recording else self.directory),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "missed": self.missed,
+        }
+
+
+_recorders: Dict[Tuple[str, str], TrafficRecorder] = {}
+
+
+def get_traffic_recorder(mode: str, directory: str, service: str) -> Optional[TrafficRecorder]:
+    """Get the process-wide recorder for a traffic mode, or None if it is ``off``.
+
+    Args:
+        mode: ``off``, ``record`` or ``replay``
+        directory: Directory of the traffic files
+        service: Name of the recording process, used in its file name
+    """
+    if mode == "off":
+        return None
+    key = (mode, directory)
+    recorder = _recorders.get(key)
+    if recorder is None:
+        recorder = TrafficRecorder(mode, directory, service)
+        _recorders[key] = recorder
+        atexit.register(recorder.close)
+    return recorder
+
+
+def _dump_response(response: ModelResponse) -> Dict[str, Any]:
+    """Serialize a model response for the traffic file."""
+    return ModelMessagesTypeAdapter.dump_python([response], mode="json")[0]
+
+
+def _load_response(data: Dict[str, Any]) -> ModelResponse:
+    """Deserialize a recorded model response."""
+    response = ModelMessagesTypeAdapter.validate_python([data])[0]
+    assert isinstance(response, ModelResponse)
+    return response
+
+
+class RecordingModel(WrapperModel):
+    """Model that records every response of the wrapped model under the agent's name."""
+
+    def __init__(self, wrapped: Model, recorder: TrafficRecorder, name: str) -> None:
+        """Initialize recording model.
+
+        Args:
+            wrapped: Model answering the requests
+            recorder: Recorder in ``record`` mode
+            name: Agent name the responses are recorded under
+        """
+        super().__init__(wrapped)
+        self.recorder = recorder
+        self.name = name
+
+    async def request(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        """Request a response from the wrapped model and record it."""
+        response = await self.wrapped.request(messages, model_settings, model_request_parameters)
+        self.recorder.record("llm", self.name, _dump_response(response))
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: List[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+        run_context: Optional[RunContext[Any]] = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        """Stream a response from the wrapped model and record it once complete."""
+        async with self.wrapped.request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            yield stream
+        self.recorder.record("llm", self.name, _dump_response(stream.get()))
+
+
+def replay_model(recorder: TrafficRecorder, name: str) -> FunctionModel:
+    """Build a model that answers with the responses recorded under the agent's name.
+
+    Streamed requests get the recorded text and tool calls as one chunk per part.
+    """
+
+    def next_response() -> ModelResponse:
+        return _load_response(recorder.replay("llm", name))
+
+    async def respond(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        return next_response()
+
+    async def stream(
+        messages: List[ModelMessage], info: AgentInfo
+    ) -> AsyncIterator[Union[str, DeltaToolCalls]]:
+        for index, part in enumerate(next_response().parts):
+            if isinstance(part, TextPart):
+                yield part.content
+            elif isinstance(part, ToolCallPart):
+                yield {
+                    index: DeltaToolCall(
+                        part.tool_name, part.args_as_json_str(), tool_call_id=part.tool_call_id
+                    )
+                }
+
+    return FunctionModel(respond, stream_function=stream, model_name=f"replay:{name}")
+
+
+def traffic_model(
+    recorder: Optional[TrafficRecorder], name: str, build: Callable[[], Model]
+) -> Model:
+    """Get an agent's model: built as usual, recorded, or replayed.
+
+    Args:
+        recorder: Process recorder, if traffic is recorded or replayed
+        name: Agent name the responses are recorded under
+        build: Builds the real model; not called in replay mode
+    """
+    if recorder is None:
+        return build()
+    if recorder.replaying:
+        return replay_model(recorder, name)
+    return RecordingModel(build(), recorder, name)
@@ -19,6 +19,9 @@ class JudgeConfig:
         self.code_agent_type_parser_model_name = os.getenv(
             "CODE_AGENT_TYPE_PARSER_MODEL_NAME", "gpt-4o-mini"
         )
+        # Batch evaluation (evaluator.runner): rows evaluated at once, agent runs per second
+        self.eval_concurrency = int(os.getenv("EVAL_CONCURRENCY", "4"))
+        self.eval_requests_per_second = float(os.getenv("EVAL_REQUESTS_PER_SECOND", "0"))
         # Default to OpenAI
         self.default_base_url = os.getenv(
             "DEFAULT_BASE_URL", "https://api.openai.com/v1"
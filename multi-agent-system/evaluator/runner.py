@@ -0,0 +1,306 @@
+"""Batch evaluation of the code snippet finder against a JSONL dataset.
+
+Each dataset line is a JSON object with a ``question`` (or ``input.question``)
+and an ``expected_answer``: either a ``CodeSnippetResult`` object or free text,
+which is parsed like the agent's answer. An optional ``id`` identifies the row;
+it defaults to the line number.
+
+Every row runs ``CodeSnippetFinder`` -> ``CodeAgentTypeParser`` -> ``LLMJudge``.
+Results are appended to the output JSONL as rows finish, so an interrupted run
+resumes where it stopped: rows already judged are skipped, failed rows are
+retried. The summary (pass rate, latency percentiles) covers the whole output.
+
+Usage:
+    python -m evaluator.runner --dataset eval.jsonl --output results.jsonl --concurrency 4
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from core import AgentPool, MCPSessionManager, RateLimiter
+from evaluator.agent import CodeAgentTypeParser, LLMJudge
+from evaluator.config import JudgeConfig
+from evaluator.models import CodeSnippetResult
+from servers.context.agent import CodeSnippetFinder
+from servers.context.config import AgentConfig
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("finder", "parser", "judge")
+
+
+@dataclass
+class EvaluationRow:
+    """One question of the dataset and its expected answer."""
+
+    id: str
+    question: str
+    expected_answer: Union[CodeSnippetResult, str]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], line_number: int) -> "EvaluationRow":
+        """Build a row from a dataset line."""
+        question = data.get("question") or (data.get("input") or {}).get("question")
+        expected = data.get("expected_answer")
+        if not question or expected is None:
+            raise ValueError(f"line {line_number}: 'question' and 'expected_answer' are required")
+        if isinstance(expected, dict):
+            expected = CodeSnippetResult(**expected)
+        return cls(id=str(data.get("id", line_number)), question=question, expected_answer=expected)
+
+
+@dataclass
+class RowResult:
+    """Outcome of evaluating one row; ``error`` is set if any stage failed."""
+
+    id: str
+    question: str
+    trace_id: str
+    answer: str = ""
+    actual: Optional[Dict[str, Any]] = None
+    expected: Optional[Dict[str, Any]] = None
+    evaluation: Optional[Dict[str, Any]] = None
+    is_pass: bool = False
+    error: Optional[str] = None
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+
+
+def load_dataset(path: Path) -> List[EvaluationRow]:
+    """Read the evaluation rows of a JSONL dataset, skipping blank lines."""
+    rows = []
+    with path.open(encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                rows.append(EvaluationRow.from_json(json.loads(line), line_number))
+    return rows
+
+
+def load_results(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Read the results of earlier runs, keeping the latest result per row."""
+    results: Dict[str, Dict[str, Any]] = {}
+    if not path.exists():
+        return results
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run; that row is simply re-run
+                continue
+            results[result["id"]] = result
+    return results
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Get the q-th percentile (nearest rank) of values; 0 if there are none."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate row results into pass rate and latency percentiles per stage."""
+    judged = [result for result in results if not result.get("error")]
+    passed = sum(1 for result in judged if result.get("is_pass"))
+    latency: Dict[str, Dict[str, float]] = {}
+    for stage in (*STAGES, "total"):
+        values = [
+            result["latency_ms"][stage] for result in judged if stage in result.get("latency_ms", {})
+        ]
+        latency[stage] = {
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "mean": sum(values) / len(values) if values else 0.0,
+        }
+    return {
+        "rows": len(results),
+        "judged": len(judged),
+        "passed": passed,
+        "failed": len(judged) - passed,
+        "errors": len(results) - len(judged),
+        "pass_rate": passed / len(judged) if judged else 0.0,
+        "latency_ms": latency,
+    }
+
+
+class BatchEvaluator:
+    """Runs the finder, parser and judge over dataset rows with bounded concurrency.
+
+    At most ``concurrency`` rows are evaluated at once, each with its own pooled
+    ``CodeSnippetFinder``; the parser and judge are stateless and shared. With
+    ``requests_per_second`` set, every agent run waits for the rate limiter
+    before it starts.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        concurrency: int = 4,
+        requests_per_second: float = 0.0,
+        agent_config: Optional[AgentConfig] = None,
+    ) -> None:
+        """Initialize batch evaluator.
+
+        Args:
+            output_path: JSONL file results are appended to; doubles as checkpoint
+            concurrency: Maximum number of rows evaluated at once
+            requests_per_second: Maximum agent runs started per second; 0 for no limit
+            agent_config: Configuration of the code snippet finder
+        """
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.agent_config = agent_config or AgentConfig()
+        self.rate_limiter = RateLimiter(requests_per_second, burst=concurrency)
+        self._write_lock = asyncio.Lock()
+
+    async def run(self, rows: List[EvaluationRow]) -> Dict[str, Any]:
+        """Evaluate the rows not judged by an earlier run.
+
+        Args:
+            rows: Dataset rows
+
+        Returns:
+            Summary of all results in the output file
+        """
+        previous = load_results(self.output_path)
+        done = {row_id for row_id, result in previous.items() if not result.get("error")}
+        pending = [row for row in rows if row.id not in done]
+        logger.info(f"Evaluating {len(pending)} rows ({len(rows) - len(pending)} already judged)")
+
+        if pending:
+            await self._evaluate_all(pending)
+
+        row_ids = {row.id for row in rows}
+        results = [
+            result for row_id, result in load_results(self.output_path).items() if row_id in row_ids
+        ]
+        return summarize(results)
+
+    async def _evaluate_all(self, rows: List[EvaluationRow]) -> None:
+        """Evaluate rows with ``concurrency`` workers sharing one MCP session."""
+        mcp_session = MCPSessionManager(
+            self.agent_config.mcp_server_url,
+            health_check_interval=self.agent_config.mcp_health_check_interval,
+        )
+        finder_pool = AgentPool(
+            functools.partial(CodeSnippetFinder, mcp_session=mcp_session),
+            size=self.concurrency,
+            name="eval_code_snippet_finder",
+        )
+        parser = CodeAgentTypeParser()
+        judge = LLMJudge()
+        queue: "asyncio.Queue[EvaluationRow]" = asyncio.Queue()
+        for row in rows:
+            queue.put_nowait(row)
+        finished = 0
+
+        async def worker() -> None:
+            nonlocal finished
+            while not queue.empty():
+                row = queue.get_nowait()
+                result = await self._evaluate(row, finder_pool, parser, judge)
+                await self._write(result)
+                finished += 1
+                status = "error" if result.error else ("pass" if result.is_pass else "fail")
+                logger.info(f"[{finished}/{len(rows)}] {row.id}: {status}")
+
+        try:
+            await finder_pool.start()
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(rows)))))
+        finally:
+            await finder_pool.close()
+            await mcp_session.close()
+
+    async def _evaluate(
+        self,
+        row: EvaluationRow,
+        finder_pool: AgentPool[CodeSnippetFinder],
+        parser: CodeAgentTypeParser,
+        judge: LLMJudge,
+    ) -> RowResult:
+        """Run the three stages for one row, timing each of them."""
+        result = RowResult(id=row.id, question=row.question, trace_id=str(uuid.uuid4()))
+        start = time.perf_counter()
+        try:
+            async with self._stage(result, "finder"):
+                async with finder_pool.acquire(result.trace_id) as agent:
+                    result.answer = await agent.run(row.question)
+
+            expected = row.expected_answer
+            if isinstance(expected, str):
+                # Free-text expected answers take a second parser run
+                await self.rate_limiter.acquire()
+            async with self._stage(result, "parser"):
+                actual = await parser.run(result.answer)
+                if isinstance(expected, str):
+                    expected = await parser.run(expected)
+            result.actual = actual.model_dump()
+            result.expected = expected.model_dump()
+
+            async with self._stage(result, "judge"):
+                evaluation = await judge.run(row.question, expected, actual)
+            result.evaluation = evaluation.model_dump()
+            result.is_pass = evaluation.is_pass
+        except Exception as exc:
+            logger.warning(f"Row {row.id} failed: {exc}")
+            result.error = f"{type(exc).__name__}: {exc}"
+        result.latency_ms["total"] = (time.perf_counter() - start) * 1000
+        return result
+
+    @asynccontextmanager
+    async def _stage(self, result: RowResult, stage: str) -> AsyncIterator[None]:
+        """Wait for the rate limiter, then record the stage's latency."""
+        await self.rate_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            result.latency_ms[stage] = (time.perf_counter() - start) * 1000
+
+    async def _write(self, result: RowResult) -> None:
+        """Append a result to the output file and flush it, so it survives an interruption."""
+        line = json.dumps(asdict(result), ensure_ascii=False) + "\n"
+        async with self._write_lock:
+            with self.output_path.open("a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+
+
+async def async_main() -> None:
+    """Run a batch evaluation from the command line."""
+    config = JudgeConfig()
+    parser = argparse.ArgumentParser(description="Batch-evaluate the code snippet finder")
+    parser.add_argument("--dataset", type=Path, required=True, help="JSONL dataset")
+    parser.add_argument("--output", type=Path, required=True, help="JSONL results (checkpoint)")
+    parser.add_argument("--summary", type=Path, help="Summary JSON; defaults to the output path with a .summary.json suffix")
+    parser.add_argument("--concurrency", type=int, default=config.eval_concurrency)
+    parser.add_argument(
+        "--requests-per-second", type=float, default=config.eval_requests_per_second
+    )
+    args = parser.parse_args()
+
+    evaluator = BatchEvaluator(args.output, args.concurrency, args.requests_per_second)
+    summary = await evaluator.run(load_dataset(args.dataset))
+
+    summary_path = args.summary or args.output.with_suffix(".summary.json")
+    summary_path.write_text(json.dumps(summary, indent=2))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(async_main())
@@ -1,20 +1,76 @@
 """Simple web frontend for the multi-agent system."""
 
 import asyncio
+import functools
+import json
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Any, Dict, Optional
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, Form, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from servers.context.agent import CodeSnippetFinder, QueryReformater
+from core import AgentPool, MCPSessionManager
+from core.metrics import metrics, metrics_endpoint
+from servers.context.agent import CodeSnippetFinder, QueryReformater, precompile_prompts
+from servers.context.answer_cache import create_answer_cache
+from servers.context.config import AgentConfig
+from servers.context.pipeline import SearchPipeline
+from servers.context.progress import ProgressCallback, stream_progress
 
 load_dotenv()
 
-app = FastAPI(title="Multi-Agent Code Search System")
+# Warm agents reused across requests instead of being built per call, all
+# sharing one MCP session to the code search server
+agent_config = AgentConfig()
+if agent_config.metrics_enabled:
+    metrics.enable()
+mcp_session = MCPSessionManager(
+    agent_config.mcp_server_url, health_check_interval=agent_config.mcp_health_check_interval
+)
+code_snippet_finder_pool = AgentPool(
+    functools.partial(CodeSnippetFinder, mcp_session=mcp_session),
+    size=agent_config.code_snippet_finder_pool_size,
+    name="code_snippet_finder",
+)
+query_reformater_pool = AgentPool(
+    functools.partial(QueryReformater, mcp_session=mcp_session),
+    size=agent_config.query_reformater_pool_size,
+    name="query_reformater",
+)
+search_pipeline = SearchPipeline(
+    query_reformater_pool,
+    code_snippet_finder_pool,
+    mcp_session,
+    top_candidates=agent_config.pipeline_top_candidates,
+    max_line_matches=agent_config.pipeline_max_line_matches,
+)
+answer_cache = create_answer_cache(agent_config)
+
+if answer_cache is not None:
+    metrics.register_cache("answer", answer_cache.stats)
+metrics.register_agent_pools(
+    code_snippet_finder=code_snippet_finder_pool, query_reformater=query_reformater_pool
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Compile prompts and warm up the agent pools on startup; close the pools on shutdown."""
+    precompile_prompts()
+    await asyncio.gather(code_snippet_finder_pool.start(), query_reformater_pool.start())
+    try:
+        yield
+    finally:
+        await asyncio.gather(code_snippet_finder_pool.close(), query_reformater_pool.close())
+        await mcp_session.close()
+
+
+app = FastAPI(title="Multi-Agent Code Search System", lifespan=lifespan)
 
 # Templates
 templates_dir = Path(__file__).parent / "templates"
@@ -36,7 +92,7 @@ async def index(request: Request):
 async def query_reformulate(question: str = Form(...)):
     """Reformulate user query."""
     try:
-        async with QueryReformater() as agent:
+        async with query_reformater_pool.acquire() as agent:
             result = await agent.run(question)
         
         return {
@@ -51,20 +107,51 @@ async def query_reformulate(question: str = Form(...)):
         }
 
 
+async def _answer_question(
+    question: str, pipeline: bool, on_progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """Answer a question from the answer cache, or with the pipeline or the snippet finder agent.
+
+    Args:
+        question: User question
+        pipeline: Whether to use pipeline mode instead of a single agent run
+        on_progress: Optional callback for progress events
+
+    Returns:
+        Response fields: the ``answer``, plus ``cached`` on a cache hit or the
+        ``queries`` and ``candidates`` in pipeline mode
+    """
+    mode = "pipeline" if pipeline else "agent"
+    if answer_cache is not None:
+        cached = await answer_cache.get(question, mode)
+        if cached is not None:
+            return {"answer": cached, "cached": True}
+
+    if pipeline:
+        pipeline_result = await search_pipeline.run(question, on_progress=on_progress)
+        answer = pipeline_result.answer
+        usage = pipeline_result.usage
+        fields = {"queries": pipeline_result.queries, "candidates": pipeline_result.candidates}
+    else:
+        async with code_snippet_finder_pool.acquire() as agent:
+            answer = await agent.run(question, on_progress=on_progress)
+            usage = agent.last_usage
+        fields = {}
+    if answer_cache is not None:
+        await answer_cache.put(question, mode, answer, usage)
+    return {"answer": answer, **fields}
+
+
 @app.post("/api/code-search")
-async def code_search(question: str = Form(...)):
-    """Search for code snippets."""
+async def code_search(question: str = Form(...), pipeline: Optional[bool] = Form(None)):
+    """Search for code snippets, optionally in pipeline mode (reformulate, then search in parallel)."""
     import traceback
+    if pipeline is None:
+        pipeline = agent_config.agentic_search_pipeline
     try:
         # Try using the agent first
-        async with CodeSnippetFinder() as agent:
-            result = await agent.run(question)
-        
-        return {
-            "success": True,
-            "question": question,
-            "answer": result,
-        }
+        result = await _answer_question(question, pipeline)
+        return {"success": True, "question": question, **result}
     except Exception as e:
         # Fallback: Call Zoekt directly
         try:
@@ -123,6 +210,57 @@ async def code_search(question: str = Form(...)):
             }
 
 
+@app.post("/api/code-search/stream")
+async def code_search_stream(question: str = Form(...), pipeline: Optional[bool] = Form(None)):
+    """Search for code snippets, streaming progress as server-sent events.
+
+    Each event is a JSON object with a ``type`` (``queries``, ``candidates``,
+    ``tool_call``, ``files_found``, ``tool_result``, ``answer_delta``) and the
+    stream ends with an ``answer`` or ``error`` event.
+    """
+    if pipeline is None:
+        pipeline = agent_config.agentic_search_pipeline
+    result: Dict[str, Any] = {}
+
+    async def search(on_progress: ProgressCallback) -> str:
+        result.update(await _answer_question(question, pipeline, on_progress))
+        return result["answer"]
+
+    async def events():
+        async for event in stream_progress(search):
+            if event.type == "answer" and result.get("cached"):
+                event.data["cached"] = True
+            yield f"data: {json.dumps(event.to_dict(), default=str)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Answer cache statistics."""
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
+
+
+@app.post("/api/cache/invalidate")
+async def invalidate_cache(generation: Optional[int] = None):
+    """Invalidate cached answers, e.g. after the code index was rebuilt.
+
+    ``generation`` sets the new index generation; repeating the current one is a no-op.
+    """
+    if answer_cache is None:
+        return JSONResponse({"error": "answer cache is disabled"}, status_code=404)
+    return {"generation": await answer_cache.invalidate(generation)}
+
+
+app.get("/metrics")(metrics_endpoint)
+
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -2,28 +2,51 @@
 
 import asyncio
 import base64
+import functools
+import hashlib
 import json
 import logging
 import os
 import pathlib
 import signal
+import time
 import uuid
-from typing import Any, Dict, List
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+import httpx
 from dotenv import load_dotenv
 from fastmcp import FastMCP
-from fastmcp.server.dependencies import get_http_request
+from fastmcp.server.dependencies import get_context, get_http_request
 from opentelemetry import trace
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import SimpleSpanProcessor
 from starlette.requests import Request
-
-from backends.content_fetcher import AbstractContentFetcher, ContentFetcherFactory
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+
+from backends.cache import SearchResultCache
+from backends.content_cache import ContentCache
+from backends.content_fetcher import (
+    DEFAULT_CONTEXT_LINES,
+    AbstractContentFetcher,
+    ContentFetcherFactory,
+)
+from backends.http import AsyncHttpPool, HttpPoolConfig
 from backends.models import FormattedResult
-from backends.search import AbstractSearchClient, SearchClientFactory
-from core import PromptManager
+from backends.recording import RecordingContentFetcher, RecordingTransport
+from backends.search import (
+    DEFAULT_NUM_RESULTS,
+    MAX_NUM_RESULTS,
+    AbstractAsyncSearchClient,
+    SearchClientFactory,
+    TimedSearchClient,
+    merge_results,
+)
+from core import ConcurrencyLimiter, PromptManager, SingleFlight
+from core.mcp_session import current_trace_id
+from core.metrics import metrics, metrics_endpoint
+from core.telemetry import BackgroundSpanProcessor
+from core.traffic import get_traffic_recorder
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,6 +72,15 @@ class ServerConfig:
             self.langfuse_public_key = ""
             self.langfuse_secret_key = ""
             self.langfuse_host = ""
+
+        # Spans are exported in batches by a background thread instead of on span end;
+        # spans arriving while the queue is full are dropped
+        self.span_export_max_queue_size = int(os.getenv("SPAN_EXPORT_MAX_QUEUE_SIZE", "2048"))
+        self.span_export_max_batch_size = int(os.getenv("SPAN_EXPORT_MAX_BATCH_SIZE", "512"))
+        self.span_export_schedule_delay = float(
+            os.getenv("SPAN_EXPORT_SCHEDULE_DELAY_SECONDS", "1")
+        )
+        self.span_export_timeout = float(os.getenv("SPAN_EXPORT_TIMEOUT_SECONDS", "10"))
         
         self.search_backend = self._get_required_env("SEARCH_BACKEND").lower()
         self.zoekt_api_url = ""
@@ -66,6 +98,63 @@ class ServerConfig:
                 "Invalid option for SEARCH_BACKEND. Valid options are [zoekt|sourcegraph] "
             )
 
+        # Shared HTTP connection pool for backend requests
+        self.http_pool_size = int(os.getenv("SEARCH_HTTP_POOL_SIZE", "100"))
+        self.http_max_keepalive = int(os.getenv("SEARCH_HTTP_MAX_KEEPALIVE", "20"))
+        self.http_max_connections_per_host = int(
+            os.getenv("SEARCH_HTTP_MAX_CONNECTIONS_PER_HOST", "20")
+        )
+        self.http_keepalive_expiry = float(os.getenv("SEARCH_HTTP_KEEPALIVE_EXPIRY", "30"))
+        self.http_timeout = float(os.getenv("SEARCH_HTTP_TIMEOUT", "30"))
+
+        # Per-tool concurrency caps
+        self.search_max_concurrency = int(os.getenv("SEARCH_MAX_CONCURRENCY", "16"))
+        self.fetch_content_max_concurrency = int(
+            os.getenv("FETCH_CONTENT_MAX_CONCURRENCY", "8")
+        )
+        # Queries of one batch_search call that run at once, and queries accepted per call
+        self.batch_search_max_concurrency = int(os.getenv("BATCH_SEARCH_MAX_CONCURRENCY", "4"))
+        self.batch_search_max_queries = int(os.getenv("BATCH_SEARCH_MAX_QUERIES", "10"))
+
+        # Share one backend search among concurrent identical search requests
+        self.search_coalescing_enabled = (
+            os.getenv("SEARCH_COALESCING_ENABLED", "true").lower() == "true"
+        )
+
+        # Search result cache
+        self.search_cache_enabled = (
+            os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+        )
+        self.search_cache_ttl_seconds = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+        self.search_cache_max_entries = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+        self.search_cache_max_bytes = int(
+            os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+        )
+
+        # File content cache (the disk tier is enabled by setting CONTENT_CACHE_DIR)
+        self.content_cache_enabled = (
+            os.getenv("CONTENT_CACHE_ENABLED", "true").lower() == "true"
+        )
+        self.content_cache_max_bytes = int(
+            os.getenv("CONTENT_CACHE_MAX_BYTES", str(32 * 1024 * 1024))
+        )
+        self.content_cache_revalidate_seconds = float(
+            os.getenv("CONTENT_CACHE_REVALIDATE_SECONDS", "60")
+        )
+        self.content_cache_dir = os.getenv("CONTENT_CACHE_DIR", "")
+        self.content_cache_max_disk_bytes = int(
+            os.getenv("CONTENT_CACHE_MAX_DISK_BYTES", str(256 * 1024 * 1024))
+        )
+
+        # Prometheus /metrics (backend search and content fetch latencies, cache hit
+        # ratios, in-flight requests); needs prometheus_client
+        self.metrics_enabled = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+        # Record backend responses and tool calls per trace ID to TRAFFIC_DIR, or
+        # serve recorded backend responses instead of calling the backend
+        self.traffic_mode = os.getenv("TRAFFIC_MODE", "off").lower()
+        self.traffic_dir = os.getenv("TRAFFIC_DIR", "traffic")
+
     @staticmethod
     def _get_required_env(key: str) -> str:
         """Get required environment variable or raise descriptive error."""
@@ -81,6 +170,7 @@ class TelemetryManager:
     def __init__(self, config: ServerConfig) -> None:
         """Initialize telemetry manager."""
         self.config = config
+        self.provider: Optional[TracerProvider] = None
         self._setup_telemetry()
 
     def _setup_telemetry(self) -> None:
@@ -98,8 +188,22 @@ class TelemetryManager:
         )
 
         trace_provider = TracerProvider()
-        trace_provider.add_span_processor(SimpleSpanProcessor(OTLPSpanExporter()))
+        trace_provider.add_span_processor(
+            BackgroundSpanProcessor(
+                OTLPSpanExporter(timeout=self.config.span_export_timeout),
+                max_queue_size=self.config.span_export_max_queue_size,
+                max_batch_size=self.config.span_export_max_batch_size,
+                schedule_delay=self.config.span_export_schedule_delay,
+                name="langfuse",
+            )
+        )
         trace.set_tracer_provider(trace_provider)
+        self.provider = trace_provider
+
+    def shutdown(self) -> None:
+        """Export the spans still queued and stop the exporter."""
+        if self.provider is not None:
+            self.provider.shutdown()
 
     @staticmethod
     def get_tracer(name: str) -> trace.Tracer:
@@ -113,26 +217,82 @@ tracer = telemetry.get_tracer("codesearch-mcp")
 
 server = FastMCP(sse_path="/codesearch/sse", message_path="/codesearch/messages/")
 
+if config.metrics_enabled:
+    metrics.enable()
+
+traffic = get_traffic_recorder(config.traffic_mode, config.traffic_dir, "codesearch")
+if traffic is not None:
+    logger.info(f"Traffic {traffic.mode} mode, traffic directory {traffic.directory}")
+
+http_pool_config = HttpPoolConfig(
+    max_connections=config.http_pool_size,
+    max_keepalive_connections=config.http_max_keepalive,
+    max_connections_per_host=config.http_max_connections_per_host,
+    keepalive_expiry=config.http_keepalive_expiry,
+    timeout=config.http_timeout,
+)
+http_pool = AsyncHttpPool(
+    http_pool_config,
+    transport=(
+        RecordingTransport(traffic, httpx.AsyncHTTPTransport(limits=http_pool_config.limits()))
+        if traffic is not None
+        else None
+    ),
+)
+
 search_client_kwargs = {
     "base_url": config.zoekt_api_url,
     "endpoint": config.sourcegraph_endpoint,
     "token": config.sourcegraph_token,
+    "http_pool": http_pool,
 }
-search_client: AbstractSearchClient = SearchClientFactory.create_client(
+search_client: AbstractAsyncSearchClient = SearchClientFactory.create_async_client(
     backend=config.search_backend, **search_client_kwargs
 )
+if metrics.enabled:
+    search_client = TimedSearchClient(
+        search_client, functools.partial(metrics.observe_backend_search, config.search_backend)
+    )
+search_cache = SearchResultCache(
+    ttl_seconds=config.search_cache_ttl_seconds,
+    max_entries=config.search_cache_max_entries,
+    max_bytes=config.search_cache_max_bytes,
+)
 logger.info(f"Using {config.search_backend} search backend")
 
+content_cache = ContentCache(
+    max_bytes=config.content_cache_max_bytes,
+    revalidate_after=config.content_cache_revalidate_seconds,
+    disk_dir=config.content_cache_dir or None,
+    max_disk_bytes=config.content_cache_max_disk_bytes,
+)
+
 content_fetcher_kwargs = {
     "zoekt_url": config.zoekt_api_url,
     "endpoint": config.sourcegraph_endpoint,
     "token": config.sourcegraph_token,
+    "cache": content_cache if config.content_cache_enabled else None,
 }
 content_fetcher: AbstractContentFetcher = ContentFetcherFactory.create_fetcher(
     backend=config.search_backend, **content_fetcher_kwargs
 )
+if traffic is not None:
+    content_fetcher = RecordingContentFetcher(content_fetcher, traffic)
 logger.info(f"Using {config.search_backend} content fetcher backend")
 
+search_limiter = ConcurrencyLimiter(config.search_max_concurrency, name="search")
+fetch_content_limiter = ConcurrencyLimiter(
+    config.fetch_content_max_concurrency, name="fetch_content"
+)
+search_flight: SingleFlight[List[FormattedResult]] = SingleFlight(name="search")
+
+if config.search_cache_enabled:
+    metrics.register_cache("search", search_cache.stats)
+if config.content_cache_enabled:
+    metrics.register_cache("content", content_cache.stats)
+metrics.register_in_flight("search", lambda: search_limiter.in_flight)
+metrics.register_in_flight("fetch_content", lambda: fetch_content_limiter.in_flight)
+
 prompt_manager = PromptManager(
     file_path=pathlib.Path(__file__).parent.parent.parent / "prompts" / "prompts.yaml"
 )
@@ -141,6 +301,9 @@ prompt_manager = PromptManager(
 CODESEARCH_GUIDE = prompt_manager._load_prompt(
     f"guides.codesearch_guide.{config.search_backend}"
 )
+CODESEARCH_GUIDE_COMPACT = prompt_manager._load_prompt(
+    f"guides.codesearch_guide_compact.{config.search_backend}"
+)
 SEARCH_TOOL_DESCRIPTION = prompt_manager._load_prompt(f"tools.search.{config.search_backend}")
 SEARCH_PROMPT_GUIDE_DESCRIPTION = prompt_manager._load_prompt(
     f"tools.search_prompt_guide.{config.search_backend}"
@@ -153,6 +316,23 @@ try:
 except Exception:
     ORG_GUIDE = ""  # Fallback if not found
 
+
+def _build_guide(codesearch_guide: str) -> str:
+    """Prepend the organization guide, if any, to a code search guide."""
+    return f"{ORG_GUIDE}\n\n{codesearch_guide}" if ORG_GUIDE else codesearch_guide
+
+
+# search_prompt_guide responses only differ in the objective, so the guides are built
+# once; the version lets clients that already have a guide skip downloading it again
+SEARCH_GUIDES = {
+    "full": _build_guide(CODESEARCH_GUIDE),
+    "compact": _build_guide(CODESEARCH_GUIDE_COMPACT),
+}
+GUIDE_VERSIONS = {
+    variant: hashlib.sha256(guide.encode("utf-8")).hexdigest()[:16]
+    for variant, guide in SEARCH_GUIDES.items()
+}
+
 _shutdown_requested = False
 
 
@@ -179,24 +359,80 @@ def _set_span_attributes(
         logger.error(f"Error setting span attributes: {exc}")
 
 
+def _request_trace_id() -> str:
+    """Get the trace ID of the current tool call and make it the task's current one.
+
+    Pooled agents share an MCP session across requests, so they send the
+    per-request trace ID in the call's ``_meta``; the ``X-TRACE-ID`` header
+    is the fallback for clients that only set it per session. Every tool call
+    runs in its own task; recorded backend traffic is keyed by its trace ID.
+    """
+    trace_id = None
+    try:
+        meta = get_context().request_context.meta
+        trace_id = (meta.model_extra or {}).get("trace_id") if meta else None
+    except (LookupError, RuntimeError, ValueError):
+        pass
+    if not trace_id:
+        request: Request = get_http_request()
+        trace_id = request.headers.get("X-TRACE-ID", uuid.uuid4())
+    trace_id = str(trace_id)
+    current_trace_id.set(trace_id)
+    return trace_id
+
+
+def _record_tool_call(name: str, input_data: Dict[str, Any], result: Any, trace_id: str) -> None:
+    """Record a tool call's arguments and result when traffic is being recorded."""
+    if traffic is not None and traffic.recording:
+        traffic.record("tool", name, {"args": input_data, "result": result}, trace_id)
+
+
 @tracer.start_as_current_span("CodeSearchMcp:fetch_content")
-@server.tool()
-def fetch_content(repo: str, path: str) -> str:
-    """Fetch file or directory content from a repository."""
+@server.tool(description=FETCH_CONTENT_DESCRIPTION)
+async def fetch_content(
+    repo: str,
+    path: str,
+    revision: str = "",
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+    around_line: Optional[int] = None,
+    context_lines: int = DEFAULT_CONTEXT_LINES,
+) -> str:
+    """Fetch file or directory content from a repository, optionally only a range of lines."""
     if _shutdown_requested:
         logger.info("Shutdown in progress, declining new requests")
         return ""
 
     span = trace.get_current_span()
-    request: Request = get_http_request()
-    trace_id = str(request.headers.get("X-TRACE-ID", uuid.uuid4()))
+    trace_id = _request_trace_id()
 
     try:
-        result = content_fetcher.get_content(repo, path)
-
-        input_data = {"repo": repo, "path": path}
+        start = time.perf_counter()
+        # Content fetchers are blocking, so run them in the bounded worker pool
+        result = await fetch_content_limiter.run_sync(
+            content_fetcher.get_content,
+            repo,
+            path,
+            revision,
+            start_line=start_line,
+            end_line=end_line,
+            around_line=around_line,
+            context_lines=context_lines,
+        )
+        metrics.observe_content_fetch(time.perf_counter() - start, result)
+
+        input_data = {
+            "repo": repo,
+            "path": path,
+            "revision": revision,
+            "start_line": start_line,
+            "end_line": end_line,
+            "around_line": around_line,
+            "context_lines": context_lines,
+        }
         output_data = {"output": result}
         _set_span_attributes(span, input_data, output_data, trace_id)
+        _record_tool_call("fetch_content", input_data, result, trace_id)
 
         return result
     except ValueError as e:
@@ -207,42 +443,97 @@ def fetch_content(repo: str, path: str) -> str:
         return "error fetching content"
 
 
+def _normalize_search_limits(
+    num_results: int, max_line_matches: Optional[int], context_lines: int
+) -> Tuple[int, Optional[int], int]:
+    """Clamp search limits to the supported ranges."""
+    num_results = max(1, min(num_results, MAX_NUM_RESULTS))
+    if max_line_matches is not None and max_line_matches < 1:
+        max_line_matches = None
+    return num_results, max_line_matches, max(context_lines, 0)
+
+
+async def _search_backend(
+    query: str, num_results: int, max_line_matches: Optional[int], context_lines: int
+) -> List[FormattedResult]:
+    """Search the backend, sharing the search with concurrent identical requests.
+
+    Cache hits are served right away; only misses wait for a search slot.
+    """
+    key = SearchResultCache.make_key(
+        config.search_backend, query, num_results, max_line_matches, context_lines
+    )
+    if config.search_cache_enabled:
+        cached = search_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+    async def search_uncached() -> List[FormattedResult]:
+        results = await search_limiter.run(
+            search_client.search, query, num_results, max_line_matches, context_lines
+        )
+        if config.search_cache_enabled:
+            search_cache.put(key, results)
+        return results
+
+    if not config.search_coalescing_enabled:
+        return list(await search_uncached())
+    return list(await search_flight.run(key, search_uncached))
+
+
+def _simplify_results(results: List[FormattedResult]) -> List[Dict[str, Any]]:
+    """Summarize search results for span attributes."""
+    return [
+        {
+            "repository": result.repository,
+            "file_name": result.filename,
+            "matches": [{"line_number": match.line_number} for match in result.matches],
+        }
+        for result in results
+    ]
+
+
 @tracer.start_as_current_span("CodeSearchMcp:search")
-@server.tool()
-def search(query: str) -> List[FormattedResult]:
-    """Search codebases."""
+@server.tool(description=SEARCH_TOOL_DESCRIPTION)
+async def search(
+    query: str,
+    num_results: int = DEFAULT_NUM_RESULTS,
+    max_line_matches: Optional[int] = None,
+    context_lines: int = 0,
+) -> List[FormattedResult]:
+    """Search codebases, optionally limiting files, line matches per file and context lines."""
     if _shutdown_requested:
         logger.info("Shutdown in progress, declining new requests")
         return []
 
-    num_results = 30
+    num_results, max_line_matches, context_lines = _normalize_search_limits(
+        num_results, max_line_matches, context_lines
+    )
     logger.info(f"Search query: {query}")
 
-    request: Request = get_http_request()
-    trace_id = str(request.headers.get("X-TRACE-ID", uuid.uuid4()))
+    trace_id = _request_trace_id()
     span = trace.get_current_span()
 
     try:
-        results = search_client.search(query, num_results)
-        formatted_results = search_client.format_results(results, num_results)
-
-        simplified_results = [
-            {
-                "repository": result.repository,
-                "file_name": result.filename,
-                "matches": [
-                    {"line_number": match.line_number} for match in result.matches
-                ],
-            }
-            for result in formatted_results
-        ]
-
-        input_data = {"query": query}
-        output_data = {"results": simplified_results}
+        # The client builds the final results in one pass while parsing
+        formatted_results = await _search_backend(
+            query, num_results, max_line_matches, context_lines
+        )
+
+        input_data = {
+            "query": query,
+            "num_results": num_results,
+            "max_line_matches": max_line_matches,
+            "context_lines": context_lines,
+        }
+        output_data = {"results": _simplify_results(formatted_results)}
         _set_span_attributes(span, input_data, output_data, trace_id)
+        _record_tool_call(
+            "search", input_data, [asdict(result) for result in formatted_results], trace_id
+        )
 
         return formatted_results
-    except requests.exceptions.HTTPError as exc:
+    except httpx.HTTPStatusError as exc:
         logger.error(f"Search HTTP error: {exc}")
         return []
     except Exception as exc:
@@ -250,25 +541,140 @@ def search(query: str) -> List[FormattedResult]:
         return []
 
 
+@tracer.start_as_current_span("CodeSearchMcp:batch_search")
 @server.tool()
-def search_prompt_guide(objective: str) -> str:
-    """Generate a search prompt guide for the given objective."""
+async def batch_search(
+    queries: List[str],
+    num_results: int = DEFAULT_NUM_RESULTS,
+    max_line_matches: Optional[int] = None,
+    context_lines: int = 0,
+) -> List[FormattedResult]:
+    """Run several search queries at once and return their merged results in one call.
+
+    Use it instead of consecutive ``search`` calls for variants of the same intent.
+    Each file appears once with the line matches of all queries; files found by
+    more queries come first. ``num_results`` limits the merged list.
+    """
     if _shutdown_requested:
-        logger.info("Shutdown in progress, declining new prompt guide requests")
-        return "Server is shutting down"
+        logger.info("Shutdown in progress, declining new requests")
+        return []
+
+    num_results, max_line_matches, context_lines = _normalize_search_limits(
+        num_results, max_line_matches, context_lines
+    )
+    unique_queries = list(dict.fromkeys(query.strip() for query in queries if query.strip()))
+    if len(unique_queries) > config.batch_search_max_queries:
+        logger.warning(
+            f"Batch search truncated from {len(unique_queries)} to {config.batch_search_max_queries} queries"
+        )
+        unique_queries = unique_queries[: config.batch_search_max_queries]
+    logger.info(f"Batch search queries: {unique_queries}")
+
+    trace_id = _request_trace_id()
+    span = trace.get_current_span()
+    batch_limit = asyncio.Semaphore(config.batch_search_max_concurrency)
+
+    async def run_query(query: str) -> List[FormattedResult]:
+        async with batch_limit:
+            try:
+                return await _search_backend(query, num_results, max_line_matches, context_lines)
+            except Exception as exc:
+                logger.error(f"Batch search query {query!r} failed: {exc}")
+                return []
+
+    result_lists = await asyncio.gather(*(run_query(query) for query in unique_queries))
+    merged_results = merge_results(result_lists, num_results, max_line_matches)
+
+    input_data = {
+        "queries": unique_queries,
+        "num_results": num_results,
+        "max_line_matches": max_line_matches,
+        "context_lines": context_lines,
+    }
+    output_data = {
+        "results": _simplify_results(merged_results),
+        "results_per_query": [len(results) for results in result_lists],
+    }
+    _set_span_attributes(span, input_data, output_data, trace_id)
+    _record_tool_call(
+        "batch_search", input_data, [asdict(result) for result in merged_results], trace_id
+    )
 
-    prompt_parts = []
+    return merged_results
 
-    if ORG_GUIDE:
-        prompt_parts.append(ORG_GUIDE)
-        prompt_parts.append("\n\n")
 
-    prompt_parts.append(CODESEARCH_GUIDE)
-    prompt_parts.append(
-        f"\nGiven this guide create a {config.search_backend} query for {objective} and call the search tool accordingly."
+@server.tool(description=SEARCH_PROMPT_GUIDE_DESCRIPTION)
+def search_prompt_guide(
+    objective: str,
+    compact: bool = False,
+    include_version: bool = False,
+    known_version: str = "",
+) -> str:
+    """Generate a search prompt guide for the given objective.
+
+    ``compact`` selects the short guide. ``include_version`` starts the response
+    with the guide's version; passing that version back as ``known_version``
+    skips the guide body while it is unchanged.
+    """
+    if _shutdown_requested:
+        logger.info("Shutdown in progress, declining new prompt guide requests")
+        return "Server is shutting down"
+
+    variant = "compact" if compact else "full"
+    version = GUIDE_VERSIONS[variant]
+    instruction = (
+        f"\nGiven this guide create a {config.search_backend} query for {objective} "
+        f"and call the search tool accordingly."
     )
+    if known_version == version:
+        return f"Guide version {version} is unchanged; use the guide you already have.{instruction}"
+    if include_version or known_version:
+        return f"Guide version: {version}\n\n{SEARCH_GUIDES[variant]}{instruction}"
+    return SEARCH_GUIDES[variant] + instruction
+
+
+@server.custom_route("/codesearch/guide", methods=["GET"])
+async def get_search_guide(request: Request) -> Response:
+    """Return the search guide without an objective; ``?compact=true`` selects the short guide.
+
+    The guide version is the ETag, so clients can revalidate with ``If-None-Match``.
+    """
+    variant = "compact" if request.query_params.get("compact", "").lower() == "true" else "full"
+    etag = f'"{GUIDE_VERSIONS[variant]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return PlainTextResponse(SEARCH_GUIDES[variant], headers={"ETag": etag})
+
+
+@server.custom_route("/codesearch/cache/invalidate", methods=["POST"])
+async def invalidate_search_cache(request: Request) -> JSONResponse:
+    """Invalidate cached search results, e.g. after the index was rebuilt.
+
+    An optional ``generation`` query parameter sets the new index generation;
+    repeating the current generation leaves the cache untouched.
+    """
+    generation = request.query_params.get("generation")
+    try:
+        active = search_cache.invalidate(int(generation) if generation else None)
+    except ValueError:
+        return JSONResponse({"error": "generation must be an integer"}, status_code=400)
+    logger.info(f"Search cache generation is now {active}")
+    return JSONResponse({"generation": active})
+
+
+@server.custom_route("/codesearch/cache/stats", methods=["GET"])
+async def cache_stats(request: Request) -> JSONResponse:
+    """Return search and content cache statistics, and how many searches were coalesced."""
+    return JSONResponse(
+        {
+            "search": search_cache.stats(),
+            "content": content_cache.stats(),
+            "coalescing": search_flight.stats(),
+        }
+    )
+
 
-    return "".join(prompt_parts)
+server.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
 
 
 def _register_tools() -> None:
@@ -289,7 +695,14 @@ async def _run_server() -> None:
         ),
         server.run_http_async(transport="sse", host="0.0.0.0", port=config.sse_port),
     ]
-    await asyncio.gather(*tasks)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        fetch_content_limiter.shutdown()
+        await http_pool.aclose()
+        if traffic is not None:
+            traffic.close()
+        telemetry.shutdown()
 
 
 def main() -> None:
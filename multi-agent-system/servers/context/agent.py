@@ -1,25 +1,51 @@
 """Agent implementations for context provider."""
 
+import logging
 import os
 import pathlib
 import uuid
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from pydantic_ai.agent import Agent
 from pydantic_ai.mcp import MCPServerStreamableHTTP
+from pydantic_ai.messages import AgentStreamEvent
 from pydantic_ai.models import Model
 from pydantic_ai.models.openai import OpenAIChatModel, OpenAIModelSettings
 from pydantic_ai.providers.openai import OpenAIProvider
 from pydantic_ai.settings import ModelSettings
+from pydantic_ai.toolsets import AbstractToolset
 
 from core import PromptManager
-from core.limiters import TokenLimiter, ToolCallLimiter
+from core.limiters import TokenLimiter, TokenUsageReport, ToolCallLimiter
+from core.mcp_session import current_trace_id, send_trace_id
+from core.metrics import instrument_model, metrics
+from core.traffic import TrafficRecorder, get_traffic_recorder, traffic_model
 from servers.context.config import AgentConfig
+from servers.context.progress import ProgressCallback, progress_event
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+PROMPTS_FILE = pathlib.Path(__file__).parent.parent.parent / "prompts" / "prompts.yaml"
+PROMPT_SECTIONS = ("agents.query_reformater", "agents.code_snippet_finder")
+
+
+def traffic_recorder(config: AgentConfig) -> Optional[TrafficRecorder]:
+    """Get the process recorder of agent traffic, or None if TRAFFIC_MODE is off."""
+    return get_traffic_recorder(config.traffic_mode, config.traffic_dir, "context")
+
+
+def precompile_prompts() -> int:
+    """Compile the prompt templates of all context agents, e.g. at server startup.
+
+    Returns:
+        Number of compiled templates
+    """
+    return sum(PromptManager(PROMPTS_FILE, section).precompile() for section in PROMPT_SECTIONS)
+
 
 class QueryReformaterResult(BaseModel):
     """Result from query reformater agent."""
@@ -33,7 +59,11 @@ class QueryReformater:
     """Agent that reformulates user queries for better codebase search."""
 
     def __init__(
-        self, trace_id: str = None, max_tool_calls: int = None, max_tokens: int = None
+        self,
+        trace_id: str = None,
+        max_tool_calls: int = None,
+        max_tokens: int = None,
+        mcp_session: Optional[AbstractToolset[Any]] = None,
     ) -> None:
         """Initialize query reformater agent.
 
@@ -41,15 +71,15 @@ class QueryReformater:
             trace_id: Optional trace ID for tracking
             max_tool_calls: Maximum number of tool calls allowed
             max_tokens: Maximum number of tokens allowed
+            mcp_session: Shared MCP session (e.g. ``MCPSessionManager``); a private
+                connection is opened if omitted
         """
         self.config = AgentConfig()
-        prompt_file_path = (
-            pathlib.Path(__file__).parent.parent.parent / "prompts" / "prompts.yaml"
-        )
 
         self._prompt_manager = PromptManager(
-            file_path=prompt_file_path,
+            file_path=PROMPTS_FILE,
             section_path="agents.query_reformater",
+            hot_reload=self.config.prompt_hot_reload,
         )
         self._mcp_context = None
 
@@ -61,18 +91,22 @@ class QueryReformater:
         self._token_limiter = TokenLimiter(max_tokens=max_tokens)
         self._max_tool_calls = max_tool_calls
         self._max_tokens = max_tokens
+        self.last_usage: Optional[TokenUsageReport] = None
 
         if trace_id is None:
             trace_id = str(uuid.uuid4())
+        # Can be changed between runs, e.g. by AgentPool for each request
+        self.trace_id = trace_id
 
         headers = {"X-TRACE-ID": trace_id}
 
         model, model_settings = self._llm_model
 
-        mcp_server = MCPServerStreamableHTTP(
+        mcp_server = mcp_session or MCPServerStreamableHTTP(
             url=self.config.mcp_server_url,
             headers=headers,
             timeout=30,
+            process_tool_call=send_trace_id,
         )
 
         self._mcp_server = self._tool_limiter.wrap_mcp_server(mcp_server)
@@ -109,6 +143,11 @@ class QueryReformater:
             result = await self._mcp_context.__aexit__(exc_type, exc_val, exc_tb)
             return result
 
+    @property
+    def tool_call_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tool call counts and latencies of the last run."""
+        return self._tool_limiter.report()
+
     async def run(self, question: str) -> QueryReformaterResult:
         """Run the query reformater agent.
 
@@ -116,13 +155,24 @@ class QueryReformater:
             question: User question to reformulate
 
         Returns:
-            QueryReformaterResult with suggested queries
+            QueryReformaterResult with suggested queries; token usage is kept in ``last_usage``
+
+        Raises:
+            TokenLimitExceeded: If no answer fits in the token budget
         """
         self._tool_limiter.reset()
 
-        result = await self._token_limiter.run_with_limit(
-            self._agent,
-            self._prompt_manager.render_prompt("user_prompt", question=question),
+        token = current_trace_id.set(self.trace_id)
+        try:
+            result = await self._token_limiter.run_with_limit(
+                self._agent,
+                self._prompt_manager.render_prompt("user_prompt", question=question),
+            )
+        finally:
+            current_trace_id.reset(token)
+        self.last_usage = result.usage
+        metrics.observe_agent_run(
+            self._agent.name, result.usage.duration_ms / 1000, result.usage.tool_calls
         )
         return result.output
 
@@ -149,10 +199,15 @@ class QueryReformater:
         if provider_kwargs.get("api_key"):
             provider = OpenAIProvider(**provider_kwargs)
         
-        model = OpenAIChatModel(
-            model_name=self.config.query_reformater_model_name,
-            provider=provider,
+        model = traffic_model(
+            traffic_recorder(self.config),
+            "query_reformater",
+            lambda: OpenAIChatModel(
+                model_name=self.config.query_reformater_model_name,
+                provider=provider,
+            ),
         )
+        model = instrument_model(model, "query_reformater")
         model_settings = OpenAIModelSettings(
             temperature=0.0,
             max_tokens=8192,
@@ -166,7 +221,11 @@ class CodeSnippetFinder:
     """Agent that finds code snippets from the codebase."""
 
     def __init__(
-        self, trace_id: str = None, max_tool_calls: int = None, max_tokens: int = None
+        self,
+        trace_id: str = None,
+        max_tool_calls: int = None,
+        max_tokens: int = None,
+        mcp_session: Optional[AbstractToolset[Any]] = None,
     ) -> None:
         """Initialize code snippet finder agent.
 
@@ -174,14 +233,14 @@ class CodeSnippetFinder:
             trace_id: Optional trace ID for tracking
             max_tool_calls: Maximum number of tool calls allowed
             max_tokens: Maximum number of tokens allowed
+            mcp_session: Shared MCP session (e.g. ``MCPSessionManager``); a private
+                connection is opened if omitted
         """
         self.config = AgentConfig()
-        prompt_file_path = (
-            pathlib.Path(__file__).parent.parent.parent / "prompts" / "prompts.yaml"
-        )
         self._prompt_manager = PromptManager(
-            file_path=prompt_file_path,
+            file_path=PROMPTS_FILE,
             section_path="agents.code_snippet_finder",
+            hot_reload=self.config.prompt_hot_reload,
         )
         self._mcp_context = None
 
@@ -193,18 +252,22 @@ class CodeSnippetFinder:
         self._token_limiter = TokenLimiter(max_tokens=max_tokens)
         self._max_tool_calls = max_tool_calls
         self._max_tokens = max_tokens
+        self.last_usage: Optional[TokenUsageReport] = None
 
         if trace_id is None:
             trace_id = str(uuid.uuid4())
+        # Can be changed between runs, e.g. by AgentPool for each request
+        self.trace_id = trace_id
 
         headers = {"X-TRACE-ID": trace_id}
 
         model, model_settings = self._llm_model
 
-        mcp_server = MCPServerStreamableHTTP(
+        mcp_server = mcp_session or MCPServerStreamableHTTP(
             url=self.config.mcp_server_url,
             headers=headers,
             timeout=30,
+            process_tool_call=send_trace_id,
         )
 
         self._mcp_server = self._tool_limiter.wrap_mcp_server(mcp_server)
@@ -241,20 +304,60 @@ class CodeSnippetFinder:
             result = await self._mcp_context.__aexit__(exc_type, exc_val, exc_tb)
             return result
 
-    async def run(self, question: str) -> str:
+    @property
+    def tool_call_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tool call counts and latencies of the last run."""
+        return self._tool_limiter.report()
+
+    async def run(
+        self,
+        question: str,
+        candidates: Optional[List[Dict[str, Any]]] = None,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> str:
         """Run the code snippet finder agent.
 
         Args:
             question: User question to answer
+            candidates: Search results to start from (``repository``, ``filename``,
+                ``matches``), e.g. from the search pipeline
+            on_progress: Receives tool calls, found files and answer tokens as they happen
 
         Returns:
-            Agent response as string
+            Agent response as string; token usage is kept in ``last_usage``
+
+        Raises:
+            TokenLimitExceeded: If no answer fits in the token budget
         """
         self._tool_limiter.reset()
 
-        result = await self._token_limiter.run_with_limit(
-            self._agent,
-            self._prompt_manager.render_prompt("user_prompt", question=question),
+        if candidates:
+            user_prompt = self._prompt_manager.render_prompt(
+                "candidates_prompt", question=question, candidates=candidates
+            )
+        else:
+            user_prompt = self._prompt_manager.render_prompt("user_prompt", question=question)
+
+        on_event = None
+        if on_progress is not None:
+
+            async def on_event(event: AgentStreamEvent) -> None:
+                # Progress reporting must never fail the search
+                try:
+                    progress = progress_event(event)
+                    if progress is not None:
+                        await on_progress(progress)
+                except Exception as exc:
+                    logger.debug(f"Could not report progress: {exc}")
+
+        token = current_trace_id.set(self.trace_id)
+        try:
+            result = await self._token_limiter.run_with_limit(self._agent, user_prompt, on_event)
+        finally:
+            current_trace_id.reset(token)
+        self.last_usage = result.usage
+        metrics.observe_agent_run(
+            self._agent.name, result.usage.duration_ms / 1000, result.usage.tool_calls
         )
         return result.output
 
@@ -281,10 +384,15 @@ class CodeSnippetFinder:
         if provider_kwargs.get("api_key"):
             provider = OpenAIProvider(**provider_kwargs)
         
-        model = OpenAIChatModel(
-            model_name=self.config.code_snippet_finder_model_name,
-            provider=provider,
+        model = traffic_model(
+            traffic_recorder(self.config),
+            "code_snippet_finder",
+            lambda: OpenAIChatModel(
+                model_name=self.config.code_snippet_finder_model_name,
+                provider=provider,
+            ),
         )
+        model = instrument_model(model, "code_snippet_finder")
         model_settings = OpenAIModelSettings(
             temperature=0.0,
             max_tokens=8192,
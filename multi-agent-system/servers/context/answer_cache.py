@@ -0,0 +1,406 @@
+"""Answer cache for agentic_search, with an optional semantic tier in ChromaDB."""
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+try:
+    import chromadb
+except ImportError:  # optional: semantic lookup of paraphrased questions
+    chromadb = None
+
+from core.limiters import TokenUsageReport
+from servers.context.config import AgentConfig
+
+logger = logging.getLogger(__name__)
+
+_TRAILING_PUNCTUATION = "?!.;:, "
+
+# Embeddings of missed questions kept until their answer is stored
+_PENDING_EMBEDDINGS = 128
+
+
+def normalize_question(question: str) -> str:
+    """Canonicalize a question for use as a cache key.
+
+    Unicode is NFKC-normalized, case and runs of whitespace are folded and
+    trailing punctuation is dropped, so ``How does X work?`` and
+    ``how does x work`` share an entry.
+
+    Args:
+        question: Raw user question
+
+    Returns:
+        Normalized question
+    """
+    question = unicodedata.normalize("NFKC", question).casefold()
+    return re.sub(r"\s+", " ", question).strip().rstrip(_TRAILING_PUNCTUATION)
+
+
+@dataclass
+class _AnswerEntry:
+    """A cached answer."""
+
+    answer: str
+    expires_at: float
+    generation: int
+
+
+class SemanticAnswerIndex:
+    """Finds answers to similar questions by embedding similarity.
+
+    Questions are embedded with an OpenAI-compatible embeddings endpoint and
+    stored with their answers in a dedicated ChromaDB collection, next to the
+    ``codebase_chunks`` collection of the semantic code index. Each record
+    carries the mode, index generation and expiry it was stored with, and
+    lookups only consider records that match all three.
+    """
+
+    def __init__(
+        self,
+        chroma_url: str,
+        collection_name: str,
+        embedding_model: str,
+        embedding_base_url: str,
+        embedding_api_key: str,
+        min_similarity: float = 0.92,
+    ) -> None:
+        """Initialize semantic answer index.
+
+        Args:
+            chroma_url: URL of the ChromaDB server
+            collection_name: Collection holding the cached answers
+            embedding_model: Embedding model name
+            embedding_base_url: Base URL of the OpenAI-compatible embeddings API
+            embedding_api_key: API key for the embeddings API
+            min_similarity: Minimum cosine similarity for a cached question to match
+        """
+        if chromadb is None:
+            raise ValueError("The semantic answer cache requires the 'chromadb' package")
+        from openai import AsyncOpenAI
+
+        self.chroma_url = chroma_url
+        self.collection_name = collection_name
+        self.embedding_model = embedding_model
+        self.min_similarity = min_similarity
+        self.lookups = 0
+        self.errors = 0
+        self._embeddings = AsyncOpenAI(base_url=embedding_base_url, api_key=embedding_api_key)
+        self._collection = None
+        self._connect_lock = asyncio.Lock()
+
+    async def lookup(self, embedding: List[float], mode: str, generation: int) -> Optional[str]:
+        """Get the answer of the most similar cached question, if it is similar enough.
+
+        Args:
+            embedding: Embedding of the normalized question, from ``embed``
+            mode: Search mode the answer must have been produced in
+            generation: Index generation the answer must belong to
+
+        Returns:
+            Cached answer, or None
+        """
+        self.lookups += 1
+        collection = await self._get_collection()
+        result = await asyncio.to_thread(
+            collection.query,
+            query_embeddings=[embedding],
+            n_results=1,
+            where={
+                "$and": [
+                    {"mode": mode},
+                    {"generation": generation},
+                    {"expires_at": {"$gt": time.time()}},
+                ]
+            },
+            include=["documents", "distances"],
+        )
+        if not result["ids"] or not result["ids"][0]:
+            return None
+        # Cosine distance of the collection is 1 - cosine similarity
+        similarity = 1.0 - result["distances"][0][0]
+        if similarity < self.min_similarity:
+            return None
+        return result["documents"][0][0]
+
+    async def add(
+        self,
+        question: str,
+        embedding: List[float],
+        mode: str,
+        generation: int,
+        answer: str,
+        ttl_seconds: float,
+    ) -> None:
+        """Store the answer to a question.
+
+        Args:
+            question: Normalized question
+            embedding: Embedding of the question, from ``embed``
+            mode: Search mode the answer was produced in
+            generation: Index generation the answer belongs to
+            answer: Answer to cache
+            ttl_seconds: Time-to-live of the record
+        """
+        collection = await self._get_collection()
+        record_id = hashlib.sha256(f"{mode}\0{generation}\0{question}".encode()).hexdigest()
+        await asyncio.to_thread(
+            collection.upsert,
+            ids=[record_id],
+            embeddings=[embedding],
+            documents=[answer],
+            metadatas=[
+                {
+                    "question": question,
+                    "mode": mode,
+                    "generation": generation,
+                    "expires_at": time.time() + ttl_seconds,
+                }
+            ],
+        )
+
+    async def prune(self, generation: int) -> None:
+        """Delete records from other generations and expired records."""
+        collection = await self._get_collection()
+        await asyncio.to_thread(
+            collection.delete,
+            where={"$or": [{"generation": {"$ne": generation}}, {"expires_at": {"$lte": time.time()}}]},
+        )
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed a question."""
+        response = await self._embeddings.embeddings.create(model=self.embedding_model, input=text)
+        return response.data[0].embedding
+
+    async def _get_collection(self) -> Any:
+        """Connect to ChromaDB on first use, so the server starts even if it is down."""
+        if self._collection is None:
+            async with self._connect_lock:
+                if self._collection is None:
+                    url = urlparse(self.chroma_url)
+                    client = await asyncio.to_thread(
+                        chromadb.HttpClient,
+                        host=url.hostname or "localhost",
+                        port=url.port or (443 if url.scheme == "https" else 8000),
+                        ssl=url.scheme == "https",
+                    )
+                    self._collection = await asyncio.to_thread(
+                        client.get_or_create_collection,
+                        name=self.collection_name,
+                        metadata={"hnsw:space": "cosine"},
+                    )
+        return self._collection
+
+
+class AnswerCache:
+    """TTL + LRU cache of agentic_search answers keyed by normalized question.
+
+    Exact matches are served from memory. With a ``SemanticAnswerIndex``,
+    misses fall back to the answer of a sufficiently similar earlier question,
+    which is then kept in memory as well. A missed question's embedding is
+    reused when its answer is stored, and answers are written to the semantic
+    tier in the background. Like ``SearchResultCache``, entries are stamped
+    with the index generation and bumping it invalidates them. Failures of
+    the semantic tier count as misses and never fail a search.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 900.0,
+        max_entries: int = 1024,
+        semantic_index: Optional[SemanticAnswerIndex] = None,
+    ) -> None:
+        """Initialize answer cache.
+
+        Args:
+            ttl_seconds: Time-to-live of an answer
+            max_entries: Maximum number of answers kept in memory
+            semantic_index: Optional similarity lookup for paraphrased questions
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.semantic_index = semantic_index
+        self.generation = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, str], _AnswerEntry]" = OrderedDict()
+        self._pending_embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._semantic_writes: Set["asyncio.Task[None]"] = set()
+
+    @staticmethod
+    def make_key(question: str, mode: str) -> Tuple[str, str]:
+        """Build a cache key for a question asked in a search mode."""
+        return (mode, normalize_question(question))
+
+    async def get(self, question: str, mode: str) -> Optional[str]:
+        """Get a cached answer, or None on a miss.
+
+        Args:
+            question: User question
+            mode: Search mode, e.g. "agent" or "pipeline"
+
+        Returns:
+            Cached answer to the same or, with the semantic tier, a similar question
+        """
+        key = self.make_key(question, mode)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic() and entry.generation == self.generation:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.answer
+            del self._entries[key]
+
+        if self.semantic_index is not None:
+            generation = self.generation
+            answer = None
+            try:
+                embedding = await self.semantic_index.embed(key[1])
+                answer = await self.semantic_index.lookup(embedding, mode, generation)
+            except Exception as exc:
+                self.semantic_index.errors += 1
+                logger.warning(f"Semantic answer cache lookup failed: {exc}")
+            else:
+                if answer is None:
+                    self._pending_embeddings[key[1]] = embedding
+                    while len(self._pending_embeddings) > _PENDING_EMBEDDINGS:
+                        self._pending_embeddings.popitem(last=False)
+            if answer is not None and generation == self.generation:
+                self.semantic_hits += 1
+                self._store(key, answer)
+                return answer
+
+        self.misses += 1
+        return None
+
+    async def put(
+        self, question: str, mode: str, answer: str, usage: Optional[TokenUsageReport] = None
+    ) -> None:
+        """Cache the answer to a question.
+
+        Empty answers and answers the agent was forced to give when its token
+        budget ran out are not cached.
+
+        Args:
+            question: User question
+            mode: Search mode the answer was produced in
+            answer: Answer to cache
+            usage: Usage report of the run that produced the answer
+        """
+        if not answer or (usage is not None and usage.forced_final_answer):
+            return
+        key = self.make_key(question, mode)
+        self._store(key, answer)
+        if self.semantic_index is not None:
+            embedding = self._pending_embeddings.pop(key[1], None)
+            task = asyncio.create_task(
+                self._add_semantic(key[1], embedding, mode, self.generation, answer)
+            )
+            self._semantic_writes.add(task)
+            task.add_done_callback(self._semantic_writes.discard)
+
+    async def invalidate(self, generation: Optional[int] = None) -> int:
+        """Move to a new index generation and drop all cached answers.
+
+        Args:
+            generation: New generation stamp; defaults to the current one plus one.
+                Passing the current generation is a no-op. Processes sharing a
+                ChromaDB collection should be given the same explicit generation.
+
+        Returns:
+            The active generation
+        """
+        if generation is not None and generation == self.generation:
+            return self.generation
+        self.generation = self.generation + 1 if generation is None else generation
+        self._entries.clear()
+        if self.semantic_index is not None:
+            try:
+                await self.semantic_index.prune(self.generation)
+            except Exception as exc:
+                self.semantic_index.errors += 1
+                logger.warning(f"Semantic answer cache prune failed: {exc}")
+        return self.generation
+
+    async def _add_semantic(
+        self,
+        question: str,
+        embedding: Optional[List[float]],
+        mode: str,
+        generation: int,
+        answer: str,
+    ) -> None:
+        """Store an answer in the semantic tier, embedding the question if needed."""
+        try:
+            if embedding is None:
+                embedding = await self.semantic_index.embed(question)
+            await self.semantic_index.add(
+                question, embedding, mode, generation, answer, self.ttl_seconds
+            )
+        except Exception as exc:
+            self.semantic_index.errors += 1
+            logger.warning(f"Semantic answer cache update failed: {exc}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        stats: Dict[str, Any] = {
+            "entries": len(self._entries),
+            "hits": hits,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "generation": self.generation,
+        }
+        if self.semantic_index is not None:
+            stats["semantic"] = {
+                "collection": self.semantic_index.collection_name,
+                "lookups": self.semantic_index.lookups,
+                "errors": self.semantic_index.errors,
+            }
+        return stats
+
+    def _store(self, key: Tuple[str, str], answer: str) -> None:
+        """Keep an answer in memory, evicting least recently used answers."""
+        self._entries.pop(key, None)
+        self._entries[key] = _AnswerEntry(
+            answer=answer,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            generation=self.generation,
+        )
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+def create_answer_cache(config: AgentConfig) -> Optional[AnswerCache]:
+    """Build the answer cache described by the configuration; None if it is disabled."""
+    if not config.answer_cache_enabled:
+        return None
+    semantic_index = None
+    if config.answer_cache_semantic:
+        semantic_index = SemanticAnswerIndex(
+            chroma_url=config.chroma_url,
+            collection_name=config.answer_cache_collection,
+            embedding_model=config.answer_cache_embedding_model,
+            embedding_base_url=config.answer_cache_embedding_base_url,
+            embedding_api_key=config.answer_cache_embedding_api_key,
+            min_similarity=config.answer_cache_min_similarity,
+        )
+    return AnswerCache(
+        ttl_seconds=config.answer_cache_ttl_seconds,
+        max_entries=config.answer_cache_max_entries,
+        semantic_index=semantic_index,
+    )
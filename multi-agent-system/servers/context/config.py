@@ -19,7 +19,63 @@ class AgentConfig:
         # Default limits
         self.default_max_tool_calls = int(os.getenv("DEFAULT_MAX_TOOL_CALLS", "20"))
         self.default_max_tokens = int(os.getenv("DEFAULT_MAX_TOKENS", "16000"))
-        
+
+        # Warm agent pools (agents kept connected and reused across requests)
+        self.code_snippet_finder_pool_size = int(os.getenv("CODE_SNIPPET_FINDER_POOL_SIZE", "4"))
+        self.query_reformater_pool_size = int(os.getenv("QUERY_REFORMATER_POOL_SIZE", "2"))
+        self.mcp_health_check_interval = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "30"))
+
+        # Re-read prompts.yaml when it changes (development); otherwise parsed once per process
+        self.prompt_hot_reload = os.getenv("PROMPT_HOT_RELOAD", "false").lower() == "true"
+
+        # Pipeline mode of agentic_search: reformulate, search all reformulations at once,
+        # then let the snippet finder start from the top candidates
+        self.agentic_search_pipeline = (
+            os.getenv("AGENTIC_SEARCH_PIPELINE", "false").lower() == "true"
+        )
+        self.pipeline_top_candidates = int(os.getenv("PIPELINE_TOP_CANDIDATES", "10"))
+        self.pipeline_max_line_matches = int(os.getenv("PIPELINE_MAX_LINE_MATCHES", "3"))
+
+        # Concurrent identical agentic_search / refactor_question calls share one agent run
+        self.request_coalescing_enabled = (
+            os.getenv("REQUEST_COALESCING_ENABLED", "true").lower() == "true"
+        )
+
+        # Answer cache of agentic_search; the semantic tier also matches paraphrased
+        # questions by embedding similarity (needs chromadb and an embeddings API)
+        self.answer_cache_enabled = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+        self.answer_cache_ttl_seconds = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "900"))
+        self.answer_cache_max_entries = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+        self.answer_cache_semantic = (
+            os.getenv("ANSWER_CACHE_SEMANTIC", "false").lower() == "true"
+        )
+        self.chroma_url = os.getenv("CHROMA_URL", "http://localhost:8000")
+        self.answer_cache_collection = os.getenv("ANSWER_CACHE_COLLECTION", "answer_cache")
+        self.answer_cache_min_similarity = float(
+            os.getenv("ANSWER_CACHE_MIN_SIMILARITY", "0.92")
+        )
+        self.answer_cache_embedding_model = os.getenv(
+            "ANSWER_CACHE_EMBEDDING_MODEL", "text-embedding-3-small"
+        )
+        self.answer_cache_embedding_base_url = os.getenv(
+            "ANSWER_CACHE_EMBEDDING_BASE_URL",
+            os.getenv("DEFAULT_BASE_URL", "https://api.openai.com/v1"),
+        )
+        self.answer_cache_embedding_api_key = (
+            os.getenv("ANSWER_CACHE_EMBEDDING_API_KEY")
+            or os.getenv("OPENAI_API_KEY")
+            or os.getenv("OPENROUTER_API_KEY", "")
+        )
+
+        # Prometheus /metrics of the context server and the frontend (LLM and agent run
+        # latencies, cache hit ratios, in-flight requests); needs prometheus_client
+        self.metrics_enabled = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+        # Record LLM responses and tool calls per trace ID to TRAFFIC_DIR, or
+        # answer with the recorded LLM responses instead of calling the provider
+        self.traffic_mode = os.getenv("TRAFFIC_MODE", "off").lower()
+        self.traffic_dir = os.getenv("TRAFFIC_DIR", "traffic")
+
         # Model configurations (default to OpenAI models)
         self.query_reformater_model_name = os.getenv(
             "QUERY_REFORMATER_MODEL_NAME", "gpt-4o-mini"
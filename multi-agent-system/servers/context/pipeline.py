@@ -0,0 +1,122 @@
+"""Reformulate-then-search pipeline for the context provider."""
+
+import logging
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from core import AgentPool, MCPSessionManager
+from core.limiters import TokenUsageReport
+from core.mcp_session import current_trace_id
+from servers.context.agent import CodeSnippetFinder, QueryReformater
+from servers.context.progress import ProgressCallback, ProgressEvent, file_names
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PipelineResult:
+    """Answer of a pipeline run and the intermediate steps that led to it."""
+
+    answer: str
+    queries: List[str] = field(default_factory=list)
+    candidates: List[Dict[str, Any]] = field(default_factory=list)
+    usage: Optional[TokenUsageReport] = None
+
+
+class SearchPipeline:
+    """Answers a question with a fixed number of serial steps instead of one open-ended agent loop.
+
+    1. ``QueryReformater`` turns the question into search queries.
+    2. All queries run concurrently in one ``batch_search`` call, which merges
+       and ranks the hits.
+    3. ``CodeSnippetFinder`` starts from the top candidates instead of
+       discovering them through its own search calls.
+
+    If the reformulation or the search fails, the finder runs on the bare question.
+    """
+
+    def __init__(
+        self,
+        query_reformater_pool: AgentPool[QueryReformater],
+        code_snippet_finder_pool: AgentPool[CodeSnippetFinder],
+        mcp_session: MCPSessionManager,
+        top_candidates: int = 10,
+        max_line_matches: int = 3,
+    ) -> None:
+        """Initialize search pipeline.
+
+        Args:
+            query_reformater_pool: Pool of query reformater agents
+            code_snippet_finder_pool: Pool of code snippet finder agents
+            mcp_session: Session to the code search server
+            top_candidates: Number of merged search results handed to the finder
+            max_line_matches: Line matches kept per candidate file
+        """
+        self.query_reformater_pool = query_reformater_pool
+        self.code_snippet_finder_pool = code_snippet_finder_pool
+        self.mcp_session = mcp_session
+        self.top_candidates = top_candidates
+        self.max_line_matches = max_line_matches
+
+    async def run(
+        self,
+        question: str,
+        trace_id: Optional[str] = None,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> PipelineResult:
+        """Run the pipeline for a question.
+
+        Args:
+            question: User question to answer
+            trace_id: Trace ID shared by all steps, a new one is generated if omitted
+            on_progress: Receives the queries, the candidates and the finder's progress
+
+        Returns:
+            The finder's answer with the queries and candidates it was given
+        """
+        trace_id = trace_id or str(uuid.uuid4())
+        queries = await self._reformulate(question, trace_id)
+        if on_progress is not None:
+            await on_progress(ProgressEvent("queries", {"queries": queries}))
+        candidates = await self._search(queries, trace_id) if queries else []
+        if on_progress is not None:
+            await on_progress(ProgressEvent("candidates", {"files": file_names(candidates)}))
+        logger.info(
+            f"pipeline {trace_id}: {len(queries)} queries, {len(candidates)} candidates"
+        )
+
+        async with self.code_snippet_finder_pool.acquire(trace_id) as agent:
+            answer = await agent.run(question, candidates=candidates, on_progress=on_progress)
+            usage = agent.last_usage
+            logger.info(f"pipeline {trace_id} usage: {usage} tools: {agent.tool_call_stats}")
+        return PipelineResult(answer=answer, queries=queries, candidates=candidates, usage=usage)
+
+    async def _reformulate(self, question: str, trace_id: str) -> List[str]:
+        """Get search queries for the question; none if the reformater fails."""
+        try:
+            async with self.query_reformater_pool.acquire(trace_id) as agent:
+                result = await agent.run(question)
+        except Exception as exc:
+            logger.warning(f"pipeline {trace_id}: reformulation failed: {exc}")
+            return []
+        return result.suggested_queries
+
+    async def _search(self, queries: List[str], trace_id: str) -> List[Dict[str, Any]]:
+        """Run all queries in one batch_search call; no candidates if it fails."""
+        token = current_trace_id.set(trace_id)
+        try:
+            results = await self.mcp_session.direct_call_tool(
+                "batch_search",
+                {
+                    "queries": queries,
+                    "num_results": self.top_candidates,
+                    "max_line_matches": self.max_line_matches,
+                },
+            )
+        except Exception as exc:
+            logger.warning(f"pipeline {trace_id}: batch search failed: {exc}")
+            return []
+        finally:
+            current_trace_id.reset(token)
+        return results if isinstance(results, list) else []
@@ -0,0 +1,109 @@
+"""Progress events emitted while a question is being answered."""
+
+import asyncio
+import contextlib
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from pydantic_ai.messages import (
+    AgentStreamEvent,
+    FunctionToolCallEvent,
+    FunctionToolResultEvent,
+    PartDeltaEvent,
+    PartStartEvent,
+    TextPart,
+    TextPartDelta,
+    ToolReturnPart,
+)
+
+
+@dataclass
+class ProgressEvent:
+    """One step of a search.
+
+    Types:
+        ``queries``: reformulated search queries (pipeline mode)
+        ``candidates``: files handed to the snippet finder (pipeline mode)
+        ``tool_call``: the agent called a tool
+        ``files_found``: a search tool returned files
+        ``tool_result``: any other tool returned
+        ``answer_delta``: a piece of the answer as the model writes it
+        ``answer``: the final answer, always the last event of a successful search
+        ``error``: the search failed, always the last event of a failed search
+    """
+
+    type: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the event as a flat JSON-serializable dict."""
+        return {"type": self.type, **self.data}
+
+
+ProgressCallback = Callable[[ProgressEvent], Awaitable[None]]
+
+
+def file_names(results: Any) -> List[str]:
+    """Get ``repository/filename`` of each search result in a tool result."""
+    if not isinstance(results, list):
+        return []
+    return [
+        f"{result.get('repository', '')}/{result['filename']}"
+        for result in results
+        if isinstance(result, dict) and "filename" in result
+    ]
+
+
+def progress_event(event: AgentStreamEvent) -> Optional[ProgressEvent]:
+    """Translate an agent stream event into a progress event, if it is one worth reporting."""
+    if isinstance(event, FunctionToolCallEvent):
+        # Arguments as the model sent them: parsing would raise on malformed JSON,
+        # which pydantic-ai answers with a retry prompt rather than failing the run
+        return ProgressEvent("tool_call", {"tool": event.part.tool_name, "args": event.part.args})
+    if isinstance(event, FunctionToolResultEvent) and isinstance(event.result, ToolReturnPart):
+        files = file_names(event.result.content)
+        if files:
+            return ProgressEvent("files_found", {"tool": event.result.tool_name, "files": files})
+        return ProgressEvent("tool_result", {"tool": event.result.tool_name})
+    if isinstance(event, PartStartEvent) and isinstance(event.part, TextPart) and event.part.content:
+        return ProgressEvent("answer_delta", {"text": event.part.content})
+    if (
+        isinstance(event, PartDeltaEvent)
+        and isinstance(event.delta, TextPartDelta)
+        and event.delta.content_delta
+    ):
+        return ProgressEvent("answer_delta", {"text": event.delta.content_delta})
+    return None
+
+
+async def stream_progress(
+    search: Callable[[ProgressCallback], Awaitable[str]],
+) -> AsyncIterator[ProgressEvent]:
+    """Run a search in the background and yield its progress events as they happen.
+
+    Args:
+        search: Runs the search, reporting progress to the given callback, and returns the answer
+
+    Yields:
+        Progress events, ending with an ``answer`` or ``error`` event. The search
+        is cancelled if the consumer stops iterating early.
+    """
+    queue: "asyncio.Queue[Optional[ProgressEvent]]" = asyncio.Queue()
+
+    async def run() -> None:
+        try:
+            answer = await search(queue.put)
+            await queue.put(ProgressEvent("answer", {"answer": answer}))
+        except Exception as exc:
+            await queue.put(ProgressEvent("error", {"error": str(exc)}))
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(run())
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
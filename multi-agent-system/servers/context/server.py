@@ -2,25 +2,39 @@
 
 import asyncio
 import base64
+import functools
 import json
 import logging
 import os
 import pathlib
 import signal
+import time
 import uuid
-from typing import Any, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from fastmcp import FastMCP
-from fastmcp.server.dependencies import get_http_request
+from fastmcp.server.dependencies import get_context, get_http_request
 from opentelemetry import trace
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import SimpleSpanProcessor
 from starlette.requests import Request
-
-from core import PromptManager
-from servers.context.agent import CodeSnippetFinder, QueryReformater, QueryReformaterResult
+from starlette.responses import JSONResponse
+
+from core import AgentPool, MCPSessionManager, PromptManager, SingleFlight
+from core.metrics import metrics, metrics_endpoint
+from core.telemetry import BackgroundSpanProcessor
+from servers.context.agent import (
+    CodeSnippetFinder,
+    QueryReformater,
+    QueryReformaterResult,
+    precompile_prompts,
+    traffic_recorder,
+)
+from servers.context.answer_cache import AnswerCache, create_answer_cache, normalize_question
+from servers.context.config import AgentConfig
+from servers.context.pipeline import SearchPipeline
+from servers.context.progress import ProgressCallback, ProgressEvent
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -48,6 +62,15 @@ class ServerConfig:
             self.langfuse_secret_key = ""
             self.langfuse_host = ""
 
+        # Spans are exported in batches by a background thread instead of on span end;
+        # spans arriving while the queue is full are dropped
+        self.span_export_max_queue_size = int(os.getenv("SPAN_EXPORT_MAX_QUEUE_SIZE", "2048"))
+        self.span_export_max_batch_size = int(os.getenv("SPAN_EXPORT_MAX_BATCH_SIZE", "512"))
+        self.span_export_schedule_delay = float(
+            os.getenv("SPAN_EXPORT_SCHEDULE_DELAY_SECONDS", "1")
+        )
+        self.span_export_timeout = float(os.getenv("SPAN_EXPORT_TIMEOUT_SECONDS", "10"))
+
     @staticmethod
     def _get_required_env(key: str) -> str:
         """Get required environment variable."""
@@ -68,6 +91,7 @@ class TelemetryManager:
         """Initialize telemetry manager."""
         self.cfg = cfg
         self.enabled = cfg.langfuse_enabled
+        self.provider: Optional[TracerProvider] = None
         if self.enabled:
             self._setup()
 
@@ -83,8 +107,22 @@ class TelemetryManager:
         )
 
         provider = TracerProvider()
-        provider.add_span_processor(SimpleSpanProcessor(OTLPSpanExporter()))
+        provider.add_span_processor(
+            BackgroundSpanProcessor(
+                OTLPSpanExporter(timeout=self.cfg.span_export_timeout),
+                max_queue_size=self.cfg.span_export_max_queue_size,
+                max_batch_size=self.cfg.span_export_max_batch_size,
+                schedule_delay=self.cfg.span_export_schedule_delay,
+                name="langfuse",
+            )
+        )
         trace.set_tracer_provider(provider)
+        self.provider = provider
+
+    def shutdown(self) -> None:
+        """Export the spans still queued and stop the exporter."""
+        if self.provider is not None:
+            self.provider.shutdown()
 
     def get_tracer(self, name: str) -> trace.Tracer:
         """Get tracer instance."""
@@ -121,9 +159,54 @@ server = FastMCP(
     sse_path="/contextprovider/sse", message_path="/contextprovider/messages/"
 )
 
+# Warm agents reused across requests instead of being built per call, all
+# sharing one MCP session to the code search server
+agent_config = AgentConfig()
+if agent_config.metrics_enabled:
+    metrics.enable()
+mcp_session = MCPSessionManager(
+    agent_config.mcp_server_url, health_check_interval=agent_config.mcp_health_check_interval
+)
+code_snippet_finder_pool = AgentPool(
+    functools.partial(CodeSnippetFinder, mcp_session=mcp_session),
+    size=agent_config.code_snippet_finder_pool_size,
+    name="code_snippet_finder",
+)
+query_reformater_pool = AgentPool(
+    functools.partial(QueryReformater, mcp_session=mcp_session),
+    size=agent_config.query_reformater_pool_size,
+    name="query_reformater",
+)
+search_pipeline = SearchPipeline(
+    query_reformater_pool,
+    code_snippet_finder_pool,
+    mcp_session,
+    top_candidates=agent_config.pipeline_top_candidates,
+    max_line_matches=agent_config.pipeline_max_line_matches,
+)
+answer_cache = create_answer_cache(agent_config)
+traffic = traffic_recorder(agent_config)
+# Concurrent identical questions share one agent run
+answer_flight: SingleFlight[Tuple[str, Any]] = SingleFlight(name="agentic_search")
+reformulation_flight: SingleFlight[QueryReformaterResult] = SingleFlight(
+    name="refactor_question"
+)
+
+if answer_cache is not None:
+    metrics.register_cache("answer", answer_cache.stats)
+metrics.register_agent_pools(
+    code_snippet_finder=code_snippet_finder_pool, query_reformater=query_reformater_pool
+)
+
 _shutdown_requested = False
 
 
+def _record_tool_call(name: str, input_data: Dict[str, Any], result: Any, trace_id: str) -> None:
+    """Record a tool call's arguments and result when traffic is being recorded."""
+    if traffic is not None and traffic.recording:
+        traffic.record("tool", name, {"args": input_data, "result": result}, trace_id)
+
+
 def signal_handler(sig: int, frame: Any) -> None:
     """Handle termination signals for graceful shutdown."""
     global _shutdown_requested
@@ -131,10 +214,80 @@ def signal_handler(sig: int, frame: Any) -> None:
     _shutdown_requested = True
 
 
+def _progress_reporter() -> Optional[ProgressCallback]:
+    """Get a callback that sends progress events as MCP progress notifications.
+
+    Each event is sent as the notification message, JSON encoded. Returns None
+    if the client did not ask for progress (no ``progressToken`` in the request).
+    """
+    try:
+        ctx = get_context()
+        meta = ctx.request_context.meta
+    except Exception:
+        return None
+    if meta is None or meta.progressToken is None:
+        return None
+
+    step = 0
+
+    async def report(event: ProgressEvent) -> None:
+        nonlocal step
+        step += 1
+        try:
+            await ctx.report_progress(step, message=json.dumps(event.to_dict(), default=str))
+        except Exception as exc:
+            # A client that went away must not fail the search
+            logger.debug(f"Could not send progress notification: {exc}")
+
+    return report
+
+
+async def _answer(
+    question: str, pipeline: bool, trace_id: str, on_progress: Optional[ProgressCallback]
+) -> Tuple[str, Any]:
+    """Run the agents for a question and cache the answer.
+
+    Returns:
+        The answer and the span output describing how it was found
+    """
+    if pipeline:
+        pipeline_result = await search_pipeline.run(question, trace_id, on_progress)
+        result = pipeline_result.answer
+        usage = pipeline_result.usage
+        output_data: Any = {
+            "answer": result,
+            "queries": pipeline_result.queries,
+            "candidates": len(pipeline_result.candidates),
+        }
+    else:
+        async with code_snippet_finder_pool.acquire(trace_id) as agent:
+            result = await agent.run(question, on_progress=on_progress)
+            usage = agent.last_usage
+            logger.info(
+                f"agentic_search {trace_id} usage: {agent.last_usage} tools: {agent.tool_call_stats}"
+            )
+        output_data = result
+
+    if answer_cache is not None:
+        await answer_cache.put(question, "pipeline" if pipeline else "agent", result, usage)
+    return result, output_data
+
+
 @tracer.start_as_current_span("ContextProviderMcp:agentic_search")
 @server.tool()
-async def agentic_search(question: str) -> str:
-    """Agentic search tool for codebases."""
+async def agentic_search(question: str, pipeline: Optional[bool] = None) -> str:
+    """Agentic search tool for codebases.
+
+    In pipeline mode the question is first reformulated into several queries that
+    are searched at once, and the snippet finder starts from the best matches.
+    ``pipeline`` defaults to the server's AGENTIC_SEARCH_PIPELINE setting.
+    Clients that send a progress token receive tool calls, found files and
+    answer tokens as progress notifications while the search runs. Answers are
+    cached per mode, so repeated (and, with the semantic cache, paraphrased)
+    questions are answered without running the agents. Identical questions
+    asked while one is being answered wait for that answer; only the first
+    caller receives progress notifications.
+    """
     if _shutdown_requested:
         logger.info("Shutdown in progress, declining new requests")
         return ""
@@ -146,15 +299,55 @@ async def agentic_search(question: str) -> str:
 
     span = trace.get_current_span()
 
-    async with CodeSnippetFinder(trace_id=trace_id) as agent:
-        result = await agent.run(question)
+    if pipeline is None:
+        pipeline = agent_config.agentic_search_pipeline
+    mode = "pipeline" if pipeline else "agent"
+
+    if answer_cache is not None:
+        cached = await answer_cache.get(question, mode)
+        if cached is not None:
+            logger.info(f"agentic_search {trace_id}: answered from cache")
+            _set_span_attributes(
+                span,
+                input_data={"question": question, "pipeline": pipeline},
+                output_data={"answer": cached, "cached": True},
+                session_id=trace_id,
+            )
+            _record_tool_call(
+                "agentic_search",
+                {"question": question, "pipeline": pipeline, "cached": True},
+                cached,
+                trace_id,
+            )
+            return cached
+
+    on_progress = _progress_reporter()
+    if agent_config.request_coalescing_enabled:
+        result, output_data = await answer_flight.run(
+            AnswerCache.make_key(question, mode), _answer, question, pipeline, trace_id, on_progress
+        )
+    else:
+        result, output_data = await _answer(question, pipeline, trace_id, on_progress)
 
     _set_span_attributes(
         span,
-        input_data={"question": question},
-        output_data=result,
+        input_data={"question": question, "pipeline": pipeline},
+        output_data=output_data,
         session_id=trace_id,
     )
+    _record_tool_call(
+        "agentic_search", {"question": question, "pipeline": pipeline}, result, trace_id
+    )
+    return result
+
+
+async def _reformulate(question: str, trace_id: str) -> QueryReformaterResult:
+    """Run the query reformater for a question."""
+    async with query_reformater_pool.acquire(trace_id) as agent:
+        result: QueryReformaterResult = await agent.run(question)
+        logger.info(
+            f"refactor_question {trace_id} usage: {agent.last_usage} tools: {agent.tool_call_stats}"
+        )
     return result
 
 
@@ -174,8 +367,12 @@ async def refactor_question(question: str) -> List[str]:
 
     span = trace.get_current_span()
 
-    async with QueryReformater(trace_id=trace_id) as agent:
-        result: QueryReformaterResult = await agent.run(question)
+    if agent_config.request_coalescing_enabled:
+        result = await reformulation_flight.run(
+            normalize_question(question), _reformulate, question, trace_id
+        )
+    else:
+        result = await _reformulate(question, trace_id)
 
     _set_span_attributes(
         span,
@@ -183,10 +380,46 @@ async def refactor_question(question: str) -> List[str]:
         output_data=result.model_dump(),
         session_id=trace_id,
     )
+    _record_tool_call(
+        "refactor_question", {"question": question}, result.suggested_queries, trace_id
+    )
 
     return result.suggested_queries
 
 
+@server.custom_route("/contextprovider/cache/invalidate", methods=["POST"])
+async def invalidate_answer_cache(request: Request) -> JSONResponse:
+    """Invalidate cached answers, e.g. after the code index was rebuilt.
+
+    An optional ``generation`` query parameter sets the new index generation;
+    repeating the current generation leaves the cache untouched.
+    """
+    if answer_cache is None:
+        return JSONResponse({"error": "answer cache is disabled"}, status_code=404)
+    generation = request.query_params.get("generation")
+    try:
+        active = await answer_cache.invalidate(int(generation) if generation else None)
+    except ValueError:
+        return JSONResponse({"error": "generation must be an integer"}, status_code=400)
+    logger.info(f"Answer cache generation is now {active}")
+    return JSONResponse({"generation": active})
+
+
+@server.custom_route("/contextprovider/cache/stats", methods=["GET"])
+async def answer_cache_stats(request: Request) -> JSONResponse:
+    """Return answer cache statistics and how many requests were coalesced."""
+    coalescing = {
+        "agentic_search": answer_flight.stats(),
+        "refactor_question": reformulation_flight.stats(),
+    }
+    if answer_cache is None:
+        return JSONResponse({"enabled": False, "coalescing": coalescing})
+    return JSONResponse({"enabled": True, **answer_cache.stats(), "coalescing": coalescing})
+
+
+server.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
+
+
 def _register_tools() -> None:
     """Register MCP tools with the server."""
     # Tools are registered using @server.tool() decorator above
@@ -196,16 +429,27 @@ def _register_tools() -> None:
 
 async def _run_server() -> None:
     """Run the FastMCP server with both HTTP and SSE transports."""
-    tasks = [
-        server.run_http_async(
-            transport="streamable-http",
-            host="0.0.0.0",
-            path="/contextprovider/mcp",
-            port=config.streamable_http_port,
-        ),
-        server.run_http_async(transport="sse", host="0.0.0.0", port=config.sse_port),
-    ]
-    await asyncio.gather(*tasks)
+    try:
+        start = time.perf_counter()
+        compiled = precompile_prompts()
+        logger.info(f"Precompiled {compiled} prompt templates in {(time.perf_counter() - start) * 1000:.1f} ms")
+        await asyncio.gather(code_snippet_finder_pool.start(), query_reformater_pool.start())
+        # Create the transports only once startup has succeeded, so none is left unawaited
+        await asyncio.gather(
+            server.run_http_async(
+                transport="streamable-http",
+                host="0.0.0.0",
+                path="/contextprovider/mcp",
+                port=config.streamable_http_port,
+            ),
+            server.run_http_async(transport="sse", host="0.0.0.0", port=config.sse_port),
+        )
+    finally:
+        await asyncio.gather(code_snippet_finder_pool.close(), query_reformater_pool.close())
+        await mcp_session.close()
+        if traffic is not None:
+            traffic.close()
+        telemetry.shutdown()
 
 
 def main() -> None:
@@ -0,0 +1 @@
+"""Unit tests for the multi-agent system; they run without network access."""
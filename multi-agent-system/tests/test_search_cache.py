@@ -0,0 +1,166 @@
+"""Tests for search query normalization and ``SearchResultCache``."""
+
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+import backends.cache
+from backends.cache import SearchResultCache, normalize_query
+from backends.models import FormattedResult, Match
+
+
+class Clock:
+    """Manually advanced stand-in for ``time.monotonic``."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(backends.cache, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def _results(filename: str, matches: int = 1) -> List[FormattedResult]:
+    return [
+        FormattedResult(
+            repository="repo",
+            filename=filename,
+            matches=tuple(Match(line_number=i, content="x" * 100) for i in range(matches)),
+        )
+    ]
+
+
+def _key(query: str):
+    return SearchResultCache.make_key("zoekt", query, num_results=30)
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("foo  lang:go", "foo lang:go"),
+        ("lang:go foo", "foo lang:go"),
+        ("  repo:core\tBar foo ", "Bar foo repo:core"),
+        ('"func Foo" lang:go', '"func Foo" lang:go'),
+        ('lang:go f:"my dir/x.go" bar', 'bar f:"my dir/x.go" lang:go'),
+    ],
+)
+def test_conjunctions_are_sorted(query, expected):
+    assert normalize_query(query) == expected
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("foo or bar", "foo or bar"),
+        ("foo  OR   bar", "foo OR bar"),
+        ("lang:go (foo bar)", "lang:go (foo bar)"),
+        ("(foo or bar) lang:go", "(foo or bar) lang:go"),
+    ],
+)
+def test_disjunctions_and_groups_keep_their_order(query, expected):
+    assert normalize_query(query) == expected
+
+
+def test_reordered_queries_share_a_key():
+    assert _key("foo lang:go") == _key("lang:go   foo")
+    assert _key("foo or bar") != _key("bar or foo")
+    assert SearchResultCache.make_key("zoekt", "foo", 30) != SearchResultCache.make_key("zoekt", "foo", 10)
+
+
+def test_hit_and_miss_counters():
+    cache = SearchResultCache()
+    results = _results("a.go")
+
+    assert cache.get(_key("foo")) is None
+    cache.put(_key("foo"), results)
+
+    assert cache.get(_key("foo")) is results
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = SearchResultCache(ttl_seconds=60)
+    cache.put(_key("foo"), _results("a.go"))
+
+    clock.now += 59
+    assert cache.get(_key("foo")) is not None
+    clock.now += 1
+    assert cache.get(_key("foo")) is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_overwriting_an_entry_restarts_its_ttl(clock):
+    cache = SearchResultCache(ttl_seconds=60)
+    cache.put(_key("foo"), _results("a.go"))
+    clock.now += 50
+    cache.put(_key("foo"), _results("b.go"))
+
+    clock.now += 50
+    assert cache.get(_key("foo"))[0].filename == "b.go"
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SearchResultCache(max_entries=2)
+    cache.put(_key("a"), _results("a.go"))
+    cache.put(_key("b"), _results("b.go"))
+    cache.get(_key("a"))
+
+    cache.put(_key("c"), _results("c.go"))
+
+    assert cache.get(_key("b")) is None
+    assert cache.get(_key("a")) is not None
+    assert cache.get(_key("c")) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_oldest_entries():
+    probe = SearchResultCache()
+    probe.put(_key("probe"), _results("a.go", matches=10))
+    entry_bytes = probe.stats()["bytes"]
+    cache = SearchResultCache(max_bytes=entry_bytes * 2 + entry_bytes // 2)
+
+    for name in ("a", "b", "c"):
+        cache.put(_key(name), _results(f"{name}.go", matches=10))
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == entry_bytes * 2 <= cache.max_bytes
+    assert stats["evictions"] == 1
+    assert cache.get(_key("a")) is None
+
+
+def test_results_larger_than_the_cache_are_not_stored():
+    cache = SearchResultCache(max_bytes=1000)
+    cache.put(_key("small"), _results("a.go"))
+
+    cache.put(_key("huge"), _results("b.go", matches=100))
+
+    assert cache.get(_key("huge")) is None
+    assert cache.get(_key("small")) is not None
+    assert cache.stats()["evictions"] == 0
+
+
+def test_invalidate_drops_entries_and_bumps_generation():
+    cache = SearchResultCache()
+    cache.put(_key("foo"), _results("a.go"))
+
+    assert cache.invalidate() == 1
+    assert cache.get(_key("foo")) is None
+    assert cache.stats()["bytes"] == 0
+
+    cache.put(_key("foo"), _results("a.go"))
+    assert cache.invalidate(generation=1) == 1
+    assert cache.get(_key("foo")) is not None
+    assert cache.invalidate(generation=7) == 7
+    assert cache.get(_key("foo")) is None
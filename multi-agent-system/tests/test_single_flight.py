@@ -0,0 +1,130 @@
+"""Tests for ``SingleFlight`` coalescing and cancellation."""
+
+import asyncio
+
+import pytest
+
+from core.single_flight import SingleFlight
+
+
+class SlowCall:
+    """Coroutine function that blocks until released and records how it ended."""
+
+    def __init__(self) -> None:
+        self.started = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, value: str) -> dict:
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"value": value}
+
+
+async def _settle() -> None:
+    """Let started tasks run up to their first blocking await."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight = SingleFlight()
+        call = SlowCall()
+        waiters = [asyncio.create_task(flight.run("key", call, "a")) for _ in range(3)]
+        await _settle()
+        call.release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert call.started == 1
+        assert all(result is results[0] for result in results)
+        assert flight.stats() == {
+            "calls": 1,
+            "coalesced": 2,
+            "coalesced_ratio": 2 / 3,
+            "in_flight": 0,
+        }
+
+    asyncio.run(scenario())
+
+
+def test_different_keys_and_later_calls_run_separately():
+    async def scenario():
+        flight = SingleFlight()
+        call = SlowCall()
+        call.release.set()
+
+        first, second = await asyncio.gather(flight.run("a", call, "a"), flight.run("b", call, "b"))
+        third = await flight.run("a", call, "a")
+
+        assert (first, second, third) == ({"value": "a"}, {"value": "b"}, {"value": "a"})
+        assert call.started == 3
+        assert flight.stats()["coalesced"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_exceptions_reach_every_caller():
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("backend down")
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            flight.run("key", failing), flight.run("key", failing), return_exceptions=True
+        )
+
+        assert [type(result) for result in results] == [ValueError, ValueError]
+        assert flight.stats()["calls"] == 1
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_call_survives_while_another_caller_waits():
+    async def scenario():
+        flight = SingleFlight()
+        call = SlowCall()
+        leaving = asyncio.create_task(flight.run("key", call, "a"))
+        staying = asyncio.create_task(flight.run("key", call, "a"))
+        await _settle()
+
+        leaving.cancel()
+        await _settle()
+        call.release.set()
+
+        assert await staying == {"value": "a"}
+        assert leaving.cancelled()
+        assert (call.started, call.cancelled) == (1, 0)
+
+    asyncio.run(scenario())
+
+
+def test_call_is_cancelled_when_the_last_caller_leaves():
+    async def scenario():
+        flight = SingleFlight()
+        call = SlowCall()
+        waiters = [asyncio.create_task(flight.run("key", call, "a")) for _ in range(2)]
+        await _settle()
+
+        for waiter in waiters:
+            waiter.cancel()
+        await _settle()
+
+        assert call.cancelled == 1
+        assert flight.stats()["in_flight"] == 0
+        for waiter in waiters:
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+
+        # A new caller starts a fresh call rather than joining the cancelled one
+        call.release.set()
+        assert await flight.run("key", call, "a") == {"value": "a"}
+        assert call.started == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,140 @@
+"""Tests for ``TokenLimiter``: budget projection, forced final answer and overruns."""
+
+import asyncio
+from typing import List
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.usage import RequestUsage
+
+from core.limiters import TokenLimitedResult, TokenLimiter, TokenLimitExceeded
+
+
+class ScriptedModel:
+    """Model that calls ``lookup`` until told to stop, reporting fixed usage per request.
+
+    It answers in text after ``answer_after`` tool-calling requests, or as soon
+    as the limiter's token warning is in the prompt (unless ``ignore_warning``).
+    """
+
+    def __init__(
+        self,
+        input_tokens: int = 1000,
+        output_tokens: int = 100,
+        answer_after: int = 100,
+        ignore_warning: bool = False,
+    ) -> None:
+        self.usage = RequestUsage(input_tokens=input_tokens, output_tokens=output_tokens)
+        self.answer_after = answer_after
+        self.ignore_warning = ignore_warning
+        self.requests: List[List[ModelMessage]] = []
+
+    def respond(self, messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        self.requests.append(messages)
+        warned = _prompted_with(messages[-1], "TOKEN LIMIT WARNING")
+        if (warned and not self.ignore_warning) or len(self.requests) > self.answer_after:
+            return ModelResponse(parts=[TextPart("final answer")], usage=self.usage)
+        call = ToolCallPart("lookup", {"name": "foo"}, tool_call_id=f"call-{len(self.requests)}")
+        return ModelResponse(parts=[call], usage=self.usage)
+
+
+def _prompted_with(message: ModelMessage, text: str) -> bool:
+    """Check whether a request carries a user prompt containing text."""
+    return isinstance(message, ModelRequest) and any(
+        isinstance(part, UserPromptPart) and text in str(part.content) for part in message.parts
+    )
+
+
+def _make_agent(model: ScriptedModel) -> Agent:
+    """Build an agent with one tool around a scripted model."""
+    agent = Agent(FunctionModel(model.respond))
+
+    @agent.tool_plain
+    def lookup(name: str) -> str:
+        """Look a name up."""
+        return f"{name} is defined in foo.go"
+
+    return agent
+
+
+def _run(limiter: TokenLimiter, agent: Agent) -> TokenLimitedResult:
+    return asyncio.run(limiter.run_with_limit(agent, "Where is foo defined?"))
+
+
+def test_run_within_budget_reports_usage():
+    model = ScriptedModel(answer_after=2)
+
+    result = _run(TokenLimiter(max_tokens=100_000), _make_agent(model))
+
+    assert result.output == "final answer"
+    assert len(model.requests) == 3
+    usage = result.usage
+    assert not usage.forced_final_answer
+    assert (usage.requests, usage.tool_calls) == (3, 2)
+    assert (usage.input_tokens, usage.output_tokens, usage.total_tokens) == (3000, 300, 3300)
+    assert usage.duration_ms > 0
+
+
+def test_projection_forces_final_answer_before_budget_runs_out():
+    # Each request costs 1100 tokens. After n requests the limiter projects
+    # 1100 * n + 2 * ~1100 + 500 and stops once that exceeds 5000, i.e. after 3.
+    model = ScriptedModel()
+
+    result = _run(TokenLimiter(max_tokens=5000, output_reserve=500), _make_agent(model))
+
+    assert result.output == "final answer"
+    assert result.usage.forced_final_answer
+    assert len(model.requests) == 4
+    assert _prompted_with(model.requests[-1][-1], "TOKEN LIMIT WARNING: 3300 of 5000 tokens used")
+    assert result.usage.total_tokens == 4400 <= 5000
+    assert result.usage.tool_calls == 3
+
+
+def test_forced_final_answer_keeps_the_conversation():
+    model = ScriptedModel()
+
+    _run(TokenLimiter(max_tokens=5000, output_reserve=500), _make_agent(model))
+
+    # The last request continues the run: every tool call and result is still in it
+    final_request = model.requests[-1]
+    responses = [m for m in final_request if isinstance(m, ModelResponse)]
+    assert len(responses) == 3
+    assert any(_prompted_with(m, "Where is foo defined?") for m in final_request)
+
+
+def test_larger_output_reserve_finishes_earlier():
+    model = ScriptedModel()
+
+    result = _run(TokenLimiter(max_tokens=5000, output_reserve=1500), _make_agent(model))
+
+    assert result.usage.forced_final_answer
+    assert result.usage.tool_calls == 2
+
+
+def test_single_request_over_budget_raises():
+    model = ScriptedModel(input_tokens=2000, output_tokens=500)
+
+    with pytest.raises(TokenLimitExceeded) as exc_info:
+        _run(TokenLimiter(max_tokens=1000), _make_agent(model))
+
+    assert exc_info.value.usage.total_tokens == 2500
+    assert not exc_info.value.usage.forced_final_answer
+
+
+def test_tool_call_after_warning_raises():
+    model = ScriptedModel(ignore_warning=True)
+
+    with pytest.raises(TokenLimitExceeded) as exc_info:
+        _run(TokenLimiter(max_tokens=5000, output_reserve=500), _make_agent(model))
+
+    assert exc_info.value.usage.forced_final_answer
+    assert len(model.requests) == 4
@@ -0,0 +1,139 @@
+"""Tests for ``ToolCallLimiter`` and the toolset it wraps around MCP servers."""
+
+import asyncio
+from typing import List
+
+from pydantic_ai import Agent, ModelRetry
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.toolsets import FunctionToolset
+
+from core.limiters import TOOL_CALL_LIMIT_MESSAGE, ToolCallLimiter
+
+
+class ToolCallingModel:
+    """Model that calls ``search`` a fixed number of times, one call per request, then answers."""
+
+    def __init__(self, tool_calls: int) -> None:
+        self.tool_calls = tool_calls
+        self.requests: List[List[ModelMessage]] = []
+
+    def respond(self, messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        self.requests.append(messages)
+        if len(self.requests) > self.tool_calls:
+            return ModelResponse(parts=[TextPart("done")])
+        call = ToolCallPart("search", {"query": "foo"}, tool_call_id=f"call-{len(self.requests)}")
+        return ModelResponse(parts=[call])
+
+
+def _tool_returns(messages: List[ModelMessage]) -> List[str]:
+    """Get the content of every tool result the model was sent."""
+    return [
+        part.content
+        for message in messages
+        if isinstance(message, ModelRequest)
+        for part in message.parts
+        if isinstance(part, ToolReturnPart)
+    ]
+
+
+def _search_toolset(executed: List[str]) -> FunctionToolset:
+    """Build a toolset whose ``search`` tool records every execution."""
+    toolset = FunctionToolset()
+
+    @toolset.tool
+    def search(query: str) -> str:
+        """Search the code base."""
+        executed.append(query)
+        return f"results for {query}"
+
+    return toolset
+
+
+def _run(limiter: ToolCallLimiter, toolset: FunctionToolset, tool_calls: int) -> ToolCallingModel:
+    model = ToolCallingModel(tool_calls)
+    agent = Agent(FunctionModel(model.respond), toolsets=[limiter.wrap_mcp_server(toolset)])
+    asyncio.run(agent.run("Where is foo defined?"))
+    return model
+
+
+def test_calls_within_limit_are_executed():
+    executed: List[str] = []
+    limiter = ToolCallLimiter(max_calls=3)
+
+    model = _run(limiter, _search_toolset(executed), tool_calls=3)
+
+    assert executed == ["foo"] * 3
+    assert _tool_returns(model.requests[-1]) == ["results for foo"] * 3
+    assert limiter.call_count == 3
+    stats = limiter.report()["search"]
+    assert (stats["calls"], stats["rejected"], stats["errors"]) == (3, 0, 0)
+
+
+def test_calls_beyond_limit_get_the_limit_message():
+    executed: List[str] = []
+    limiter = ToolCallLimiter(max_calls=2)
+
+    model = _run(limiter, _search_toolset(executed), tool_calls=4)
+
+    assert len(executed) == 2
+    limit_message = TOOL_CALL_LIMIT_MESSAGE.format(max_calls=2)
+    assert _tool_returns(model.requests[-1]) == ["results for foo"] * 2 + [limit_message] * 2
+    stats = limiter.report()["search"]
+    assert (stats["calls"], stats["rejected"]) == (2, 2)
+
+
+def test_failed_calls_count_against_the_limit():
+    attempts: List[str] = []
+    toolset = FunctionToolset()
+
+    @toolset.tool
+    def search(query: str) -> str:
+        """Search the code base."""
+        attempts.append(query)
+        if len(attempts) == 1:
+            raise ModelRetry("backend unavailable, try again")
+        return f"results for {query}"
+
+    limiter = ToolCallLimiter(max_calls=2)
+    _run(limiter, toolset, tool_calls=3)
+
+    assert len(attempts) == 2
+    stats = limiter.report()["search"]
+    assert (stats["calls"], stats["errors"], stats["rejected"]) == (2, 1, 1)
+    assert stats["max_ms"] >= stats["mean_ms"] >= 0
+
+
+def test_limiters_sharing_a_toolset_count_separately():
+    executed: List[str] = []
+    toolset = _search_toolset(executed)
+    first, second = ToolCallLimiter(max_calls=1), ToolCallLimiter(max_calls=5)
+
+    _run(first, toolset, tool_calls=2)
+    _run(second, toolset, tool_calls=2)
+
+    assert len(executed) == 3
+    assert (first.call_count, second.call_count) == (2, 2)
+    assert first.report()["search"]["rejected"] == 1
+    assert second.report()["search"]["rejected"] == 0
+
+
+def test_reset_starts_a_new_budget():
+    executed: List[str] = []
+    toolset = _search_toolset(executed)
+    limiter = ToolCallLimiter(max_calls=1)
+
+    _run(limiter, toolset, tool_calls=2)
+    limiter.reset()
+    assert (limiter.call_count, limiter.report()) == (0, {})
+    _run(limiter, toolset, tool_calls=1)
+
+    assert len(executed) == 2
+    assert limiter.report()["search"]["calls"] == 1
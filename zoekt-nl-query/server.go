@@ -6,6 +6,7 @@ import (
 	"fmt"
 	"log"
 	"net/http"
+	"strconv"
 	"strings"
 	"time"
 
@@ -248,9 +249,19 @@ func (s *NLQueryServer) HandleSearch(w http.ResponseWriter, r *http.Request) {
 
 	// Execute keyword search
 	opts := &zoekt.SearchOptions{
-		MaxDocDisplayCount: 100,
+		MaxDocDisplayCount: maxDocDisplayCount,
 	}
-	
+	maxLineMatches := parsePositiveInt(r.URL.Query().Get("max_line_matches"))
+	if contextLines := parsePositiveInt(r.URL.Query().Get("context_lines")); contextLines > 0 {
+		opts.NumContextLines = contextLines
+	}
+	// Count queries add up every line match, so only other queries are limited
+	num := parsePositiveInt(r.URL.Query().Get("num"))
+	if num > 0 && queryType != "count" {
+		opts.MaxDocDisplayCount = docDisplayCount(num)
+		s.limitMatches(parsedQuery, opts, maxLineMatches)
+	}
+
 	result, err := s.searcher.Search(context.Background(), parsedQuery, opts)
 	responseTime := time.Since(startTime)
 
@@ -312,6 +323,11 @@ func (s *NLQueryServer) HandleSearch(w http.ResponseWriter, r *http.Request) {
 		}
 	}
 
+	// Zoekt has no per-file match limit, so trim line matches before encoding
+	if result != nil {
+		trimLineMatches(result.Files, maxLineMatches)
+	}
+
 	// Return results
 	w.Header().Set("Content-Type", "application/json")
 	
@@ -359,6 +375,73 @@ func (s *NLQueryServer) HandleSearch(w http.ResponseWriter, r *http.Request) {
 	json.NewEncoder(w).Encode(response)
 }
 
+// limitMatches bounds the matches Zoekt collects per shard and in total, so a
+// search for a few files stops early instead of collecting every match. Like
+// Zoekt's web UI, the limits are derived from the number of files wanted and
+// the number of files the query can match, which an estimate search counts.
+func (s *NLQueryServer) limitMatches(q query.Q, opts *zoekt.SearchOptions, maxLineMatches int) {
+	opts.SetDefaults()
+	estimate, err := s.searcher.Search(context.Background(), q, &zoekt.SearchOptions{EstimateDocCount: true})
+	if err != nil {
+		return
+	}
+	shardMax, totalMax := matchLimits(opts.MaxDocDisplayCount, maxLineMatches, estimate.ShardFilesConsidered)
+	opts.ShardMaxMatchCount = shardMax
+	if totalMax > 0 {
+		opts.TotalMaxMatchCount = totalMax
+	}
+}
+
+// maxDocDisplayCount is the most files a keyword search returns; the Python
+// client caps num_results at the same value (backends.search.MAX_NUM_RESULTS)
+const maxDocDisplayCount = 100
+
+// docDisplayCount gets the number of files returned for a requested num
+func docDisplayCount(num int) int {
+	if num <= 0 || num > maxDocDisplayCount {
+		return maxDocDisplayCount
+	}
+	return num
+}
+
+// matchLimits gets the per-shard and total match limits for a search returning
+// num files with up to maxLineMatches line matches each, over a corpus of
+// numDocs candidate files. A total of 0 keeps the default.
+func matchLimits(num, maxLineMatches, numDocs int) (shardMax, totalMax int) {
+	perFile := 5
+	if maxLineMatches > perFile {
+		perFile = maxLineMatches
+	}
+	if numDocs > 10000 {
+		// 10k files, 50 wanted -> 250 + 25 matches per shard
+		return num*perFile + (perFile*num)/(numDocs/1000), 0
+	}
+	// Virtually no limits for a small corpus
+	n := numDocs + num*100
+	return n, n
+}
+
+// trimLineMatches keeps at most maxLineMatches line matches per file; 0 keeps all
+func trimLineMatches(files []zoekt.FileMatch, maxLineMatches int) {
+	if maxLineMatches <= 0 {
+		return
+	}
+	for i := range files {
+		if len(files[i].LineMatches) > maxLineMatches {
+			files[i].LineMatches = files[i].LineMatches[:maxLineMatches]
+		}
+	}
+}
+
+// parsePositiveInt parses an optional positive integer query parameter, returning 0 if absent or invalid
+func parsePositiveInt(value string) int {
+	n, err := strconv.Atoi(value)
+	if err != nil || n < 0 {
+		return 0
+	}
+	return n
+}
+
 // extractAnswerSnippets extracts code snippets from search results for answering questions
 func (s *NLQueryServer) extractAnswerSnippets(result *zoekt.SearchResult, maxFiles int) []string {
 	var snippets []string
@@ -475,7 +558,7 @@ func (s *NLQueryServer) SetupRoutes(mux *http.ServeMux) {
 	
 	log.Println("NL Query Server routes registered:")
 	log.Println("  GET /dashboard - Natural Language Search Dashboard (main)")
-	log.Println("  GET /api/nl-search?q=<query>&mode=semantic|hybrid|keyword - Natural language search API")
+	log.Println("  GET /api/nl-search?q=<query>&mode=semantic|hybrid|keyword[&num=N&max_line_matches=N&context_lines=N] - Natural language search API")
 	log.Println("  POST /api/index-codebase?path=<codebase_path> - Index codebase for semantic search")
 	log.Println("  GET /api/semantic-stats - Get semantic index statistics")
 	log.Println("  GET / - Redirects to /dashboard")
@@ -0,0 +1,64 @@
+package main
+
+import (
+	"testing"
+
+	"github.com/sourcegraph/zoekt"
+)
+
+func TestDocDisplayCount(t *testing.T) {
+	// The Python client sends num_results (1..100) as num
+	cases := map[int]int{0: 100, 1: 1, 30: 30, 100: 100, 500: 100}
+	for num, want := range cases {
+		if got := docDisplayCount(num); got != want {
+			t.Errorf("docDisplayCount(%d) = %d, want %d", num, got, want)
+		}
+	}
+}
+
+func TestMatchLimits(t *testing.T) {
+	cases := []struct {
+		name                    string
+		num, maxLineMatches     int
+		numDocs                 int
+		wantShardMax, wantTotal int
+	}{
+		{"small corpus", 30, 0, 500, 500 + 30*100, 500 + 30*100},
+		{"large corpus", 50, 0, 10001, 50*5 + 250/10, 0},
+		{"large corpus, more line matches per file", 10, 20, 100000, 10*20 + 200/100, 0},
+		{"fewer line matches than the default", 10, 2, 20000, 10*5 + 50/20, 0},
+	}
+	for _, c := range cases {
+		shardMax, totalMax := matchLimits(c.num, c.maxLineMatches, c.numDocs)
+		if shardMax != c.wantShardMax || totalMax != c.wantTotal {
+			t.Errorf("%s: matchLimits(%d, %d, %d) = (%d, %d), want (%d, %d)",
+				c.name, c.num, c.maxLineMatches, c.numDocs, shardMax, totalMax, c.wantShardMax, c.wantTotal)
+		}
+		// Every requested file must be able to contribute its line matches
+		if perFile := c.maxLineMatches; perFile > 0 && shardMax < c.num*perFile {
+			t.Errorf("%s: shard limit %d is below %d files x %d line matches", c.name, shardMax, c.num, perFile)
+		}
+	}
+}
+
+func TestTrimLineMatches(t *testing.T) {
+	files := []zoekt.FileMatch{
+		{FileName: "many.go", LineMatches: make([]zoekt.LineMatch, 8)},
+		{FileName: "few.go", LineMatches: make([]zoekt.LineMatch, 2)},
+		{FileName: "none.go"},
+	}
+	trimLineMatches(files, 3)
+	want := []int{3, 2, 0}
+	for i, file := range files {
+		if len(file.LineMatches) != want[i] {
+			t.Errorf("%s: %d line matches, want %d", file.FileName, len(file.LineMatches), want[i])
+		}
+	}
+
+	// Without max_line_matches every line match is kept
+	files = []zoekt.FileMatch{{LineMatches: make([]zoekt.LineMatch, 8)}}
+	trimLineMatches(files, 0)
+	if len(files[0].LineMatches) != 8 {
+		t.Errorf("trimLineMatches(files, 0) kept %d line matches, want 8", len(files[0].LineMatches))
+	}
+}